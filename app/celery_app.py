@@ -2,27 +2,188 @@
 Celery app configuration for QueuePilot.
 
 Initializes the shared Celery instance used by tasks and the beat scheduler.
-Uses Redis for both broker and result backend. Settings are tuned for I/O-heavy
-HTTP operations (logins, queue point checks).
+Uses Redis as the broker. Task results are not stored: login outcomes are
+written in batches to the run_outcomes table instead (utils/outcomes.py), and
+messages carry only a credential ID. Settings are tuned for I/O-heavy HTTP
+operations (logins, queue point checks).
+
+Login tasks are routed to a dedicated queue per system_type so a burst of slow
+portals cannot starve the fast ones, and each queue can be served by a worker
+profile suited to it (see docker-compose.yml):
+
+  - ``momentum`` / ``vitec``: HTTP-only handlers, high-concurrency gevent pool
+  - ``browser``: Selenium-based handlers, small prefork pool
+  - ``celery``: scheduler and housekeeping tasks
+
+Within the HTTP queues, logins are further sharded by target portal host
+(``momentum.s0`` …) and the shards are spread over the live workers by
+scheduler.rebalance_affinity, so each worker keeps warm connections and site
+caches for the hosts it owns.
 """
+import logging
 import os
 from celery import Celery
+from celery.concurrency import get_implementation
+from celery.signals import (
+    before_task_publish, setup_logging, worker_init, worker_process_init, worker_process_shutdown,
+)
+
+from utils import cassette
+from utils.affinity import AFFINITY_SHARDS, shard_queue, shard_queues
+from utils.logging_setup import configure_logging
+from utils.metrics import QUEUE_DEPTH, start_http_server
+from utils.metrics_core import MULTIPROC_DIR, clear_snapshots, start_snapshots, write_snapshot
+from utils.profiling import configure_task_profiling
+from utils.tracing import inject_headers
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+# Port for the worker's /metrics endpoint; 0 disables it
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+DEFAULT_QUEUE = "celery"
+BROWSER_QUEUE = "browser"
+
+# system_type → queue. Anything not listed here falls back to DEFAULT_QUEUE.
+# Selenium-based handlers should be mapped to BROWSER_QUEUE when registered.
+SYSTEM_TYPE_QUEUES = {
+    "momentum": "momentum",
+    "vitec": "vitec",
+    "kjellberg": "vitec",  # legacy alias
+}
+
+# Queues whose logins are sharded by target host for connection affinity
+AFFINITY_QUEUES = ("momentum", "vitec")
+
+# Broker priorities: 0 is the most urgent, 9 the least (Redis transport order).
+PRIORITY_STEPS = list(range(10))
+
+
+def queue_for_system_type(system_type: str) -> str:
+    """Returns the queue name login tasks for the given system_type are sent to."""
+    return SYSTEM_TYPE_QUEUES.get(system_type, DEFAULT_QUEUE)
+
+
+def login_queue(system_type: str, host: str | None) -> str:
+    """
+    Returns the queue a login task should be sent to: the host's shard queue
+    when host affinity applies, otherwise the plain system_type queue.
+    """
+    queue = queue_for_system_type(system_type)
+    if queue in AFFINITY_QUEUES and AFFINITY_SHARDS and host:
+        return shard_queue(queue, host)
+    return queue
+
 
 celery = Celery(
     "queuepilot",
     broker=REDIS_URL,
-    backend=REDIS_URL,
     include=["tasks", "scheduler"],
 )
 
 celery.conf.update(
     task_serializer="json",
     accept_content=["json"],
-    result_expires=3600,
+    task_ignore_result=True,
     worker_prefetch_multiplier=1,  # one task at a time — HTTP logins are I/O-heavy
     task_acks_late=True,           # re-queue on worker crash; prevents lost tasks
+    task_default_queue=DEFAULT_QUEUE,
+    task_default_priority=5,
+    # Default round-robin queue order: a worker consuming several queues
+    # rotates which it polls first, so a backlog on one (e.g. momentum) cannot
+    # starve another of the same priority. Priorities still apply within each.
+    broker_transport_options={
+        "priority_steps": PRIORITY_STEPS,
+    },
     timezone="Europe/Stockholm",
     enable_utc=True,
 )
+
+
+def _queue_depths() -> dict:
+    """Counts waiting messages per queue (summed over priority sub-queues) in Redis."""
+    import redis
+
+    queues = {DEFAULT_QUEUE, BROWSER_QUEUE, *SYSTEM_TYPE_QUEUES.values()}
+    for base in AFFINITY_QUEUES:
+        queues.update(shard_queues(base))
+    queues = sorted(queues)
+    # The Redis transport stores priority N of queue Q under Q\x06\x16N (N > 0)
+    keys = [[q] + [f"{q}\x06\x16{step}" for step in PRIORITY_STEPS[1:]] for q in queues]
+
+    client = redis.Redis.from_url(REDIS_URL)
+    pipe = client.pipeline(transaction=False)
+    for names in keys:
+        for key in names:
+            pipe.llen(key)
+    lengths = iter(pipe.execute())
+    return {(q,): sum(next(lengths) for _ in names) for q, names in zip(queues, keys)}
+
+
+QUEUE_DEPTH.set_function(_queue_depths)
+
+if cassette.RECORD_DIR:
+    cassette.record(cassette.RECORD_DIR)
+
+
+def _pool_name(worker) -> str:
+    """The worker's pool type: prefork, solo, gevent, thread, ..."""
+    return get_implementation(worker.pool_cls).__module__.rsplit(".", 1)[-1]
+
+
+@worker_init.connect
+def _start_metrics_server(sender=None, **kwargs) -> None:
+    """
+    Serves /metrics from the worker process. With solo, thread and gevent
+    pools all logins run in this process. Prefork children record in their
+    own registries, so they need METRICS_MULTIPROC_DIR: each child writes
+    snapshots there and this process adds them up when scraped.
+    """
+    if not METRICS_PORT:
+        return
+    if sender is not None and _pool_name(sender) == "prefork":
+        if not MULTIPROC_DIR:
+            logging.warning("Metrics server not started: prefork children's metrics need METRICS_MULTIPROC_DIR")
+            return
+        clear_snapshots()
+    start_http_server(METRICS_PORT)
+
+
+@worker_init.connect
+def _check_task_profiling(sender=None, **kwargs) -> None:
+    """Task profiles are only taken on pools that run one task per process."""
+    if sender is not None:
+        configure_task_profiling(_pool_name(sender))
+
+
+@setup_logging.connect
+def _setup_logging(loglevel=None, **kwargs) -> None:
+    """
+    Replaces Celery's own logging setup with the shared queue-based one, at
+    the worker's --loglevel and also on stderr, so `docker logs` keeps working.
+    """
+    configure_logging(level=loglevel or None, console=True)
+
+
+@worker_process_init.connect
+def _setup_child_logging(**kwargs) -> None:
+    """Prefork children need their own listener thread after the fork."""
+    configure_logging()
+
+
+@worker_process_init.connect
+def _start_child_metrics(**kwargs) -> None:
+    """Prefork children snapshot their metrics for the parent's /metrics."""
+    start_snapshots()
+
+
+@worker_process_shutdown.connect
+def _write_child_metrics(**kwargs) -> None:
+    """A child's last values outlive it, so totals do not drop on recycle."""
+    write_snapshot()
+
+
+@before_task_publish.connect
+def _add_trace_headers(headers=None, **kwargs) -> None:
+    """Carries the publish time and current trace context to the worker."""
+    if headers is not None:
+        headers.update(inject_headers())
@@ -1,9 +1,105 @@
-"""Centralized handler registry for site type dispatching."""
+"""
+Centralized handler registry for site type dispatching.
 
-from sites import momentum, kjellberg
+Maps each system_type to the handler that logs in to it, as a
+"module:function" path. Handler modules are imported the first time their
+system_type is dispatched, so `main.py --site <one>` and each worker only load
+the handlers they run (Selenium-based ones pull in the whole webdriver stack).
 
-HANDLERS = {
-    "momentum": momentum.run,
-    "vitec": kjellberg.run,
-    "kjellberg": kjellberg.run,  # legacy alias
+Installed packages can add handlers through the ``queuepilot.handlers`` entry
+point group (name: system_type, value: "module:function"); these are looked
+up only when a system_type is not built in. bench/startup_imports.py tracks
+the import time of the CLI, the workers and each handler.
+"""
+
+import importlib
+import logging
+import threading
+from typing import Callable, Dict, Iterator, Mapping
+
+ENTRY_POINT_GROUP = "queuepilot.handlers"
+
+BUILTIN_HANDLERS = {
+    "momentum": "sites.momentum:run",
+    "vitec": "sites.kjellberg:run",
+    "kjellberg": "sites.kjellberg:run",  # legacy alias
 }
+
+
+class HandlerRegistry(Mapping[str, Callable[[str, int], bool]]):
+    """
+    system_type → handler, importing each handler on first lookup. A handler
+    whose module fails to import raises ImportError rather than being
+    reported as an unknown system_type.
+    """
+
+    def __init__(self, paths: Dict[str, str], group: str | None = ENTRY_POINT_GROUP):
+        self._paths = dict(paths)
+        self._group = group
+        self._loaded: Dict[str, Callable] = {}
+        self._lock = threading.Lock()
+        self._plugins_found = group is None
+
+    def register(self, system_type: str, handler: str | Callable) -> None:
+        """Adds or replaces a handler, given as "module:function" or a callable."""
+        with self._lock:
+            self._loaded.pop(system_type, None)
+            if callable(handler):
+                self._loaded[system_type] = handler
+                self._paths[system_type] = f"{handler.__module__}:{handler.__qualname__}"
+            else:
+                self._paths[system_type] = handler
+
+    def _find_plugins(self) -> None:
+        # Scanning installed distributions is slow, so only done once and on demand
+        if self._plugins_found:
+            return
+        self._plugins_found = True
+        from importlib.metadata import entry_points
+        for ep in entry_points(group=self._group):
+            if ep.name in self._paths:
+                logging.warning("Ignoring handler plugin %s: system_type '%s' is already registered",
+                                ep.value, ep.name)
+                continue
+            self._paths[ep.name] = ep.value
+
+    def __getitem__(self, system_type: str) -> Callable[[str, int], bool]:
+        handler = self._loaded.get(system_type)
+        if handler is not None:
+            return handler
+        with self._lock:
+            if system_type not in self._paths:
+                self._find_plugins()
+            path = self._paths.get(system_type)
+            if path is None:
+                raise KeyError(system_type)
+            handler = self._loaded.get(system_type)
+            if handler is None:
+                module, _, attr = path.partition(":")
+                handler = getattr(importlib.import_module(module), attr or "run")
+                self._loaded[system_type] = handler
+            return handler
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            self._find_plugins()
+            return iter(list(self._paths))
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._find_plugins()
+            return len(self._paths)
+
+    def __contains__(self, system_type) -> bool:
+        # Without importing the handler
+        with self._lock:
+            if system_type not in self._paths:
+                self._find_plugins()
+            return system_type in self._paths
+
+    def loaded(self) -> list:
+        """The system_types whose handlers have been imported so far."""
+        return sorted(self._loaded)
+
+
+HANDLERS = HandlerRegistry(BUILTIN_HANDLERS)
@@ -8,6 +8,11 @@ as specific customers and running the scraping logic per site.
 Usage:
     python main.py --site kbab
     python main.py --site all
+    python main.py --site all --report json   # per-phase timings → reports/
+    python main.py --site all --customers all --shard 0/4   # this node's quarter of all customers
+    python main.py --site all --profile cpu   # cpu | wall | alloc → profiles/
+    python main.py --site all --record cassettes/run1
+    python main.py --site all --replay cassettes/run1 --replay-speed 0
 
 Requires a connected MariaDB database with:
   - `sites` table: defines url_name, system_type, and API details
@@ -15,95 +20,173 @@ Requires a connected MariaDB database with:
 """
 
 import argparse
-import datetime
+import contextlib
+import hashlib
 import logging
 import os
+import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import List, Dict
-from zoneinfo import ZoneInfo as _ZI
-
-# Initialize logging with daily rotation and Stockholm timezone
-LOG_DIR = "logs"
-os.makedirs(LOG_DIR, exist_ok=True)
-_log_path = os.path.join(LOG_DIR, datetime.date.today().strftime("%Y-%m-%d") + ".log")
-logging.basicConfig(
-    filename=_log_path,
-    level=logging.INFO,
-    format='[%(asctime)s] %(message)s',
-    datefmt='%H:%M:%S'
-)
-logging.Formatter.converter = staticmethod(
-    lambda ts: datetime.datetime.fromtimestamp(ts, tz=_ZI("Europe/Stockholm")).timetuple()
-)
+from typing import Dict, List, Tuple
 
 from handlers import HANDLERS
 from utils.db import get_connection, ensure_schema
+from utils.logging_setup import configure_logging
+from utils.metrics import LOGINS_IN_FLIGHT, start_http_server
+from utils.outcomes import recorder, OK, FAILED, ERROR
+from utils import cassette, events, ordering, profiling
+from utils.timing import RunReport, timed_run
+from utils.tracing import start_trace
 
 # Configurable via MAX_WORKERS env var — tune based on number of active sites
 MAX_WORKERS = int(os.getenv("MAX_WORKERS", "10"))
+# Serve /metrics on this port while the run is in progress; 0 disables it
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+REPORT_DIR = "reports"
 
 
-def get_all_sites() -> List[Dict[str, str]]:
+def get_all_sites(customers: List[int] | None = None) -> List[Dict]:
     """
-    Retrieve all sites that have at least one active credential for customer 1.
+    Retrieve every (site, customer) pair with an active credential.
+
+    Args:
+        customers: Customer IDs to include, or None for all customers.
 
     Returns:
-        List[Dict]: List of dicts with 'url_name' and 'system_type'.
+        List[Dict]: Dicts with 'url_name', 'system_type', 'momentum_id',
+        'base_url' and 'customer_id'.
     """
     conn = get_connection()
     cursor = conn.cursor(dictionary=True, buffered=True)
-    # CLI path is single-user (customer_id=1). Multi-user dispatch is handled
-    # by the Celery scheduler (scheduler.enqueue_stale_credentials).
-    cursor.execute("""
-        SELECT s.url_name, s.system_type
+    query = """
+        SELECT s.url_name, s.system_type, s.momentum_id, s.base_url, c.customer_id
         FROM sites s
-        INNER JOIN credentials c ON c.site = s.url_name AND c.customer_id = 1 AND c.active = 1
-    """)
+        INNER JOIN credentials c ON c.site = s.url_name AND c.active = 1
+    """
+    params: tuple = ()
+    if customers is not None:
+        query += f" WHERE c.customer_id IN ({','.join(['%s'] * len(customers))})"
+        params = tuple(customers)
+    cursor.execute(query, params)
     result = cursor.fetchall()
     cursor.close()
     conn.close()
     return result
 
 
-def get_site(url_name: str) -> Dict[str, str]:
+def get_site(url_name: str, customers: List[int] | None = None) -> List[Dict]:
     """
-    Retrieve a single site entry by url_name.
+    Retrieve a single site's active credentials.
 
     Args:
         url_name (str): The site identifier.
+        customers: Customer IDs to include, or None for all customers.
 
     Returns:
-        Dict with 'url_name' and 'system_type'.
+        List[Dict]: One dict per credential with 'url_name', 'system_type',
+        'momentum_id', 'base_url' and 'customer_id'.
 
     Raises:
         LookupError: If the site is not found.
     """
     conn = get_connection()
     cursor = conn.cursor(dictionary=True, buffered=True)
-    cursor.execute("SELECT url_name, system_type FROM sites WHERE url_name=%s", (url_name,))
-    result = cursor.fetchone()
+    cursor.execute(
+        "SELECT url_name, system_type, momentum_id, base_url FROM sites WHERE url_name=%s", (url_name,)
+    )
+    site = cursor.fetchone()
+    if not site:
+        cursor.close()
+        conn.close()
+        raise LookupError(f"Site '{url_name}' not found in the database.")
+
+    cursor.execute(
+        "SELECT customer_id FROM credentials WHERE site=%s AND active=1 ORDER BY customer_id",
+        (url_name,)
+    )
+    result = [
+        {**site, "customer_id": row["customer_id"]}
+        for row in cursor.fetchall()
+        if customers is None or row["customer_id"] in customers
+    ]
     cursor.close()
     conn.close()
+    return result
 
-    if not result:
-        raise LookupError(f"Site '{url_name}' not found in the database.")
 
-    return result
+def parse_customers(value: str) -> List[int] | None:
+    """Parses --customers: 'all' → None, '1,7,12' → [1, 7, 12]."""
+    if value.strip().lower() == "all":
+        return None
+    try:
+        customers = [int(part) for part in value.split(",") if part.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected 'all' or comma-separated IDs, got '{value}'")
+    if not customers:
+        raise argparse.ArgumentTypeError(f"expected 'all' or at least one customer ID, got '{value}'")
+    return customers
+
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """Parses --shard 'i/n' (0 <= i < n)."""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected i/n, got '{value}'")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"shard index must be 0 <= i < n, got '{value}'")
+    return index, count
 
 
-def dispatch(url_name: str, system_type: str) -> None:
+def shard_of(url_name: str, customer_id: int, count: int) -> int:
+    """
+    Stable shard for a (site, customer) pair: the same pair always lands on
+    the same shard for a given shard count, on every host and Python version.
+    """
+    digest = hashlib.blake2b(f"{url_name}:{customer_id}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % count
+
+
+def dispatch(url_name: str, system_type: str, customer_id: int = 1,
+             report: RunReport | None = None, profiler=None) -> str | None:
     """
     Dispatches execution to the correct site handler.
 
     Args:
         url_name (str): The site's identifier.
         system_type (str): The platform type (e.g. 'momentum', 'kjellberg').
+        customer_id (int): The credential owner's ID, passed to the handler.
+        report (RunReport, optional): Collects the run's phase timings.
+        profiler (optional): Active profiler from utils.profiling; samples taken
+            while the handler runs are attributed to this site.
+
+    Returns:
+        The outcome (OK or FAILED), or None if the system_type is unknown.
     """
     handler = HANDLERS.get(system_type)
     if handler:
-        handler(url_name)
-    else:
-        logging.warning("Unknown system_type '%s' for site '%s'. Skipping.", system_type, url_name)
+        started = time.monotonic()
+        in_flight = LOGINS_IN_FLIGHT.labels()
+        in_flight.inc()
+        tracked = profiler.track(url_name) if profiler else contextlib.nullcontext()
+        with start_trace("dispatch", site=url_name, customer_id=customer_id, system_type=system_type), \
+                tracked, timed_run(url_name, customer_id, system_type) as timer, \
+                events.login_progress(url_name, customer_id, system_type) as progress:
+            try:
+                ok = handler(url_name, customer_id)
+            except Exception as exc:
+                timer.status = progress.status = ERROR
+                recorder.record(url_name, customer_id, system_type, ERROR, time.monotonic() - started,
+                                type(exc).__name__)
+                raise
+            finally:
+                in_flight.dec()
+                if report is not None:
+                    report.add(timer)
+            timer.status = progress.status = OK if ok else FAILED
+        recorder.record(url_name, customer_id, system_type, timer.status, time.monotonic() - started)
+        return timer.status
+    logging.warning("Unknown system_type '%s' for site '%s'. Skipping.", system_type, url_name)
+    return None
 
 
 def main() -> None:
@@ -122,25 +205,136 @@ def main() -> None:
         required=True,
         help="Which site to run (e.g. 'kbab' or 'all')"
     )
+    parser.add_argument(
+        "--customers",
+        type=parse_customers,
+        default=[1],
+        help="Customers to run for: 'all' or comma-separated IDs (default: 1)"
+    )
+    parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        default=(0, 1),
+        metavar="I/N",
+        help="Only run the (site, customer) pairs hashed to shard I of N (0-based), "
+             "so N processes or nodes can split the work"
+    )
+    parser.add_argument(
+        "--order",
+        choices=["longest", "db"],
+        default="longest",
+        help="Start order: longest expected login first with hosts spread out "
+             "(from recent run outcomes), or database order"
+    )
+    parser.add_argument(
+        "--report",
+        choices=["json"],
+        help="Write per-credential phase timings and p50/p95/p99 summaries"
+    )
+    parser.add_argument(
+        "--report-path",
+        type=str,
+        help=f"Report file (default: {REPORT_DIR}/run-<timestamp>[-shard<I>of<N>].json)"
+    )
+    parser.add_argument(
+        "--profile",
+        choices=["cpu", "wall", "alloc"],
+        help="Profile the run: sampled CPU or wall-clock stacks, or allocations "
+             "(alloc runs sites one at a time for exact per-site numbers)"
+    )
+    parser.add_argument(
+        "--profile-dir",
+        type=str,
+        help=f"Profile output directory (default: {profiling.PROFILE_DIR}/run-<timestamp>)"
+    )
+    http_mode = parser.add_mutually_exclusive_group()
+    http_mode.add_argument(
+        "--record",
+        type=str,
+        metavar="DIR",
+        help="Save scrubbed portal requests/responses to DIR for later replay"
+    )
+    http_mode.add_argument(
+        "--replay",
+        type=str,
+        metavar="DIR",
+        help="Serve portal responses from a recording in DIR instead of the network"
+    )
+    parser.add_argument(
+        "--replay-speed",
+        type=float,
+        default=1.0,
+        help="Replay timing: 1 as recorded, 2 twice as fast, 0 no delays (default: 1)"
+    )
 
     args = parser.parse_args()
+    if args.record:
+        cassette.record(args.record)
+    elif args.replay:
+        cassette.replay(args.replay, args.replay_speed)
+    shard_index, shard_count = args.shard
+    report = RunReport(meta={
+        "site": args.site,
+        "customers": "all" if args.customers is None else args.customers,
+        "shard": f"{shard_index}/{shard_count}",
+    }) if args.report else None
+    profiler = profiling.create(args.profile) if args.profile else None
     site_arg = args.site.lower()
 
+    if METRICS_PORT:
+        start_http_server(METRICS_PORT)
+
     if site_arg == "all":
-        sites = get_all_sites()
-        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
-            futures = {pool.submit(dispatch, s["url_name"], s.get("system_type", "momentum")): s for s in sites}
-            for future in as_completed(futures):
-                site = futures[future]
-                try:
-                    future.result()
-                except Exception:
-                    logging.exception("Site %s failed", site["url_name"])
+        jobs = get_all_sites(args.customers)
     else:
-        site = get_site(site_arg)
-        dispatch(site["url_name"], site.get("system_type", "momentum"))
+        jobs = get_site(site_arg, args.customers)
+    if shard_count > 1:
+        jobs = [j for j in jobs if shard_of(j["url_name"], j["customer_id"], shard_count) == shard_index]
+        logging.info("Shard %d/%d: %d credential(s)", shard_index, shard_count, len(jobs))
+    if not jobs:
+        logging.warning("No active credentials to run for --site %s --customers %s",
+                        args.site, "all" if args.customers is None else args.customers)
+
+    workers = 1 if args.profile == "alloc" else MAX_WORKERS
+    if args.order == "longest" and len(jobs) > 1:
+        jobs = ordering.order_jobs(jobs, ordering.historical_durations(), spread=workers - 1)
+
+    events.run_started(len(jobs), shard=f"{shard_index}/{shard_count}")
+    counts = {OK: 0, FAILED: 0, ERROR: 0}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(dispatch, j["url_name"], j.get("system_type", "momentum"), j["customer_id"],
+                        report, profiler): j
+            for j in jobs
+        }
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                status = future.result()
+                if status:
+                    counts[status] += 1
+            except Exception:
+                counts[ERROR] += 1
+                logging.exception("Site %s (customer %s) failed", job["url_name"], job["customer_id"])
+    events.run_finished(shard=f"{shard_index}/{shard_count}", **counts)
+    recorder.flush()
+
+    if profiler is not None:
+        profiler.stop()
+        out_dir = args.profile_dir or profiling.default_out_dir()
+        profiler.write(out_dir)
+        logging.info("Profile (%s) written to %s", args.profile, out_dir)
+
+    if report is not None:
+        name = report.started_at.strftime("run-%Y%m%d-%H%M%S")
+        if shard_count > 1:
+            name += f"-shard{shard_index}of{shard_count}"
+        path = args.report_path or os.path.join(REPORT_DIR, f"{name}.json")
+        report.write(path)
+        logging.info("Run report written to %s", path)
 
 
 if __name__ == "__main__":
+    configure_logging()
     ensure_schema()
     main()
@@ -0,0 +1,110 @@
+"""
+QueuePilot - Dead-Letter Re-drive
+
+Lists login tasks that exhausted their retries and sends them back to the
+login queues, on the same host-shard queues the scheduler uses. A large
+backlog (e.g. after a portal outage) is sent in paced batches of about `rate`
+tasks per second rather than all at once. Pacing happens here, at send time:
+countdowns would turn the backlog into ETA tasks that workers hold in memory,
+and any countdown past the broker's visibility timeout is delivered twice.
+Each batch is marked re-driven as soon as it is sent, so a re-drive that
+fails halfway does not send the same letters again next time.
+
+The web API's /api/dead-letters/redrive runs this on the workers through
+scheduler.redrive_dead_letters.
+
+Usage:
+    python redrive.py --list
+    python redrive.py --site kbab --customer 1
+    python redrive.py --error-class ConnectionError --rate 20 --limit 5000
+"""
+
+import argparse
+import logging
+import math
+import time
+from collections import Counter
+
+from celery_app import login_queue
+from tasks import login_credential
+from utils.affinity import target_host
+from utils.dead_letters import fetch_dead_letters, mark_redriven
+from utils.logging_setup import configure_logging
+from utils.tracing import start_trace
+
+
+def redrive(site: str | None = None, error_class: str | None = None,
+            rate: float = 10.0, limit: int = 1000, customer_id: int | None = None) -> int:
+    """
+    Re-enqueues pending dead letters matching the filters.
+
+    Args:
+        site: Only re-drive entries for this site.
+        error_class: Only re-drive entries with this exception class name.
+        rate: Maximum tasks per second released to the workers.
+        limit: Maximum number of entries to re-drive.
+        customer_id: Only re-drive this customer's entries (default: all).
+
+    Returns:
+        int: The number of tasks enqueued.
+    """
+    rows = fetch_dead_letters(site=site, error_class=error_class, limit=limit, customer_id=customer_id)
+    # Whole batches every `interval` seconds; one task at a time below 1/s
+    batch_size = max(1, math.floor(rate))
+    interval = batch_size / rate
+    next_send = time.monotonic()
+    sent = 0
+    for start in range(0, len(rows), batch_size):
+        delay = next_send - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        next_send += interval
+        batch_ids = []
+        try:
+            for row in rows[start:start + batch_size]:
+                host = target_host(row["system_type"], row["site"], row["momentum_id"], row["base_url"])
+                with start_trace("redrive", site=row["site"], dead_letter_id=row["id"]):
+                    login_credential.apply_async(
+                        args=(row["credential_id"],),
+                        queue=login_queue(row["system_type"], host),
+                    )
+                batch_ids.append(row["id"])
+        finally:
+            mark_redriven(batch_ids)
+            sent += len(batch_ids)
+    logging.info("Re-drove %d dead letter(s) at %.1f/s", sent, rate)
+    return sent
+
+
+def main() -> None:
+    """Parses command-line arguments and lists or re-drives dead letters."""
+    parser = argparse.ArgumentParser(description="Inspect and re-drive exhausted login tasks.")
+    parser.add_argument("--list", action="store_true", help="Only show a summary, do not re-drive")
+    parser.add_argument("--site", type=str, help="Filter by site url_name")
+    parser.add_argument("--error-class", type=str, help="Filter by exception class name")
+    parser.add_argument("--customer", type=int, help="Filter by customer ID (default: all customers)")
+    parser.add_argument("--rate", type=float, default=10.0, help="Tasks per second (default 10)")
+    parser.add_argument("--limit", type=int, default=1000, help="Maximum entries (default 1000)")
+    args = parser.parse_args()
+    if args.limit <= 0:
+        parser.error("--limit must be positive")
+
+    if args.list:
+        rows = fetch_dead_letters(site=args.site, error_class=args.error_class, limit=args.limit,
+                                  customer_id=args.customer)
+        counts = Counter((row["site"], row["error_class"], row["http_status"]) for row in rows)
+        for (site, error_class, status), n in counts.most_common():
+            print(f"{n:6d}  {site:<20} {error_class:<30} {status or '-'}")
+        print(f"{len(rows)} pending dead letter(s)")
+        return
+
+    if args.rate <= 0:
+        parser.error("--rate must be positive")
+    count = redrive(site=args.site, error_class=args.error_class, rate=args.rate, limit=args.limit,
+                    customer_id=args.customer)
+    print(f"Re-drove {count} task(s)")
+
+
+if __name__ == "__main__":
+    configure_logging()
+    main()
@@ -3,20 +3,59 @@ Celery beat scheduler for QueuePilot.
 
 Periodically queries the database for stale credentials and enqueues
 login_credential tasks for each one. Runs daily at 03:00.
+
+Each task is sent to its system_type queue — sharded by portal host for
+connection affinity — with a broker priority derived from how close the
+credential is to losing its queue points (last_login age).
+
+Also hosts enqueue_run, which dispatches every active credential of a
+customer when Run Now is pressed in the web UI, enqueue_credential, which does
+the same for a single site, redrive_dead_letters, which
+runs a paced dead-letter re-drive for the web UI, and rebalance_affinity, which
+reassigns host shard queues to the live workers whenever workers join or leave.
 """
 
 import logging
 import os
 from celery.schedules import crontab
+from celery.signals import worker_ready
 
-from celery_app import celery
+from celery_app import celery, login_queue, PRIORITY_STEPS, AFFINITY_QUEUES
+from utils import events
+from utils.affinity import AFFINITY_SHARDS, HashRing, shard_queues, target_host
 from utils.db import get_connection
+from utils.tracing import start_trace
 
 REFRESH_INTERVAL_DAYS = int(os.getenv("REFRESH_INTERVAL_DAYS", "90"))
+# Days without a login after which a portal typically drops the queue points
+POINT_EXPIRY_DAYS = int(os.getenv("POINT_EXPIRY_DAYS", "365"))
+
+
+def login_priority(age_days: int | None) -> int:
+    """
+    Maps the days since a credential's last login to a broker priority.
+
+    Credentials that have never logged in, or are at/after POINT_EXPIRY_DAYS,
+    get the most urgent priority (0). The rest scale linearly with the days
+    they have left, up to the least urgent step.
+
+    Args:
+        age_days: Days since last_login, or None if it never logged in.
+
+    Returns:
+        An int in PRIORITY_STEPS, 0 being the most urgent.
+    """
+    if age_days is None:
+        return PRIORITY_STEPS[0]
+    remaining = POINT_EXPIRY_DAYS - age_days
+    if remaining <= 0:
+        return PRIORITY_STEPS[0]
+    step = remaining * len(PRIORITY_STEPS) // POINT_EXPIRY_DAYS
+    return PRIORITY_STEPS[min(step, len(PRIORITY_STEPS) - 1)]
 
 
 @celery.task(bind=True, max_retries=3, default_retry_delay=60)
-def enqueue_stale_credentials(self) -> str:
+def enqueue_stale_credentials(self) -> int:
     """
     Finds all active credentials not refreshed within REFRESH_INTERVAL_DAYS
     and dispatches a login_credential task for each one.
@@ -24,7 +63,7 @@ def enqueue_stale_credentials(self) -> str:
     Runs daily via Celery beat at 03:00 Stockholm time.
 
     Returns:
-        A summary string with the number of tasks enqueued.
+        The number of tasks enqueued (logged; results are not stored).
     """
     # Deferred import avoids circular dependency: both tasks and scheduler
     # are included in celery_app, so top-level cross-imports would fail.
@@ -35,7 +74,8 @@ def enqueue_stale_credentials(self) -> str:
         cursor = conn.cursor(dictionary=True)
         cursor.execute(
             """
-            SELECT c.site, c.customer_id, s.system_type
+            SELECT c.id, c.site, c.customer_id, s.system_type, s.momentum_id, s.base_url,
+                   DATEDIFF(NOW(), c.last_login) AS age_days
             FROM credentials c
             JOIN sites s ON s.url_name = c.site
             WHERE c.active = 1
@@ -43,6 +83,7 @@ def enqueue_stale_credentials(self) -> str:
                 c.last_login IS NULL
                 OR c.last_login < NOW() - INTERVAL %s DAY
               )
+            ORDER BY c.last_login IS NOT NULL, c.last_login
             """,
             (REFRESH_INTERVAL_DAYS,)
         )
@@ -54,20 +95,182 @@ def enqueue_stale_credentials(self) -> str:
         raise self.retry(exc=exc)
 
     for row in rows:
-        login_credential.delay(row["site"], row["customer_id"], row["system_type"])
+        host = target_host(row["system_type"], row["site"], row["momentum_id"], row["base_url"])
+        queue = login_queue(row["system_type"], host)
+        priority = login_priority(row["age_days"])
+        with start_trace("enqueue", site=row["site"], customer_id=row["customer_id"], queue=queue):
+            login_credential.apply_async(
+                args=(row["id"],),
+                queue=queue,
+                priority=priority,
+            )
         logging.info(
-            "Enqueued %s / customer_id=%s (system: %s)",
-            row["site"], row["customer_id"], row["system_type"]
+            "Enqueued %s / customer_id=%s (system: %s, queue: %s, priority: %s)",
+            row["site"], row["customer_id"], row["system_type"], queue, priority
         )
 
     logging.info("Enqueued %d stale credentials", len(rows))
-    return f"enqueued:{len(rows)}"
+    return len(rows)
+
+
+@celery.task(bind=True, max_retries=3, default_retry_delay=10)
+def enqueue_run(self, customer_id: int, run_id: str) -> int:
+    """
+    Dispatches a login_credential task for each of a customer's active
+    credentials as one tracked run (see utils.events). Sent by the web API's
+    /api/run; the logins jump ahead of scheduled refreshes.
+
+    Returns:
+        The number of tasks enqueued.
+    """
+    from tasks import login_credential
+
+    try:
+        conn = get_connection()
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(
+            """
+            SELECT c.id, c.site, s.system_type, s.momentum_id, s.base_url
+            FROM credentials c
+            JOIN sites s ON s.url_name = c.site
+            WHERE c.active = 1 AND c.customer_id = %s
+            """,
+            (customer_id,)
+        )
+        rows = cursor.fetchall()
+        cursor.close()
+        conn.close()
+    except Exception as exc:
+        logging.exception("Failed to fetch credentials for run %s", run_id)
+        raise self.retry(exc=exc)
+
+    events.start_run(run_id, customer_id, len(rows))
+    for row in rows:
+        host = target_host(row["system_type"], row["site"], row["momentum_id"], row["base_url"])
+        queue = login_queue(row["system_type"], host)
+        with start_trace("enqueue", site=row["site"], customer_id=customer_id, queue=queue, run_id=run_id):
+            login_credential.apply_async(
+                args=(row["id"],),
+                kwargs={"run_id": run_id},
+                queue=queue,
+                priority=PRIORITY_STEPS[0],
+            )
+
+    logging.info("Run %s: enqueued %d credentials for customer_id=%s", run_id, len(rows), customer_id)
+    return len(rows)
+
+
+@celery.task(bind=True, max_retries=3, default_retry_delay=10)
+def enqueue_credential(self, credential_id: int) -> bool:
+    """
+    Dispatches one active credential's login ahead of scheduled refreshes, on
+    the same host-shard queue as every other login of its portal. Sent by the
+    web API's /api/sites/<url_name>/run.
+
+    Returns:
+        True if a login was enqueued.
+    """
+    from tasks import login_credential
+
+    try:
+        conn = get_connection()
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(
+            """
+            SELECT c.id, c.site, c.customer_id, c.active, s.system_type, s.momentum_id, s.base_url
+            FROM credentials c
+            JOIN sites s ON s.url_name = c.site
+            WHERE c.id = %s
+            """,
+            (credential_id,)
+        )
+        row = cursor.fetchone()
+        cursor.close()
+        conn.close()
+    except Exception as exc:
+        logging.exception("Failed to fetch credential %s", credential_id)
+        raise self.retry(exc=exc)
+
+    if not row or not row["active"]:
+        logging.warning("Credential %s is gone or inactive; not enqueued", credential_id)
+        return False
+    host = target_host(row["system_type"], row["site"], row["momentum_id"], row["base_url"])
+    queue = login_queue(row["system_type"], host)
+    with start_trace("enqueue", site=row["site"], customer_id=row["customer_id"], queue=queue):
+        login_credential.apply_async(
+            args=(row["id"],),
+            queue=queue,
+            priority=PRIORITY_STEPS[0],
+        )
+    logging.info("Enqueued %s / customer_id=%s now (queue: %s)", row["site"], row["customer_id"], queue)
+    return True
+
+
+# Not acked late: a slow re-drive can outlast the broker's visibility timeout,
+# and a redelivered copy would pace the same letters a second time. Letters
+# sent before a crash are already marked; the rest stay pending.
+@celery.task(ignore_result=True, acks_late=False)
+def redrive_dead_letters(customer_id: int, site: str | None = None, error_class: str | None = None,
+                         rate: float = 10.0, limit: int = 1000) -> int:
+    """
+    Re-drives a customer's pending dead letters in paced batches (see
+    redrive.redrive). Sent by the web API's /api/dead-letters/redrive.
+
+    Returns:
+        The number of tasks enqueued.
+    """
+    from redrive import redrive
+
+    return redrive(site=site, error_class=error_class, rate=rate, limit=limit, customer_id=customer_id)
+
+
+@celery.task(ignore_result=True)
+def rebalance_affinity() -> None:
+    """
+    Assigns each host shard queue to exactly one live worker.
+
+    Workers serving a base queue (e.g. 'momentum') form a consistent-hash
+    ring; every shard queue of that base is consumed by the worker the ring
+    maps it to. Workers are told to add or cancel consumers only for shards
+    whose owner changed, so a join or leave moves roughly 1/N of the hosts.
+    """
+    if not AFFINITY_SHARDS:
+        return
+
+    active = celery.control.inspect(timeout=2.0).active_queues() or {}
+    consuming = {worker: {q["name"] for q in queues} for worker, queues in active.items()}
+
+    for base in AFFINITY_QUEUES:
+        members = sorted(w for w, names in consuming.items() if base in names)
+        if not members:
+            logging.warning("No live workers serve queue %s; shards left unassigned", base)
+            continue
+        ring = HashRing(members)
+        for shard in shard_queues(base):
+            owner = ring.get_node(shard)
+            if shard not in consuming[owner]:
+                celery.control.add_consumer(shard, destination=[owner])
+                logging.info("Affinity: %s → %s", shard, owner)
+            for worker in members:
+                if worker != owner and shard in consuming[worker]:
+                    celery.control.cancel_consumer(shard, destination=[worker])
+
+
+@worker_ready.connect
+def _rebalance_on_join(sender=None, **kwargs) -> None:
+    """Triggers a rebalance as soon as a worker comes online."""
+    rebalance_affinity.delay()
 
 
-# Beat schedule — runs daily at 03:00
+# Beat schedule — stale refresh daily at 03:00; affinity rebalance every minute
+# so shards held by a worker that disappeared are picked up by the others.
 celery.conf.beat_schedule = {
     "refresh-stale-queues": {
         "task": "scheduler.enqueue_stale_credentials",
         "schedule": crontab(hour=3, minute=0),
-    }
+    },
+    "rebalance-affinity": {
+        "task": "scheduler.rebalance_affinity",
+        "schedule": 60.0,
+    },
 }
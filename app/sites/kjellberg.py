@@ -15,32 +15,21 @@ Login flow:
 import datetime
 import html as html_module
 import logging
-import os
 import re
 from typing import Tuple
 from urllib.parse import urljoin
 
 import requests
 
+from utils import events
+from utils.cache import ttl_cache
 from utils.db import get_connection
 from utils.crypto import decrypt_password
-
-LOG_DIR = "logs"
-os.makedirs(LOG_DIR, exist_ok=True)
-log_filename = datetime.date.today().strftime("%Y-%m-%d") + ".log"
-log_path = os.path.join(LOG_DIR, log_filename)
-logging.basicConfig(
-    filename=log_path,
-    level=logging.INFO,
-    format='[%(asctime)s] %(message)s',
-    datefmt='%H:%M:%S'
-)
-from zoneinfo import ZoneInfo as _ZI
-logging.Formatter.converter = staticmethod(
-    lambda ts: datetime.datetime.fromtimestamp(ts, tz=_ZI("Europe/Stockholm")).timetuple()
-)
+from utils.http import new_session
+from utils.timing import phase
 
 
+@ttl_cache()
 def fetch_site(site: str) -> str:
     """
     Returns the base_url for the given site identifier.
@@ -213,6 +202,19 @@ def login(session: requests.Session, base_url: str, username: str, password: str
     return False
 
 
+_FIELD_RE = re.compile(
+    r'<span[^>]*object-description-type[^>]*>([^<]+)</span>\s*:\s*'
+    r'<p[^>]*>\s*([^<]+?)\s*</p>',
+    re.IGNORECASE,
+)
+_NAME_RE = re.compile(
+    r'<p[^>]*user-activity-description-cc[^>]*>\s*([^<]+?)\s*</p>',
+    re.IGNORECASE,
+)
+# Each queue is a list-group-object div — split on those boundaries
+_QUEUE_SPLIT_RE = re.compile(r'(?=<div[^>]*list-group-object)', re.IGNORECASE)
+
+
 def _parse_int(s: str) -> int | None:
     """Parses a Swedish-formatted integer string (e.g. '1\xa0520', '2 944')."""
     try:
@@ -233,71 +235,70 @@ def get_queue_info(session: requests.Session, base_url: str):
         Tuple[int | None, list]: (total_points, queue_details list)
     """
     try:
-        resp = session.get(f"{base_url}/mina-sidor/", timeout=15)
-        html = resp.text
-
-        FIELD_RE = re.compile(
-            r'<span[^>]*object-description-type[^>]*>([^<]+)</span>\s*:\s*'
-            r'<p[^>]*>\s*([^<]+?)\s*</p>',
-            re.IGNORECASE,
-        )
-        NAME_RE = re.compile(
-            r'<p[^>]*user-activity-description-cc[^>]*>\s*([^<]+?)\s*</p>',
-            re.IGNORECASE,
-        )
-
-        # Each queue is a list-group-object div — split on those boundaries
-        chunks = re.split(r'(?=<div[^>]*list-group-object)', html, flags=re.IGNORECASE)
-
-        queues = []
-        for chunk in chunks:
-            name_match = NAME_RE.search(chunk)
-            raw_name = html_module.unescape(name_match.group(1)).strip() if name_match else None
-            # "Sök lägenhet" → "Lägenhet", "Sök studentlägenhet" → "Studentlägenhet"
-            section_name = re.sub(r'^[Ss]ök\s+', '', raw_name).capitalize() if raw_name else None
-
-            fields = {
-                html_module.unescape(k.strip()): html_module.unescape(v.strip())
-                for k, v in FIELD_RE.findall(chunk)
-            }
-            if not fields:
-                continue
-
-            # Prefer Poäng
-            poang_str = next((v for k, v in fields.items() if "poäng" in k.lower()), None)
-            if poang_str:
-                pts = _parse_int(poang_str)
-                if pts is not None:
-                    name = section_name or f"Kö {len(queues) + 1}"
-                    logging.info(" - %s: %d poäng", name, pts)
-                    queues.append({"name": name, "points": pts, "unit": "poäng"})
-                    continue
-
-            # Fall back to days from Ködatum
-            kodatum_str = next((v for k, v in fields.items() if "datum" in k.lower()), None)
-            if kodatum_str:
-                try:
-                    kodatum = datetime.date.fromisoformat(kodatum_str)
-                    days = (datetime.date.today() - kodatum).days
-                    name = section_name or f"Kö {len(queues) + 1}"
-                    logging.info(" - %s: %d dagar i kö", name, days)
-                    queues.append({"name": name, "points": days, "unit": "dagar i kö"})
-                except ValueError:
-                    pass
-
-        if not queues:
-            logging.info("🔍 No queue data found on /mina-sidor/")
-            return None, []
-
-        total = sum(q["points"] for q in queues)
-        logging.info("🔍 Total: %d across %d queue(s)", total, len(queues))
-        return total, queues
-
+        with phase("queue_page"):
+            resp = session.get(f"{base_url}/mina-sidor/", timeout=15)
+            html = resp.text
+        with phase("parse"):
+            return _parse_queue_page(html)
     except requests.RequestException as e:
         logging.warning("⚠️ Could not fetch queue info: %s", e)
         return None, []
 
 
+def _parse_queue_page(html: str):
+    """
+    Extracts queues from the Mina sidor HTML.
+
+    Returns:
+        Tuple[int | None, list]: (total_points, queue_details list)
+    """
+    chunks = _QUEUE_SPLIT_RE.split(html)
+
+    queues = []
+    for chunk in chunks:
+        name_match = _NAME_RE.search(chunk)
+        raw_name = html_module.unescape(name_match.group(1)).strip() if name_match else None
+        # "Sök lägenhet" → "Lägenhet", "Sök studentlägenhet" → "Studentlägenhet"
+        section_name = re.sub(r'^[Ss]ök\s+', '', raw_name).capitalize() if raw_name else None
+
+        fields = {
+            html_module.unescape(k.strip()): html_module.unescape(v.strip())
+            for k, v in _FIELD_RE.findall(chunk)
+        }
+        if not fields:
+            continue
+
+        # Prefer Poäng
+        poang_str = next((v for k, v in fields.items() if "poäng" in k.lower()), None)
+        if poang_str:
+            pts = _parse_int(poang_str)
+            if pts is not None:
+                name = section_name or f"Kö {len(queues) + 1}"
+                logging.info(" - %s: %d poäng", name, pts)
+                queues.append({"name": name, "points": pts, "unit": "poäng"})
+                continue
+
+        # Fall back to days from Ködatum
+        kodatum_str = next((v for k, v in fields.items() if "datum" in k.lower()), None)
+        if kodatum_str:
+            try:
+                kodatum = datetime.date.fromisoformat(kodatum_str)
+                days = (datetime.date.today() - kodatum).days
+                name = section_name or f"Kö {len(queues) + 1}"
+                logging.info(" - %s: %d dagar i kö", name, days)
+                queues.append({"name": name, "points": days, "unit": "dagar i kö"})
+            except ValueError:
+                pass
+
+    if not queues:
+        logging.info("🔍 No queue data found on /mina-sidor/")
+        return None, []
+
+    total = sum(q["points"] for q in queues)
+    logging.info("🔍 Total: %d across %d queue(s)", total, len(queues))
+    return total, queues
+
+
 def logout(session: requests.Session, base_url: str) -> None:
     """Logs out by calling the logout endpoint."""
     try:
@@ -308,24 +309,29 @@ def logout(session: requests.Session, base_url: str) -> None:
 
 
 
-def run(site: str, customer_id: int = 1) -> None:
+def run(site: str, customer_id: int = 1) -> bool:
     """
     Main runner for a Vitec Arena site: login, record timestamp, logout.
 
     Args:
         site (str): The site's url_name identifier.
         customer_id (int): The credential owner's ID. Defaults to 1 for legacy use.
+
+    Returns:
+        bool: True if the login succeeded, False otherwise.
     """
     logging.info("*********** %s (Vitec Arena) ***********", site)
 
     try:
-        base_url = fetch_site(site)
-        username, password = fetch_credentials(site, customer_id)
+        with phase("db.site"):
+            base_url = fetch_site(site)
+        with phase("db.credentials"):
+            username, password = fetch_credentials(site, customer_id)
     except LookupError as e:
         logging.error("❌ %s", e)
-        return
+        return False
 
-    session = requests.Session()
+    session = new_session()
     session.headers.update({
         "User-Agent": (
             "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -335,35 +341,44 @@ def run(site: str, customer_id: int = 1) -> None:
         "Accept-Language": "sv,en-US;q=0.9,en;q=0.8",
     })
 
+    ok = False
     try:
-        if login(session, base_url, username, password):
-            conn = get_connection()
-            cursor = conn.cursor()
-            cursor.execute(
-                "UPDATE credentials SET last_login=NOW() WHERE site=%s AND customer_id=%s",
-                (site, customer_id)
-            )
-            conn.commit()
-            cursor.close()
-            conn.close()
-
-            points, details = get_queue_info(session, base_url)
-            if points is not None or details:
-                import json
+        with phase("login"):
+            logged_in = login(session, base_url, username, password)
+        if logged_in:
+            ok = True
+            with phase("db.update"):
                 conn = get_connection()
                 cursor = conn.cursor()
                 cursor.execute(
-                    "UPDATE credentials SET queue_points=%s, queue_details=%s "
-                    "WHERE site=%s AND customer_id=%s",
-                    (points, json.dumps(details, ensure_ascii=False), site, customer_id)
+                    "UPDATE credentials SET last_login=NOW() WHERE site=%s AND customer_id=%s",
+                    (site, customer_id)
                 )
                 conn.commit()
                 cursor.close()
                 conn.close()
-            logout(session, base_url)
+
+            points, details = get_queue_info(session, base_url)
+            events.set_result(points, details)
+            if points is not None or details:
+                import json
+                with phase("db.update"):
+                    conn = get_connection()
+                    cursor = conn.cursor()
+                    cursor.execute(
+                        "UPDATE credentials SET queue_points=%s, queue_details=%s "
+                        "WHERE site=%s AND customer_id=%s",
+                        (points, json.dumps(details, ensure_ascii=False), site, customer_id)
+                    )
+                    conn.commit()
+                    cursor.close()
+                    conn.close()
+            with phase("logout"):
+                logout(session, base_url)
         else:
             logging.error("❌ Skipping %s due to login failure.", site)
     except requests.RequestException as e:
         logging.error("⚠️ Network error for %s: %s", site, e)
 
     logging.info("*********** %s (Vitec Arena) ***********", site)
+    return ok
@@ -12,7 +12,6 @@ Used by main.py to automate queue maintenance across multiple sites.
 """
 
 from typing import Tuple
-import os
 import base64
 import hashlib
 import secrets
@@ -20,24 +19,13 @@ import datetime
 import logging
 
 import requests
+from utils import events
+from utils.cache import ttl_cache
 from utils.db import get_connection, get_setting
 from utils.crypto import decrypt_password
-from utils.momentum_client import MomentumClient
-
-LOG_DIR = "logs"
-os.makedirs(LOG_DIR, exist_ok=True)
-log_filename = datetime.date.today().strftime("%Y-%m-%d") + ".log"
-log_path = os.path.join(LOG_DIR, log_filename)
-logging.basicConfig(
-    filename=log_path,
-    level=logging.INFO,
-    format='[%(asctime)s] %(message)s',
-    datefmt='%H:%M:%S'
-)
-from zoneinfo import ZoneInfo as _ZI
-logging.Formatter.converter = staticmethod(
-    lambda ts: datetime.datetime.fromtimestamp(ts, tz=_ZI("Europe/Stockholm")).timetuple()
-)
+from utils.momentum_client import MomentumClient, momentum_base_url
+from utils.timing import phase
+
 
 def fetch_credentials(site: str, customer_id: int) -> Tuple[str, str]:
     """
@@ -70,6 +58,7 @@ def fetch_credentials(site: str, customer_id: int) -> Tuple[str, str]:
     return result["username"], decrypt_password(result["password"])
 
 
+@ttl_cache()
 def get_site(site: str) -> str:
     """
     Retrieves the Momentum API ID for a given site.
@@ -114,7 +103,8 @@ def generate_pkce() -> Tuple[str, str]:
     return code_challenge
 
 
-def login(username: str, password: str, url_name: str, base_url: str) -> str | None:
+def login(username: str, password: str, url_name: str, base_url: str,
+          session: requests.Session | None = None) -> str | None:
     """
     Logs in using OAuth2 + PKCE.
 
@@ -123,6 +113,8 @@ def login(username: str, password: str, url_name: str, base_url: str) -> str | N
         password (str): The user's password.
         url_name (str): Site's identifier (e.g. 'kbab').
         base_url (str): The Momentum API base URL.
+        session (requests.Session, optional): Session to send the request on,
+            so the connection is reused for the calls that follow.
 
     Returns:
         str | None: The access token if successful, else None.
@@ -143,7 +135,8 @@ def login(username: str, password: str, url_name: str, base_url: str) -> str | N
         "requestRefreshToken": True
     }
 
-    response = requests.post(f"{base_url}/auth", json=payload, timeout=10)
+    http = session or requests
+    response = http.post(f"{base_url}/auth", json=payload, timeout=10)
     data = response.json()
 
     if "completed" in data:
@@ -166,13 +159,24 @@ def get_points(client: MomentumClient, url_name: str):
     Returns:
         Tuple[int | None, list]: Total points (or None) and per-queue detail list.
     """
-    resp = client.get("/market/applicant/status")
+    with phase("status"):
+        resp = client.get("/market/applicant/status")
     if resp.status_code != 200:
         logging.error("❌ Could not retrieve points from %s: %s", url_name, resp.status_code)
         logging.error(resp.text)
         return None, []
 
-    data = resp.json()
+    with phase("parse"):
+        return _parse_queues(resp.json())
+
+
+def _parse_queues(data: dict):
+    """
+    Converts an /market/applicant/status payload into points per queue.
+
+    Returns:
+        Tuple[int | None, list]: Total points (or None) and per-queue detail list.
+    """
     logging.info("🔍 Queue Points:")
     total = 0
     queues = []
@@ -224,59 +228,72 @@ def logout(client: MomentumClient, url_name: str) -> None:
         logging.error("⚠️ Logout from %s failed (%s): %s", url_name, resp.status_code, resp.text)
 
 
-def run(site: str, customer_id: int = 1) -> None:
+def run(site: str, customer_id: int = 1) -> bool:
     """
     Main runner for a given site: login, retrieve queue points, logout.
 
     Args:
         site (str): The site's identifier.
         customer_id (int): The user's credential ID. Defaults to 1 for legacy use.
+
+    Returns:
+        bool: True if the login succeeded, False if it was rejected or the
+        site is not configured.
     """
     url_name = site
-    momentum_id = get_site(site)
+    with phase("db.site"):
+        momentum_id = get_site(site)
     if not momentum_id:
         logging.error("❌ %s has no Momentum ID configured — edit the site and fill in the Momentum ID.", url_name)
-        return
-    api_key = get_setting("momentum_api_key")
+        return False
+    with phase("db.settings"):
+        api_key = get_setting("momentum_api_key")
     if not api_key:
         logging.error("❌ Momentum API key is not set — go to Settings and enter the API key.")
-        return
-    base_url = f"https://{url_name}-fastighet.momentum.se/Prod/{momentum_id}/PmApi/v2"
-    username, password = fetch_credentials(url_name, customer_id=customer_id)
+        return False
+    base_url = momentum_base_url(url_name, momentum_id)
+    with phase("db.credentials"):
+        username, password = fetch_credentials(url_name, customer_id=customer_id)
     logging.info("*********** %s ***********", url_name)
-    token = login(username, password, url_name, base_url)
-    if not token:
-        return
-
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "UPDATE credentials SET last_login=NOW() WHERE site=%s AND customer_id=%s",
-        (url_name, customer_id)
-    )
-    conn.commit()
-    cursor.close()
-    conn.close()
-
     client = MomentumClient(base_url=base_url, api_key=api_key)
-    client.set_token(token)
+    with phase("auth"):
+        token = login(username, password, url_name, base_url, session=client.session)
+    if not token:
+        return False
 
-    points, queues = get_points(client, url_name)
-    if points is not None or queues:
-        import json
+    with phase("db.update"):
         conn = get_connection()
         cursor = conn.cursor()
         cursor.execute(
-            "UPDATE credentials SET queue_points=%s, queue_details=%s "
-            "WHERE site=%s AND customer_id=%s",
-            (points, json.dumps(queues, ensure_ascii=False), url_name, customer_id)
+            "UPDATE credentials SET last_login=NOW() WHERE site=%s AND customer_id=%s",
+            (url_name, customer_id)
         )
         conn.commit()
         cursor.close()
         conn.close()
 
-    logout(client, url_name)
+    client.set_token(token)
+
+    points, queues = get_points(client, url_name)
+    events.set_result(points, queues)
+    if points is not None or queues:
+        import json
+        with phase("db.update"):
+            conn = get_connection()
+            cursor = conn.cursor()
+            cursor.execute(
+                "UPDATE credentials SET queue_points=%s, queue_details=%s "
+                "WHERE site=%s AND customer_id=%s",
+                (points, json.dumps(queues, ensure_ascii=False), url_name, customer_id)
+            )
+            conn.commit()
+            cursor.close()
+            conn.close()
+
+    with phase("logout"):
+        logout(client, url_name)
     logging.info("*********** %s ***********", url_name)
+    return True
 
 if __name__ == "__main__":
     run(site="")
@@ -2,36 +2,185 @@
 Celery tasks for QueuePilot.
 
 Contains the login_credential task that performs a single housing queue
-login for a specific (site, customer_id) credential pair.
+login for one credential, identified by its compact credentials.id. Messages
+queued before credential IDs, as (site, customer_id, system_type), are still
+accepted and resolved to the credential's ID.
 """
 
+import datetime
 import logging
+import time
+from typing import Dict, List
+
+from celery.signals import worker_process_shutdown
+
 from celery_app import celery
 from handlers import HANDLERS
+from utils import events
+from utils.db import get_connection
+from utils.dead_letters import record_dead_letter
+from utils.metrics import LOGINS_IN_FLIGHT, QUEUE_WAIT_SECONDS
+from utils.outcomes import recorder, OK, FAILED, ERROR
+from utils.profiling import profile_task
+from utils.tracing import PUBLISHED_AT_HEADER, TRACEPARENT_HEADER, record_span, start_trace
+
+
+def fetch_credential(credential_id: int) -> Dict:
+    """
+    Resolves a credential ID to its site, customer_id and system_type.
+
+    Raises:
+        LookupError: If the credential no longer exists.
+    """
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute(
+        "SELECT c.site, c.customer_id, s.system_type "
+        "FROM credentials c JOIN sites s ON s.url_name = c.site "
+        "WHERE c.id = %s",
+        (credential_id,)
+    )
+    row = cursor.fetchone()
+    cursor.close()
+    conn.close()
+    if not row:
+        raise LookupError(f"Credential {credential_id} not found")
+    return row
+
+
+def credential_id_for(site: str, customer_id: int) -> int:
+    """
+    Resolves a (site, customer_id) pair, as sent by older producers, to its
+    credentials.id.
+
+    Raises:
+        LookupError: If the credential no longer exists.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT id FROM credentials WHERE site = %s AND customer_id = %s",
+        (site, customer_id)
+    )
+    row = cursor.fetchone()
+    cursor.close()
+    conn.close()
+    if not row:
+        raise LookupError(f"Credential for {site} / customer_id={customer_id} not found")
+    return row[0]
+
+
+def _header(request, name: str):
+    """Reads a custom message header from a task request."""
+    value = request.get(name)
+    if value is None:
+        value = (request.headers or {}).get(name)
+    return value
 
 
 @celery.task(bind=True, max_retries=3, default_retry_delay=120)
-def login_credential(self, site: str, customer_id: int, system_type: str) -> str:
+def login_credential(self, credential_id: int | str, *legacy_args,
+                     attempts: List[Dict] | None = None, run_id: str | None = None) -> None:
     """
     Logs in to a single housing queue site for a specific user credential.
 
-    Retries up to 3 times with a 120-second delay on failure.
+    Retries up to 3 times with a 120-second delay on failure. Once retries are
+    exhausted the task is recorded in the dead_letters table (see redrive.py).
+    Every attempt's outcome is written to run_outcomes, and the attempt
+    continues the trace started by whoever enqueued it.
 
-    Args:
-        site: The site url_name (e.g. 'kbab').
-        customer_id: The credential owner's ID.
-        system_type: 'momentum', 'vitec', or 'kjellberg'.
+    A run started from the web UI (run_id) counts the first attempt's outcome,
+    so it finishes without waiting for retries; retries carry on outside it.
 
-    Returns:
-        A status string logged on completion.
+    Messages queued before credential IDs (retries, ETA tasks and re-drives
+    sent by older code) carry (site, customer_id, system_type) instead; the
+    site arrives as credential_id and the rest in legacy_args.
+
+    Args:
+        credential_id: The credentials.id to log in with, or a legacy site.
+        legacy_args: customer_id and system_type of a legacy message.
+        attempts: Timings of previous failed attempts, carried across retries.
+        run_id: The web-started run this login belongs to, if any.
     """
-    handler = HANDLERS.get(system_type)
-    if not handler:
-        raise ValueError(f"Unknown system_type '{system_type}' for site '{site}'")
-
-    try:
-        handler(site, customer_id)
-        return f"ok:{site}:{customer_id}"
-    except Exception as exc:
-        logging.exception("login_credential failed for %s customer %s", site, customer_id)
-        raise self.retry(exc=exc)
+    received = time.time()
+    with start_trace(
+        "login_credential",
+        traceparent=_header(self.request, TRACEPARENT_HEADER),
+        credential_id=credential_id,
+        retries=self.request.retries,
+    ) as trace:
+        try:
+            if isinstance(credential_id, str):
+                credential_id = credential_id_for(credential_id, legacy_args[0])
+                trace.set("credential_id", credential_id)
+            cred = fetch_credential(credential_id)
+        except LookupError:
+            logging.warning("login_credential: credential %s no longer exists", credential_id)
+            if run_id:
+                events.run_login_finished(run_id, ERROR)
+            return
+        except Exception as exc:
+            if run_id:
+                events.run_login_finished(run_id, ERROR)
+            raise self.retry(exc=exc, kwargs={"attempts": attempts})
+
+        site, customer_id, system_type = cred["site"], cred["customer_id"], cred["system_type"]
+        trace.set("site", site)
+        trace.set("system_type", system_type)
+
+        # Broker wait; skipped for delayed messages (retries, re-drives) whose wait is intended
+        published_at = _header(self.request, PUBLISHED_AT_HEADER)
+        if published_at and not self.request.eta:
+            QUEUE_WAIT_SECONDS.labels(system_type).observe(received - float(published_at))
+            record_span("broker.wait", float(published_at), received)
+
+        try:
+            handler = HANDLERS.get(system_type)
+        except ImportError:
+            if run_id:
+                events.run_login_finished(run_id, ERROR)
+            raise
+        if not handler:
+            if run_id:
+                events.run_login_finished(run_id, ERROR)
+            raise ValueError(f"Unknown system_type '{system_type}' for site '{site}'")
+
+        started_at = datetime.datetime.now(datetime.timezone.utc)
+        started = time.monotonic()
+        in_flight = LOGINS_IN_FLIGHT.labels()
+        in_flight.inc()
+        try:
+            with profile_task(f"login_credential-{site}"), \
+                    events.login_progress(site, customer_id, system_type) as progress:
+                try:
+                    ok = handler(site, customer_id)
+                except Exception:
+                    progress.status = ERROR
+                    raise
+                progress.status = OK if ok else FAILED
+            recorder.record(site, customer_id, system_type, progress.status, time.monotonic() - started)
+            if run_id:
+                events.run_login_finished(run_id, progress.status)
+        except Exception as exc:
+            duration = time.monotonic() - started
+            recorder.record(site, customer_id, system_type, ERROR, duration, type(exc).__name__)
+            if run_id:
+                events.run_login_finished(run_id, ERROR)
+            logging.exception("login_credential failed for %s customer %s", site, customer_id)
+            attempts = (attempts or []) + [{
+                "started_at": started_at.isoformat(timespec="seconds"),
+                "duration": round(duration, 3),
+                "error": type(exc).__name__,
+            }]
+            if self.request.retries >= self.max_retries:
+                record_dead_letter(site, customer_id, system_type, exc, attempts)
+                raise
+            raise self.retry(exc=exc, kwargs={"attempts": attempts})
+        finally:
+            in_flight.dec()
+
+
+@worker_process_shutdown.connect
+def _flush_outcomes(**kwargs) -> None:
+    """Prefork children exit through os._exit, skipping the recorder's atexit flush."""
+    recorder.flush()
@@ -0,0 +1,75 @@
+"""
+Host Affinity Utility Module
+
+Maps each login's target portal host to one of a fixed set of shard queues,
+and assigns those shard queues to live workers with a consistent-hash ring.
+When a worker joins or leaves, only the shards owned by that worker move, so
+every other worker keeps its warm connections and caches.
+"""
+
+import bisect
+import hashlib
+import os
+from typing import Iterable, List
+from urllib.parse import urlparse
+
+from utils.momentum_client import momentum_base_url
+
+# Shard queues per affinity-enabled queue (e.g. momentum.s0 … momentum.s7).
+# 0 disables host-affinity routing.
+AFFINITY_SHARDS = int(os.getenv("AFFINITY_SHARDS", "8"))
+VIRTUAL_NODES = 64
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """
+    Consistent-hash ring over a set of node names, with virtual nodes so
+    keys spread evenly even with few members.
+    """
+
+    def __init__(self, nodes: Iterable[str], vnodes: int = VIRTUAL_NODES):
+        self._ring: List[tuple] = sorted(
+            (_hash(f"{node}#{i}"), node) for node in set(nodes) for i in range(vnodes)
+        )
+        self._keys = [h for h, _ in self._ring]
+
+    def __bool__(self) -> bool:
+        return bool(self._ring)
+
+    def get_node(self, key: str) -> str:
+        """
+        Returns the node owning `key`.
+
+        Raises:
+            LookupError: If the ring has no nodes.
+        """
+        if not self._ring:
+            raise LookupError("Hash ring is empty")
+        idx = bisect.bisect(self._keys, _hash(key)) % len(self._ring)
+        return self._ring[idx][1]
+
+
+def shard_queues(queue: str) -> List[str]:
+    """Returns every shard queue name for a base queue."""
+    return [f"{queue}.s{i}" for i in range(AFFINITY_SHARDS)]
+
+
+def shard_queue(queue: str, host: str) -> str:
+    """Returns the stable shard queue a target host's logins go to."""
+    return f"{queue}.s{_hash(host) % AFFINITY_SHARDS}"
+
+
+def target_host(system_type: str, url_name: str, momentum_id: str | None, base_url: str | None) -> str | None:
+    """
+    Returns the portal hostname a credential's login talks to, or None if
+    it cannot be determined from the site row.
+    """
+    if system_type == "momentum":
+        if not momentum_id:
+            return None
+        return urlparse(momentum_base_url(url_name, momentum_id)).hostname
+    return urlparse(base_url).hostname if base_url else None
@@ -0,0 +1,53 @@
+"""
+Cache Utility Module
+
+Small per-process caches for data that changes rarely but is read on every
+login (site metadata, settings). Each worker process keeps its own copy, so
+routing a host's logins to the same worker keeps these warm.
+"""
+
+import functools
+import os
+import threading
+import time
+from typing import Callable, TypeVar
+
+T = TypeVar("T")
+
+DEFAULT_TTL = int(os.getenv("SITE_CACHE_TTL", "300"))
+
+
+def ttl_cache(ttl: int = DEFAULT_TTL) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """
+    Memoizes a function's return value per positional arguments for `ttl` seconds.
+
+    Exceptions are not cached. The wrapped function gets a `cache_clear()`
+    method, mirroring functools.lru_cache.
+
+    Args:
+        ttl (int): Seconds a cached value stays valid. 0 disables caching.
+    """
+    def decorator(func: Callable[..., T]) -> Callable[..., T]:
+        entries: dict = {}
+        lock = threading.Lock()
+
+        @functools.wraps(func)
+        def wrapper(*args):
+            if ttl <= 0:
+                return func(*args)
+            now = time.monotonic()
+            hit = entries.get(args)
+            if hit is not None and hit[0] > now:
+                return hit[1]
+            value = func(*args)
+            with lock:
+                entries[args] = (now + ttl, value)
+            return value
+
+        def cache_clear() -> None:
+            with lock:
+                entries.clear()
+
+        wrapper.cache_clear = cache_clear
+        return wrapper
+    return decorator
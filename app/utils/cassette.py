@@ -0,0 +1,320 @@
+"""
+HTTP Cassette Utility Module
+
+Records what the portals return and plays it back, so parse or performance
+problems seen in production can be reproduced offline against exactly the
+same responses.
+
+- record(dir): every request sent through utils.http sessions (MomentumClient,
+  the Vitec session, ...) is saved with its response and timing to
+  <dir>/<pid>-<timestamp>.jsonl.gz, one JSON object per line.
+- replay(dir, speed): sessions are served from the recorded files instead of
+  the network. speed 1.0 waits the recorded time per request, 2.0 half of it,
+  0 not at all.
+
+Recordings are scrubbed before they touch the disk: credentials and tokens in
+request bodies are replaced, and their values are remembered and removed from
+everything recorded after them (URLs, headers, response bodies). Token-like
+JSON fields, anti-forgery/ViewState fields and cookie values are scrubbed too.
+Request headers are never stored.
+
+Set HTTP_RECORD_DIR to record on Celery workers.
+"""
+
+import atexit
+import base64
+import collections
+import gzip
+import io
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Dict, Iterable
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPResponse
+
+from utils import http
+from utils.http import InstrumentedAdapter
+
+RECORD_DIR = os.getenv("HTTP_RECORD_DIR", "")
+
+SCRUBBED = "***"
+# JSON and form fields whose values are secrets, matched case-insensitively
+_SECRET_FIELD_RE = re.compile(
+    r"(pass|pwd|key$|token|secret|identifier|userid|username|^log$|viewstate|eventvalidation"
+    r"|codechallenge|nonce|^state$|^code$|session)",
+    re.IGNORECASE,
+)
+_HIDDEN_INPUT_RE = re.compile(
+    r'(<input[^>]*name="(?:__RequestVerificationToken|__VIEWSTATE|__EVENTVALIDATION)"[^>]*value=")[^"]*(")',
+    re.IGNORECASE,
+)
+_KEPT_HEADERS = ("content-type", "location", "set-cookie", "retry-after")
+_MIN_SECRET_LENGTH = 6
+
+
+def _secret_field(name: str) -> bool:
+    return bool(_SECRET_FIELD_RE.search(name))
+
+
+class Scrubber:
+    """Removes credentials and tokens from recorded data."""
+
+    def __init__(self):
+        self._secrets: set = set()
+        self._lock = threading.Lock()
+
+    def remember(self, values: Iterable) -> None:
+        """Adds values to be replaced wherever they appear later on."""
+        with self._lock:
+            self._secrets.update(
+                str(v) for v in values if v is not None and len(str(v)) >= _MIN_SECRET_LENGTH
+            )
+
+    def text(self, value: str) -> str:
+        with self._lock:
+            secrets = sorted(self._secrets, key=len, reverse=True)
+        for secret in secrets:
+            if secret in value:
+                value = value.replace(secret, SCRUBBED)
+        return value
+
+    def json_value(self, value, harvest: bool = False):
+        """Scrubs secret fields in a decoded JSON document (recursively)."""
+        if isinstance(value, dict):
+            out = {}
+            for k, v in value.items():
+                if _secret_field(k) and isinstance(v, (str, int, float)) and not isinstance(v, bool):
+                    if harvest and isinstance(v, str):
+                        self.remember([v])
+                    out[k] = SCRUBBED
+                else:
+                    out[k] = self.json_value(v, harvest)
+            return out
+        if isinstance(value, list):
+            return [self.json_value(v, harvest) for v in value]
+        return value
+
+    def form(self, body: str, harvest: bool = False) -> str:
+        pairs = parse_qsl(body, keep_blank_values=True)
+        if harvest:
+            self.remember(v for k, v in pairs if _secret_field(k))
+        return urlencode([(k, SCRUBBED if _secret_field(k) and v else v) for k, v in pairs])
+
+    def url(self, url: str) -> str:
+        parts = urlsplit(url)
+        if parts.query:
+            query = urlencode([
+                (k, SCRUBBED if _secret_field(k) else v)
+                for k, v in parse_qsl(parts.query, keep_blank_values=True)
+            ])
+            parts = parts._replace(query=query)
+        return self.text(urlunsplit(parts))
+
+    def request_body(self, body, content_type: str) -> str | None:
+        """Scrubs a request body, remembering the secrets it carries."""
+        if body is None:
+            return None
+        if isinstance(body, bytes):
+            body = body.decode("utf-8", "replace")
+        if "json" in content_type:
+            try:
+                return json.dumps(self.json_value(json.loads(body), harvest=True), ensure_ascii=False)
+            except ValueError:
+                pass
+        elif "x-www-form-urlencoded" in content_type:
+            return self.form(body, harvest=True)
+        return self.text(body)
+
+    def response_body(self, content: bytes, content_type: str) -> bytes:
+        if "json" in content_type:
+            try:
+                data = self.json_value(json.loads(content), harvest=True)
+                return self.text(json.dumps(data, ensure_ascii=False)).encode()
+            except ValueError:
+                pass
+        try:
+            text = content.decode("utf-8")
+        except UnicodeDecodeError:
+            return content
+        return self.text(_HIDDEN_INPUT_RE.sub(rf"\g<1>{SCRUBBED}\g<2>", text)).encode()
+
+    def headers(self, headers) -> Dict[str, str]:
+        kept = {}
+        for name in _KEPT_HEADERS:
+            value = headers.get(name)
+            if value is None:
+                continue
+            if name == "set-cookie":
+                value = re.sub(r"(^|,\s*)([^=;,\s]+)=[^;]*", rf"\g<1>\g<2>={SCRUBBED}", value)
+            kept[name] = self.text(value)
+        return kept
+
+
+def _encode_body(content: bytes) -> dict:
+    try:
+        return {"body": content.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"body_b64": base64.b64encode(content).decode()}
+
+
+def _decode_body(entry: dict) -> bytes:
+    if "body_b64" in entry:
+        return base64.b64decode(entry["body_b64"])
+    return (entry.get("body") or "").encode("utf-8")
+
+
+class CassetteRecorder:
+    """Appends scrubbed exchanges to a per-process gzip JSON Lines file."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.scrubber = Scrubber()
+        self._lock = threading.Lock()
+        self._file = None
+        self._pid = None
+        atexit.register(self.close)
+
+    def _open(self):
+        # Opened lazily per process, so forked Celery children get their own file
+        if self._pid != os.getpid():
+            os.makedirs(self.directory, exist_ok=True)
+            name = f"{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S')}.jsonl.gz"
+            self._file = gzip.open(os.path.join(self.directory, name), "at", encoding="utf-8")
+            self._pid = os.getpid()
+        return self._file
+
+    def write(self, request: requests.PreparedRequest, response: requests.Response,
+              seconds: float) -> None:
+        scrub = self.scrubber
+        request_type = request.headers.get("Content-Type", "")
+        auth = request.headers.get("Authorization", "")
+        scrub.remember([auth.split(" ", 1)[-1]] if auth else [])
+        request_body = scrub.request_body(request.body, request_type)
+        response_type = response.headers.get("Content-Type", "")
+        entry = {
+            "method": request.method,
+            "url": scrub.url(request.url),
+            "request_body": request_body,
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": scrub.headers(response.headers),
+            "seconds": round(seconds, 4),
+            **_encode_body(scrub.response_body(response.content, response_type)),
+        }
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            fh = self._open()
+            fh.write(line)
+            fh.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None and self._pid == os.getpid():
+                self._file.close()
+            self._file = None
+            self._pid = None
+
+
+class RecordingAdapter(InstrumentedAdapter):
+    """InstrumentedAdapter that also records every exchange to a cassette."""
+
+    def __init__(self, recorder: CassetteRecorder, **kwargs):
+        super().__init__(**kwargs)
+        self.recorder = recorder
+
+    def send(self, request, **kwargs):
+        started = time.perf_counter()
+        response = super().send(request, **kwargs)
+        try:
+            response.content  # read now so the body is both recorded and returned
+            self.recorder.write(request, response, time.perf_counter() - started)
+        except Exception:
+            logging.exception("Could not record %s %s", request.method, request.url)
+        return response
+
+
+class Cassette:
+    """Recorded exchanges grouped by (method, scrubbed URL), served in order."""
+
+    def __init__(self, directory: str):
+        self.scrubber = Scrubber()
+        self._entries: Dict[tuple, collections.deque] = {}
+        self._last: Dict[tuple, dict] = {}
+        self._lock = threading.Lock()
+        files = sorted(f for f in os.listdir(directory) if f.endswith(".jsonl.gz"))
+        if not files:
+            raise FileNotFoundError(f"No cassette files (*.jsonl.gz) in {directory}")
+        for name in files:
+            with gzip.open(os.path.join(directory, name), "rt", encoding="utf-8") as fh:
+                for line in fh:
+                    if line.strip():
+                        entry = json.loads(line)
+                        key = (entry["method"], entry["url"])
+                        self._entries.setdefault(key, collections.deque()).append(entry)
+        self.size = sum(len(q) for q in self._entries.values())
+
+    def next(self, method: str, url: str) -> dict | None:
+        """
+        Returns the next recorded exchange for a request. Once a URL's
+        recordings are used up, its last one is served again.
+        """
+        key = (method, self.scrubber.url(url))
+        with self._lock:
+            queue = self._entries.get(key)
+            if queue:
+                self._last[key] = queue.popleft()
+            return self._last.get(key)
+
+
+class ReplayAdapter(HTTPAdapter):
+    """Serves responses from a Cassette instead of the network."""
+
+    def __init__(self, cassette: Cassette, speed: float = 1.0, **kwargs):
+        super().__init__(**kwargs)
+        self.cassette = cassette
+        self.speed = speed
+
+    def send(self, request, **kwargs):
+        entry = self.cassette.next(request.method, request.url)
+        if entry is None:
+            raise requests.ConnectionError(
+                f"No recorded response for {request.method} {request.url}", request=request
+            )
+        if self.speed > 0:
+            time.sleep(entry["seconds"] / self.speed)
+        content = _decode_body(entry)
+        headers = dict(entry["headers"])
+        headers["content-length"] = str(len(content))
+        raw = HTTPResponse(
+            body=io.BytesIO(content),
+            headers=headers,
+            status=entry["status"],
+            reason=entry.get("reason"),
+            preload_content=False,
+            decode_content=False,
+        )
+        return self.build_response(request, raw)
+
+
+def record(directory: str) -> CassetteRecorder:
+    """Records every request made through utils.http sessions from now on."""
+    recorder = CassetteRecorder(directory)
+    http.use_adapter(RecordingAdapter(recorder, pool_connections=http.POOL_HOSTS, pool_maxsize=http.POOL_SIZE))
+    logging.info("Recording HTTP exchanges to %s", directory)
+    return recorder
+
+
+def replay(directory: str, speed: float = 1.0) -> Cassette:
+    """Serves every request made through utils.http sessions from recordings."""
+    cassette = Cassette(directory)
+    http.use_adapter(ReplayAdapter(cassette, speed))
+    logging.info("Replaying %d recorded HTTP exchanges from %s (speed %s)", cassette.size, directory, speed or "max")
+    return cassette
+
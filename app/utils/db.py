@@ -2,11 +2,17 @@
 Database Utility Module
 
 Provides a helper function to connect to the MariaDB database using environment variables.
+Connections are wrapped so every query's count and duration land in the metrics registry.
 """
 
 import os
+import sys
 import mysql.connector
-from mysql.connector.connection import MySQLConnection
+
+from utils.cache import ttl_cache
+from utils.metrics import DB_QUERIES_TOTAL, DB_QUERY_SECONDS
+from utils.metrics_core import InstrumentedConnection
+from utils.tracing import span
 
 
 def ensure_schema() -> None:
@@ -53,13 +59,58 @@ def ensure_schema() -> None:
     cursor.execute(
         "INSERT IGNORE INTO settings (`key`, `value`) VALUES ('momentum_api_key', '')"
     )
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS dead_letters (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            site VARCHAR(100) NOT NULL,
+            customer_id INT NOT NULL,
+            system_type VARCHAR(50) NOT NULL,
+            error_class VARCHAR(200) NOT NULL,
+            error_message TEXT,
+            http_status INT DEFAULT NULL,
+            attempts TEXT NOT NULL,
+            created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            redriven_at DATETIME DEFAULT NULL,
+            INDEX idx_dead_letters_pending (redriven_at, site),
+            INDEX idx_dead_letters_error (error_class)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS run_outcomes (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            site VARCHAR(100) NOT NULL,
+            customer_id INT NOT NULL,
+            system_type VARCHAR(50) NOT NULL,
+            status VARCHAR(20) NOT NULL,
+            duration_ms INT NOT NULL,
+            error_class VARCHAR(200) DEFAULT NULL,
+            finished_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            INDEX idx_run_outcomes_site (site, finished_at),
+            INDEX idx_run_outcomes_customer (customer_id, finished_at)
+        )
+    """)
+    # Compact surrogate key so Celery messages can carry a single integer
+    cursor.execute(
+        "ALTER TABLE credentials "
+        "ADD COLUMN IF NOT EXISTS id INT NOT NULL AUTO_INCREMENT UNIQUE"
+    )
+    # Web API site list filters and keyset sorts
+    for index, table, columns in (
+        ("idx_sites_system_type", "sites", "system_type, url_name"),
+        ("idx_sites_fullname", "sites", "fullname, url_name"),
+        ("idx_credentials_last_login", "credentials", "customer_id, last_login, site"),
+        ("idx_credentials_points", "credentials", "customer_id, queue_points, site"),
+        ("idx_credentials_active", "credentials", "customer_id, active, site"),
+    ):
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {index} ON {table} ({columns})")
     conn.commit()
     cursor.close()
     conn.close()
 
 
+@ttl_cache(ttl=60)
 def get_setting(key: str) -> str:
-    """Returns the value for a global setting key, or '' if not set."""
+    """Returns the value for a global setting key, or '' if not set (cached for 60 s)."""
     conn = get_connection()
     cursor = conn.cursor()
     cursor.execute("SELECT `value` FROM settings WHERE `key` = %s", (key,))
@@ -69,20 +120,47 @@ def get_setting(key: str) -> str:
     return row[0] if row else ""
 
 
-def get_connection() -> MySQLConnection:
+def _use_pure() -> bool:
+    """
+    Whether to use the pure-Python MySQL protocol implementation.
+
+    The C extension does its socket I/O outside Python, so under a gevent
+    worker it would block every greenlet in the process. The pure driver goes
+    through the (monkey-patched) socket module and yields while waiting.
+    DB_USE_PURE=1/0 overrides the detection.
+    """
+    env = os.getenv("DB_USE_PURE")
+    if env is not None:
+        return env == "1"
+    monkey = sys.modules.get("gevent.monkey")
+    return bool(monkey and monkey.is_module_patched("socket"))
+
+
+def _observe_query(operation: str, seconds: float) -> None:
+    DB_QUERY_SECONDS.labels(operation).observe(seconds)
+    DB_QUERIES_TOTAL.labels(operation).inc()
+
+
+def _query_span(operation: str):
+    return span("db." + operation)
+
+
+def get_connection() -> InstrumentedConnection:
     """
     Establishes a connection to the MariaDB database using environment variables.
 
     Returns:
-        MySQLConnection: A live connection to the database.
+        InstrumentedConnection: A proxy for a live MySQLConnection that records
+        each query's count and duration (metrics and trace spans).
 
     Raises:
         KeyError: If any required environment variable is missing.
         mysql.connector.Error: If the connection fails.
     """
-    return mysql.connector.connect(
+    return InstrumentedConnection(mysql.connector.connect(
         host=os.environ["DB_HOST"],
         user=os.environ["DB_USER"],
         password=os.environ["DB_PASS"],
-        database=os.environ["DB_NAME"]
-    )
+        database=os.environ["DB_NAME"],
+        use_pure=_use_pure(),
+    ), _observe_query, _query_span)
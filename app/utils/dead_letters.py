@@ -0,0 +1,107 @@
+"""
+Dead-Letter Utility Module
+
+Records login tasks that exhausted their retries in the `dead_letters` table,
+and re-drives them back onto the login queues in rate-limited bursts.
+"""
+
+import json
+from typing import Dict, List
+
+from utils.db import get_connection
+
+
+def http_status_of(exc: BaseException) -> int | None:
+    """Returns the HTTP status attached to a requests exception, if any."""
+    response = getattr(exc, "response", None)
+    return getattr(response, "status_code", None)
+
+
+def record_dead_letter(site: str, customer_id: int, system_type: str,
+                       exc: BaseException, attempts: List[Dict]) -> None:
+    """
+    Stores an exhausted login task.
+
+    Args:
+        site: The site url_name.
+        customer_id: The credential owner's ID.
+        system_type: The site's platform type.
+        exc: The exception raised by the final attempt.
+        attempts: One dict per attempt with 'started_at', 'duration' and 'error'.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        "INSERT INTO dead_letters "
+        "(site, customer_id, system_type, error_class, error_message, http_status, attempts) "
+        "VALUES (%s,%s,%s,%s,%s,%s,%s)",
+        (
+            site, customer_id, system_type, type(exc).__name__, str(exc)[:2000],
+            http_status_of(exc), json.dumps(attempts),
+        )
+    )
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+
+def fetch_dead_letters(site: str | None = None, error_class: str | None = None,
+                       limit: int = 1000, customer_id: int | None = None) -> List[Dict]:
+    """
+    Returns pending (not yet re-driven) dead letters, oldest first.
+
+    Args:
+        site: Only return entries for this site.
+        error_class: Only return entries with this exception class name.
+        limit: Maximum number of rows.
+        customer_id: Only return entries for this customer (default: all).
+    """
+    where = ["d.redriven_at IS NULL"]
+    params: list = []
+    if customer_id is not None:
+        where.append("d.customer_id = %s")
+        params.append(customer_id)
+    if site:
+        where.append("d.site = %s")
+        params.append(site)
+    if error_class:
+        where.append("d.error_class = %s")
+        params.append(error_class)
+    params.append(limit)
+
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute(
+        f"""
+        SELECT d.id, d.site, d.customer_id, d.system_type, d.error_class,
+               d.error_message, d.http_status, d.attempts, d.created_at,
+               s.momentum_id, s.base_url, c.id AS credential_id
+        FROM dead_letters d
+        JOIN credentials c ON c.site = d.site AND c.customer_id = d.customer_id
+        LEFT JOIN sites s ON s.url_name = d.site
+        WHERE {" AND ".join(where)}
+        ORDER BY d.id
+        LIMIT %s
+        """,
+        tuple(params)
+    )
+    rows = cursor.fetchall()
+    cursor.close()
+    conn.close()
+    return rows
+
+
+def mark_redriven(ids: List[int]) -> None:
+    """Flags dead letters as re-driven so they are not sent again."""
+    if not ids:
+        return
+    conn = get_connection()
+    cursor = conn.cursor()
+    placeholders = ",".join(["%s"] * len(ids))
+    cursor.execute(
+        f"UPDATE dead_letters SET redriven_at = NOW() WHERE id IN ({placeholders})",
+        tuple(ids)
+    )
+    conn.commit()
+    cursor.close()
+    conn.close()
@@ -0,0 +1,220 @@
+"""
+Progress Events Utility Module
+
+Publishes run and login progress to Redis pub/sub, from which the web API's
+/api/events stream pushes them to open dashboards. Publishing is best effort:
+if Redis is unreachable, events are dropped (and retried after a pause)
+without slowing logins down.
+
+Channels:
+  - queuepilot:events             run started/finished (main.py runs)
+  - queuepilot:events:<customer>  per-credential login started/finished
+
+Handlers report what they scraped with set_result(); login_progress() sends
+it along with the outcome when the login finishes, and bumps the customer's
+dashboard generation (queuepilot:dashboard:<customer>:generation) so the web
+API's cached /api/sites and /api/status responses are rebuilt.
+
+Runs started from the web API (scheduler.enqueue_run) are tracked in Redis:
+queuepilot:run:<run_id> counts the run's finished logins per status, and the
+login that completes the count finishes the run. The web API holds
+queuepilot:customer:<customer>:active_run while a run is in progress and
+reads queuepilot:customer:<customer>:last_run for the dashboard.
+"""
+
+import contextlib
+import contextvars
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+from typing import Iterator
+
+import redis
+
+from utils.outcomes import ERROR, FAILED, OK
+
+EVENTS_REDIS_URL = os.getenv("EVENTS_REDIS_URL", os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+CHANNEL = "queuepilot:events"
+# Seconds to stop publishing after Redis could not be reached
+RETRY_AFTER = 30.0
+# Seconds a run's progress is kept after it starts
+RUN_TTL = 7 * 86400
+
+_client: redis.Redis | None = None
+_client_lock = threading.Lock()
+_disabled_until = 0.0
+_current: contextvars.ContextVar["LoginProgress | None"] = contextvars.ContextVar("login_progress", default=None)
+
+
+def customer_channel(customer_id: int) -> str:
+    """The pub/sub channel carrying a customer's login events."""
+    return f"{CHANNEL}:{customer_id}"
+
+
+def dashboard_key(customer_id: int) -> str:
+    """The counter the web API keys a customer's cached dashboard responses on."""
+    return f"queuepilot:dashboard:{customer_id}:generation"
+
+
+def _redis() -> redis.Redis:
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = redis.Redis.from_url(EVENTS_REDIS_URL, socket_timeout=1, socket_connect_timeout=1)
+        return _client
+
+
+def _now() -> str:
+    return datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds")
+
+
+def run_key(run_id: str) -> str:
+    """The hash holding a web-started run's progress."""
+    return f"queuepilot:run:{run_id}"
+
+
+def active_run_key(customer_id: int) -> str:
+    return f"queuepilot:customer:{customer_id}:active_run"
+
+
+def last_run_key(customer_id: int) -> str:
+    return f"queuepilot:customer:{customer_id}:last_run"
+
+
+def _send(command: str, *args, **kwargs) -> None:
+    global _disabled_until
+    if time.monotonic() < _disabled_until:
+        return
+    try:
+        getattr(_redis(), command)(*args, **kwargs)
+    except redis.RedisError as e:
+        _disabled_until = time.monotonic() + RETRY_AFTER
+        logging.warning("Progress events paused for %.0fs: %s", RETRY_AFTER, e)
+
+
+def publish(channel: str, event: dict) -> None:
+    """Publishes one event as JSON; never raises."""
+    _send("publish", channel, json.dumps(event, ensure_ascii=False))
+
+
+def dashboard_changed(customer_id: int) -> None:
+    """Invalidates the web API's cached dashboard for a customer; never raises."""
+    _send("incr", dashboard_key(customer_id))
+
+
+def run_started(total: int, **fields) -> None:
+    """Announces a main.py run of `total` logins."""
+    publish(CHANNEL, {"type": "run", "state": "started", "total": total, "at": _now(), **fields})
+
+
+def run_finished(**counts) -> None:
+    """Announces the end of a main.py run, with outcome counts."""
+    publish(CHANNEL, {"type": "run", "state": "finished", "at": _now(), **counts})
+
+
+def start_run(run_id: str, customer_id: int, total: int) -> None:
+    """Records the size of a web-started run and announces it; never raises."""
+    key = run_key(run_id)
+    try:
+        pipe = _redis().pipeline()
+        pipe.hset(key, mapping={
+            "customer_id": customer_id, "total": total, "done": 0,
+            OK: 0, FAILED: 0, ERROR: 0, "started_at": _now(),
+        })
+        pipe.expire(key, RUN_TTL)
+        pipe.set(last_run_key(customer_id), run_id, ex=RUN_TTL)
+        pipe.execute()
+    except redis.RedisError as e:
+        logging.warning("Could not record run %s: %s", run_id, e)
+        return
+    run_started(total, run_id=run_id)
+    if total == 0:
+        _finish_run(run_id, customer_id, {OK: 0, FAILED: 0, ERROR: 0})
+
+
+def run_login_finished(run_id: str, status: str) -> None:
+    """
+    Counts one finished login of a web-started run; the login that completes
+    the count finishes the run. Never raises.
+    """
+    key = run_key(run_id)
+    try:
+        pipe = _redis().pipeline()
+        pipe.hincrby(key, "done", 1)
+        pipe.hincrby(key, status, 1)
+        pipe.hgetall(key)
+        done, _, run = pipe.execute()
+    except redis.RedisError as e:
+        logging.warning("Could not count login for run %s: %s", run_id, e)
+        return
+    run = {k.decode(): v.decode() for k, v in run.items()}
+    if done == int(run.get("total", -1)):
+        _finish_run(run_id, int(run["customer_id"]), {s: int(run.get(s, 0)) for s in (OK, FAILED, ERROR)})
+
+
+def _finish_run(run_id: str, customer_id: int, counts: dict) -> None:
+    try:
+        pipe = _redis().pipeline()
+        pipe.hset(run_key(run_id), "finished_at", _now())
+        pipe.delete(active_run_key(customer_id))
+        pipe.execute()
+    except redis.RedisError as e:
+        logging.warning("Could not finish run %s: %s", run_id, e)
+    run_finished(run_id=run_id, **counts)
+
+
+class LoginProgress:
+    """One login's progress; the caller sets status, the handler the result."""
+
+    def __init__(self, site: str, customer_id: int, system_type: str):
+        self.site = site
+        self.customer_id = customer_id
+        self.system_type = system_type
+        self.status: str | None = None
+        self.queue_points: int | None = None
+        self.queue_details: list | None = None
+        self._started = time.monotonic()
+
+    def event(self, state: str) -> dict:
+        event = {
+            "type": "login",
+            "state": state,
+            "site": self.site,
+            "customer_id": self.customer_id,
+            "system_type": self.system_type,
+            "at": _now(),
+        }
+        if state == "finished":
+            event.update({
+                "status": self.status,
+                "duration": round(time.monotonic() - self._started, 3),
+                "queue_points": self.queue_points,
+                "queue_details": self.queue_details,
+            })
+        return event
+
+
+@contextlib.contextmanager
+def login_progress(site: str, customer_id: int, system_type: str) -> Iterator[LoginProgress]:
+    """Publishes 'started' now and 'finished' (with status and result) on exit."""
+    progress = LoginProgress(site, customer_id, system_type)
+    token = _current.set(progress)
+    channel = customer_channel(customer_id)
+    publish(channel, progress.event("started"))
+    try:
+        yield progress
+    finally:
+        _current.reset(token)
+        dashboard_changed(customer_id)
+        publish(channel, progress.event("finished"))
+
+
+def set_result(queue_points: int | None, queue_details: list) -> None:
+    """Attaches a handler's scraped queue points to the current login's event."""
+    progress = _current.get()
+    if progress is not None:
+        progress.queue_points = queue_points
+        progress.queue_details = queue_details
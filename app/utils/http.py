@@ -0,0 +1,77 @@
+"""
+HTTP Utility Module
+
+Shared HTTP layer for site handlers. Every session created here mounts the same
+process-wide connection pool, so consecutive logins to the same portal from
+one worker reuse warm TLS connections while keeping cookies per login. Request
+counts and durations per host are recorded in the metrics registry.
+"""
+
+import os
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.metrics import HTTP_REQUESTS_TOTAL, HTTP_REQUEST_SECONDS
+from utils.tracing import span
+
+# Number of distinct hosts to keep pools for, and connections kept per host
+POOL_HOSTS = int(os.getenv("HTTP_POOL_HOSTS", "100"))
+POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+
+
+
+class InstrumentedAdapter(HTTPAdapter):
+    """HTTPAdapter that records every request's host, status and duration
+    as metrics and, inside a sampled trace, as an 'http' span."""
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        host = parts.hostname or ""
+        started = time.perf_counter()
+        status = "error"
+        with span("http", host=host, method=request.method, path=parts.path) as s:
+            try:
+                response = super().send(request, **kwargs)
+                status = str(response.status_code)
+                return response
+            finally:
+                s.set("status", status)
+                HTTP_REQUEST_SECONDS.labels(host).observe(time.perf_counter() - started)
+                HTTP_REQUESTS_TOTAL.labels(host, request.method, status).inc()
+
+
+_adapter: HTTPAdapter = InstrumentedAdapter(pool_connections=POOL_HOSTS, pool_maxsize=POOL_SIZE)
+
+
+def use_adapter(adapter: HTTPAdapter) -> None:
+    """
+    Routes every session created from now on through `adapter` instead of the
+    shared pool (used by utils.cassette to record or replay exchanges).
+    """
+    global _adapter
+    _adapter = adapter
+
+
+class PooledSession(requests.Session):
+    """
+    A requests.Session backed by the shared process-wide connection pool.
+
+    Cookies and headers are per session; closing it only drops its cookies
+    and leaves the shared pool open for the next login.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.mount("https://", _adapter)
+        self.mount("http://", _adapter)
+
+    def close(self) -> None:
+        self.cookies.clear()
+
+
+def new_session() -> requests.Session:
+    """Returns a fresh session using the shared connection pool."""
+    return PooledSession()
@@ -0,0 +1,187 @@
+"""
+Logging Setup Module
+
+Central logging configuration for every QueuePilot entry point (main.py,
+Celery workers, CLI tools). Log calls only enqueue the record (QueueHandler);
+a single QueueListener thread formats and writes them, so worker threads
+never contend on the file handler lock.
+
+Output goes to logs/YYYY-MM-DD.log, switching files when the Stockholm date
+changes — also in long-lived Celery workers, which also log to stderr (for
+`docker logs`) at their --loglevel. Set LOG_FORMAT=json for JSON lines
+instead of the classic "[HH:MM:SS] message" format.
+"""
+
+import atexit
+import copy
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from zoneinfo import ZoneInfo
+
+LOG_DIR = "logs"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+
+STOCKHOLM = ZoneInfo("Europe/Stockholm")
+
+_listener: logging.handlers.QueueListener | None = None
+_listener_pid: int | None = None
+_lock = threading.Lock()
+# Level and console output of the last configure_logging() call, reused when
+# a forked child configures itself again
+_level: int | str = LOG_LEVEL
+_console = False
+
+
+class _StockholmConverter:
+    """
+    Formatter.converter returning Stockholm local time. Records arrive in
+    bursts within the same second, so the last conversion is reused.
+    """
+
+    def __init__(self):
+        self._cache: tuple = (None, None)
+
+    def __call__(self, ts: float) -> time.struct_time:
+        second = int(ts)
+        cached_second, cached = self._cache
+        if cached_second == second:
+            return cached
+        result = datetime.datetime.fromtimestamp(second, tz=STOCKHOLM).timetuple()
+        self._cache = (second, result)
+        return result
+
+
+class TextFormatter(logging.Formatter):
+    """The classic '[HH:MM:SS] message' format, in Stockholm time."""
+
+    def __init__(self):
+        super().__init__("[%(asctime)s] %(message)s", datefmt="%H:%M:%S")
+        self.converter = _StockholmConverter()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with timestamp, level, logger and message."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created, tz=STOCKHOLM).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueues a copy of the record with its message merged but its traceback
+    kept apart in exc_text. The stdlib prepare() formats the traceback into
+    the message, so the JSON formatter could never emit it as "exc".
+    """
+
+    _formatter = logging.Formatter()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = self._formatter.formatException(record.exc_info)
+            # Tracebacks cannot cross the queue (or be pickled) safely
+            record.exc_info = None
+        return record
+
+
+class DailyFileHandler(logging.FileHandler):
+    """
+    Writes to <directory>/YYYY-MM-DD.log and reopens the next day's file
+    when the record's Stockholm date changes.
+    """
+
+    def __init__(self, directory: str = LOG_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._date = datetime.datetime.now(STOCKHOLM).date()
+        super().__init__(self._path(self._date), encoding="utf-8", delay=True)
+
+    def _path(self, date: datetime.date) -> str:
+        return os.path.join(self.directory, date.strftime("%Y-%m-%d") + ".log")
+
+    def emit(self, record: logging.LogRecord) -> None:
+        date = datetime.datetime.fromtimestamp(record.created, tz=STOCKHOLM).date()
+        if date != self._date:
+            self._date = date
+            self.close()
+            self.baseFilename = os.path.abspath(self._path(date))
+        super().emit(record)
+
+
+def configure_logging(fmt: str = LOG_FORMAT, level: int | str | None = None,
+                      console: bool | None = None) -> None:
+    """
+    Routes the root logger through a queue to one listener thread writing the
+    daily log file, and stderr if asked. Safe to call repeatedly; after a fork
+    (prefork workers) it starts a fresh listener in the child, with the
+    parent's level and console setting unless given.
+
+    Args:
+        fmt (str): 'text' or 'json'.
+        level: Root log level (default LOG_LEVEL).
+        console (bool): Also write every record to stderr.
+    """
+    global _listener, _listener_pid, _level, _console
+    with _lock:
+        if level is not None:
+            _level = level
+        if console is not None:
+            _console = console
+        pid = os.getpid()
+        if _listener is not None and _listener_pid == pid:
+            logging.getLogger().setLevel(_level)
+            return
+
+        formatter = JsonFormatter() if fmt == "json" else TextFormatter()
+        handlers: list = [DailyFileHandler()]
+        if _console:
+            handlers.append(logging.StreamHandler(sys.stderr))
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(_QueueHandler(log_queue))
+        root.setLevel(_level)
+
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        _listener_pid = pid
+
+
+def shutdown_logging() -> None:
+    """Flushes queued records and stops the listener thread."""
+    global _listener
+    with _lock:
+        if _listener is not None and _listener_pid == os.getpid():
+            _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
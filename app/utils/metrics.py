@@ -0,0 +1,32 @@
+"""
+Metrics Utility Module
+
+The workers' and main.py's metrics, registered in the shared in-process
+registry (utils/metrics_core.py). Scrape with start_http_server(port), which
+serves /metrics from a daemon thread.
+"""
+
+from utils.metrics_core import REGISTRY, counter, gauge, histogram, start_http_server  # noqa: F401
+
+# ── QueuePilot metrics ────────────────────────────────────────────────────────
+
+LOGIN_SECONDS = histogram(
+    "queuepilot_login_seconds", "Login duration per site", ("site", "system_type"))
+LOGINS_TOTAL = counter(
+    "queuepilot_logins_total", "Logins by outcome", ("system_type", "status", "error_class"))
+LOGINS_IN_FLIGHT = gauge(
+    "queuepilot_logins_in_flight", "Logins currently running")
+HTTP_REQUESTS_TOTAL = counter(
+    "queuepilot_http_requests_total", "Outbound HTTP requests", ("host", "method", "status"))
+HTTP_REQUEST_SECONDS = histogram(
+    "queuepilot_http_request_seconds", "Outbound HTTP request duration", ("host",))
+DB_QUERIES_TOTAL = counter(
+    "queuepilot_db_queries_total", "Database queries", ("operation",))
+DB_QUERY_SECONDS = histogram(
+    "queuepilot_db_query_seconds", "Database query duration", ("operation",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0))
+QUEUE_WAIT_SECONDS = histogram(
+    "queuepilot_queue_wait_seconds", "Time login tasks waited in the broker", ("system_type",),
+    buckets=(0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 3600.0))
+QUEUE_DEPTH = gauge(
+    "queuepilot_queue_depth", "Messages waiting per Celery queue", ("queue",))
@@ -0,0 +1,425 @@
+"""
+Metrics Core Module
+
+A minimal in-process metrics registry rendered in the Prometheus text format,
+plus DB connection proxies that time every query. Observations take one dict
+lookup and one uncontended lock, so they are cheap enough for per-request and
+per-query hot paths. Scrape with start_http_server(port), which serves
+/metrics from a daemon thread, or render REGISTRY from a web route.
+
+Standard library only, and the single source for both images: the workers
+import it as utils.metrics_core (metric definitions in utils/metrics.py), and
+the web image copies it in at build time (definitions in web/metrics.py).
+
+Multi-process servers (Gunicorn workers, prefork Celery children) set
+METRICS_MULTIPROC_DIR: every process then writes a snapshot of its registry
+to <dir>/<pid>.json every METRICS_SNAPSHOT_INTERVAL seconds and when it exits,
+and whichever process renders /metrics adds up its own live values and every
+other process's snapshot. Counters and histograms of exited processes are
+kept, so totals never go down; gauges count only live processes.
+"""
+
+import bisect
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, ContextManager, Dict, Iterable, List, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_str(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _CounterChild:
+    __slots__ = ("_lock", "value")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class _HistogramChild:
+    __slots__ = ("_lock", "_bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self._lock = threading.Lock()
+        self._bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        idx = bisect.bisect_left(self._bounds, value)
+        with self._lock:
+            self.counts[idx] += 1
+            self.sum += value
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """Returns the child series for the given label values, creating it once."""
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def collect(self) -> Dict[Tuple[str, ...], object]:
+        """This process's current value per label values."""
+        return {key: child.value for key, child in list(self._children.items())}
+
+    def merge(self, values: Dict[Tuple[str, ...], object], other: Dict[Tuple[str, ...], object]) -> None:
+        """Adds another process's collected values into values."""
+        for key, value in other.items():
+            values[key] = values.get(key, 0.0) + value
+
+    def reset(self) -> None:
+        with self._lock:
+            self._children.clear()
+
+    def samples(self, values: Dict[Tuple[str, ...], object]) -> List[str]:
+        return [f"{self.name}{_label_str(self.labelnames, key)} {value}" for key, value in values.items()]
+
+    def render(self, values: Dict[Tuple[str, ...], object] | None = None) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples(self.collect() if values is None else values))
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, e.g. requests or failures."""
+
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+
+class Gauge(_Metric):
+    """Value that goes up and down. Optionally computed at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._callback: Callable[[], Dict[Tuple[str, ...], float]] | None = None
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set_function(self, callback: Callable[[], Dict[Tuple[str, ...], float]]) -> None:
+        """Computes the series at scrape time: callback returns {label values: value}."""
+        self._callback = callback
+
+    @property
+    def computed(self) -> bool:
+        """Computed at scrape time by the rendering process, so never snapshotted."""
+        return self._callback is not None
+
+    def collect(self) -> Dict[Tuple[str, ...], object]:
+        if self._callback is None:
+            return super().collect()
+        try:
+            return dict(self._callback())
+        except Exception:
+            logging.exception("Gauge %s callback failed", self.name)
+            return {}
+
+
+class Histogram(_Metric):
+    """Distribution of observed values (e.g. latencies) in cumulative buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def collect(self) -> Dict[Tuple[str, ...], object]:
+        values = {}
+        for key, child in list(self._children.items()):
+            with child._lock:
+                values[key] = [list(child.counts), child.sum]
+        return values
+
+    def merge(self, values: Dict[Tuple[str, ...], object], other: Dict[Tuple[str, ...], object]) -> None:
+        for key, (counts, total) in other.items():
+            mine = values.get(key)
+            if mine is None or len(mine[0]) != len(counts):
+                values[key] = [list(counts), total]
+            else:
+                values[key] = [[a + b for a, b in zip(mine[0], counts)], mine[1] + total]
+
+    def samples(self, values: Dict[Tuple[str, ...], object]) -> List[str]:
+        lines = []
+        for key, (counts, total) in values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = _label_str(self.labelnames, key, 'le="%s"' % le)
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_str(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_label_str(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Holds metrics by name and renders them for scraping."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def snapshot(self) -> dict:
+        """This process's values, JSON-serializable, without computed gauges."""
+        return {
+            name: [[list(key), value] for key, value in metric.collect().items()]
+            for name, metric in list(self._metrics.items())
+            if not getattr(metric, "computed", False)
+        }
+
+    def reset(self) -> None:
+        """Drops every series, e.g. the values a forked child inherited."""
+        for metric in list(self._metrics.values()):
+            metric.reset()
+
+    def render(self) -> str:
+        metrics = list(self._metrics.values())
+        if not MULTIPROC_DIR:
+            return "\n".join(m.render() for m in metrics) + "\n"
+        values = {m.name: m.collect() for m in metrics}
+        for pid, snapshot in _other_snapshots():
+            alive = _alive(pid)
+            for name, entries in snapshot.items():
+                metric = self._metrics.get(name)
+                if metric is None or (metric.kind == "gauge" and not alive):
+                    continue
+                metric.merge(values[name], {tuple(key): value for key, value in entries})
+        return "\n".join(m.render(values[m.name]) for m in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+# Shared snapshot directory for multi-process servers; empty = this process only
+MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR", "")
+SNAPSHOT_INTERVAL = float(os.getenv("METRICS_SNAPSHOT_INTERVAL", "2"))
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _other_snapshots() -> Iterable[Tuple[int, dict]]:
+    for path in glob.glob(os.path.join(MULTIPROC_DIR, "*.json")):
+        try:
+            pid = int(os.path.basename(path)[:-5])
+        except ValueError:
+            continue
+        if pid == os.getpid():
+            continue
+        try:
+            with open(path, encoding="utf-8") as fh:
+                yield pid, json.load(fh)
+        except (OSError, ValueError):
+            continue  # removed or half-written; picked up on the next scrape
+
+
+def clear_snapshots() -> None:
+    """Removes the previous run's snapshots; called once by the parent process at startup."""
+    if not MULTIPROC_DIR:
+        return
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+    for path in glob.glob(os.path.join(MULTIPROC_DIR, "*.json")):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def write_snapshot() -> None:
+    """Writes this process's values to MULTIPROC_DIR/<pid>.json, atomically."""
+    if not MULTIPROC_DIR:
+        return
+    path = os.path.join(MULTIPROC_DIR, f"{os.getpid()}.json")
+    try:
+        with open(path + ".tmp", "w", encoding="utf-8") as fh:
+            json.dump(REGISTRY.snapshot(), fh)
+        os.replace(path + ".tmp", path)
+    except OSError as e:
+        logging.warning("Could not write metrics snapshot %s: %s", path, e)
+
+
+def start_snapshots(reset: bool = True) -> None:
+    """
+    Starts writing this process's snapshot every SNAPSHOT_INTERVAL seconds;
+    called in each forked child. reset drops the values inherited from the
+    parent, which reports its own.
+    """
+    if not MULTIPROC_DIR:
+        return
+    if reset:
+        REGISTRY.reset()
+
+    def run():
+        while True:
+            time.sleep(SNAPSHOT_INTERVAL)
+            write_snapshot()
+
+    threading.Thread(target=run, name="metrics-snapshot", daemon=True).start()
+
+
+def counter(name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(name: str, documentation: str, labelnames: Iterable[str] = (),
+              buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_http_server(port: int, addr: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Serves /metrics on the given port from a daemon thread."""
+    server = ThreadingHTTPServer((addr, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logging.info("Metrics available on http://%s:%d/metrics", addr, port)
+    return server
+
+
+def sql_operation(operation: str) -> str:
+    """The statement's leading keyword (select, insert, ...), as a metric label."""
+    return operation.lstrip().split(None, 1)[0].lower() if operation.strip() else "unknown"
+
+
+class InstrumentedCursor:
+    """
+    Cursor proxy that reports each execute/executemany's SQL operation and
+    duration to observe(operation, seconds), inside wrap(operation) if given
+    (e.g. a trace span).
+    """
+
+    def __init__(self, cursor, observe: Callable[[str, float], None],
+                 wrap: Callable[[str], ContextManager] | None = None):
+        self._cursor = cursor
+        self._observe = observe
+        self._wrap = wrap
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def _timed(self, method, operation: str, *args):
+        op = sql_operation(operation)
+        started = time.perf_counter()
+        try:
+            if self._wrap is None:
+                return method(operation, *args)
+            with self._wrap(op):
+                return method(operation, *args)
+        finally:
+            self._observe(op, time.perf_counter() - started)
+
+    def execute(self, operation: str, params=()):
+        return self._timed(self._cursor.execute, operation, params)
+
+    def executemany(self, operation: str, seq_params):
+        return self._timed(self._cursor.executemany, operation, seq_params)
+
+
+class InstrumentedConnection:
+    """Connection proxy whose cursors are instrumented (see InstrumentedCursor)."""
+
+    def __init__(self, conn, observe: Callable[[str, float], None],
+                 wrap: Callable[[str], ContextManager] | None = None):
+        self._conn = conn
+        self._observe = observe
+        self._wrap = wrap
+        self.closed = False
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs) -> InstrumentedCursor:
+        return InstrumentedCursor(self._conn.cursor(*args, **kwargs), self._observe, self._wrap)
+
+    def close(self) -> None:
+        # Idempotent, so cleanup code can close any connection without tracking
+        # whether it was already closed (or returned to a pool)
+        if not self.closed:
+            self.closed = True
+            self._conn.close()
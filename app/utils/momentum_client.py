@@ -5,9 +5,36 @@ A simplified client for communicating with the Momentum housing queue API.
 Handles token-based authentication, headers, and basic GET/POST requests.
 """
 
-import requests
+import os
+
 from requests import Response
 
+from utils.http import new_session
+
+# PmApi base URL for a site; override to point handlers at another deployment
+MOMENTUM_BASE_URL_TEMPLATE = os.getenv(
+    "MOMENTUM_BASE_URL_TEMPLATE",
+    "https://{url_name}-fastighet.momentum.se/Prod/{momentum_id}/PmApi/v2",
+)
+
+# Seconds before a request is abandoned. Always set: under a gevent worker a
+# hung connection would otherwise hold its greenlet (and task slot) forever.
+REQUEST_TIMEOUT = float(os.getenv("MOMENTUM_TIMEOUT", "15"))
+
+
+def momentum_base_url(url_name: str, momentum_id: str) -> str:
+    """
+    Builds the PmApi base URL for a Momentum site.
+
+    Args:
+        url_name (str): Site's identifier (e.g. 'kbab').
+        momentum_id (str): Path segment in the API URL (e.g. 'Kar').
+
+    Returns:
+        str: The API base URL, without trailing slash.
+    """
+    return MOMENTUM_BASE_URL_TEMPLATE.format(url_name=url_name, momentum_id=momentum_id).rstrip("/")
+
 
 class MomentumClient:
     """
@@ -23,7 +50,7 @@ class MomentumClient:
             api_key (str): The public API key required for authentication.
         """
         self.base_url = base_url.rstrip("/")
-        self.session = requests.Session()
+        self.session = new_session()
         self.headers = {
             "x-api-key": api_key,
             "x-momentum-client": "momentum.se-fastighetminasidor",
@@ -51,7 +78,9 @@ class MomentumClient:
         Returns:
             Response: The HTTP response object.
         """
-        return self.session.post(f"{self.base_url}{path}", headers=self.headers, json=json)
+        return self.session.post(
+            f"{self.base_url}{path}", headers=self.headers, json=json, timeout=REQUEST_TIMEOUT
+        )
 
     def get(self, path: str) -> Response:
         """
@@ -63,4 +92,4 @@ class MomentumClient:
         Returns:
             Response: The HTTP response object.
         """
-        return self.session.get(f"{self.base_url}{path}", headers=self.headers)
+        return self.session.get(f"{self.base_url}{path}", headers=self.headers, timeout=REQUEST_TIMEOUT)
@@ -0,0 +1,106 @@
+"""
+Job Ordering Utility Module
+
+Orders a main.py run's logins so the slowest start first (longest processing
+time first), which keeps one slow portal that happens to start last from
+stretching the whole run. Expected durations come from recent run_outcomes.
+
+Consecutive starts are spread over different portal hosts where possible, so
+a portal with many credentials is not hit by a burst of parallel logins.
+"""
+
+import collections
+import heapq
+import logging
+import os
+import statistics
+from typing import Dict, List
+
+from utils.affinity import target_host
+from utils.db import get_connection
+
+# Days of run_outcomes used to estimate each site's login duration
+HISTORY_DAYS = int(os.getenv("ORDERING_HISTORY_DAYS", "30"))
+
+
+def historical_durations(days: int = HISTORY_DAYS) -> Dict[str, float]:
+    """
+    Returns the average login duration in seconds per site over the last `days`.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT site, AVG(duration_ms) FROM run_outcomes "
+        "WHERE finished_at >= NOW() - INTERVAL %s DAY GROUP BY site",
+        (days,)
+    )
+    result = {site: float(avg) / 1000 for site, avg in cursor.fetchall()}
+    cursor.close()
+    conn.close()
+    return result
+
+
+def _host(job: dict) -> str:
+    return target_host(
+        job.get("system_type", "momentum"), job["url_name"], job.get("momentum_id"), job.get("base_url")
+    ) or job["url_name"]
+
+
+def order_jobs(jobs: List[dict], durations: Dict[str, float], spread: int) -> List[dict]:
+    """
+    Orders jobs longest-expected-first while spreading hosts.
+
+    Each start takes the longest remaining job whose host is not among the
+    last `spread` hosts started; if every remaining host is that recent, the
+    longest job overall. Sites without history are expected to take as long
+    as the slowest known site, so they start early rather than last.
+
+    Args:
+        jobs: Dicts with 'url_name', 'system_type' and optionally
+            'momentum_id'/'base_url' (used to find the host).
+        durations: Expected seconds per url_name.
+        spread: How many recent hosts to avoid (typically workers - 1).
+
+    Returns:
+        The same jobs, in submission order.
+    """
+    if not jobs:
+        return []
+    unknown = max(durations.values(), default=0.0)
+
+    def expected(job: dict) -> float:
+        return durations.get(job["url_name"], unknown)
+
+    by_host: Dict[str, collections.deque] = {}
+    for job in sorted(jobs, key=expected, reverse=True):
+        by_host.setdefault(_host(job), collections.deque()).append(job)
+
+    # Max-heap of hosts by the expected duration of their longest pending job
+    heap = [(-expected(queue[0]), host) for host, queue in by_host.items()]
+    heapq.heapify(heap)
+    recent: collections.deque = collections.deque(maxlen=max(spread, 0))
+    ordered = []
+    while heap:
+        skipped = []
+        while heap and heap[0][1] in recent:
+            skipped.append(heapq.heappop(heap))
+        if heap:
+            _, host = heapq.heappop(heap)
+        else:
+            _, host = skipped.pop(0)
+        for item in skipped:
+            heapq.heappush(heap, item)
+
+        queue = by_host[host]
+        ordered.append(queue.popleft())
+        if queue:
+            heapq.heappush(heap, (-expected(queue[0]), host))
+        if recent.maxlen:
+            recent.append(host)
+
+    known = [durations[j["url_name"]] for j in jobs if j["url_name"] in durations]
+    logging.info(
+        "Ordered %d job(s) over %d host(s) longest-first (history for %d, median %.1fs)",
+        len(ordered), len(by_host), len(known), statistics.median(known) if known else 0.0,
+    )
+    return ordered
@@ -0,0 +1,114 @@
+"""
+Run Outcome Utility Module
+
+Buffers the outcome of every login (status, duration, error class) and writes
+them to the `run_outcomes` table in multi-row batches, instead of one round
+trip per login. The dashboard, alerts and the dispatcher query that table.
+Each outcome is also counted in the metrics registry.
+"""
+
+import atexit
+import logging
+import os
+import threading
+from typing import List, Tuple
+
+from utils.db import get_connection
+from utils.metrics import LOGIN_SECONDS, LOGINS_TOTAL
+
+BATCH_SIZE = int(os.getenv("OUTCOME_BATCH_SIZE", "50"))
+FLUSH_INTERVAL = float(os.getenv("OUTCOME_FLUSH_SECONDS", "5"))
+# Outcomes kept for the next flush while the database is unreachable; the oldest go first
+MAX_BUFFER = int(os.getenv("OUTCOME_MAX_BUFFER", "10000"))
+
+OK = "ok"          # logged in and refreshed
+FAILED = "failed"  # handler ran but the login was rejected or not configured
+ERROR = "error"    # handler raised
+
+
+class OutcomeRecorder:
+    """
+    Collects outcomes in memory and flushes them when the buffer reaches
+    BATCH_SIZE, every FLUSH_INTERVAL seconds from a background thread, and
+    at interpreter exit. Prefork children leave through os._exit, skipping
+    atexit, so tasks.py also flushes on worker_process_shutdown. A failed
+    flush keeps its rows (up to MAX_BUFFER) for the next one.
+    """
+
+    def __init__(self):
+        self._buffer: List[Tuple] = []
+        self._lock = threading.Lock()
+        self._flusher_pid: int | None = None
+
+    def record(self, site: str, customer_id: int, system_type: str, status: str,
+               duration: float, error_class: str | None = None) -> None:
+        """
+        Queues one outcome for writing and updates the login metrics.
+
+        Args:
+            site: The site url_name.
+            customer_id: The credential owner's ID.
+            system_type: The site's platform type.
+            status: OK, FAILED or ERROR.
+            duration: Seconds the login took.
+            error_class: Exception class name for ERROR outcomes.
+        """
+        LOGIN_SECONDS.labels(site, system_type).observe(duration)
+        LOGINS_TOTAL.labels(system_type, status, error_class or "").inc()
+        self._ensure_flusher()
+        with self._lock:
+            self._buffer.append(
+                (site, customer_id, system_type, status, int(duration * 1000), error_class)
+            )
+            # Rows kept from a failed flush would otherwise retry on every call
+            full = len(self._buffer) % BATCH_SIZE == 0
+        if full:
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes all buffered outcomes in one multi-row INSERT."""
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+        if not rows:
+            return
+        conn = None
+        try:
+            conn = get_connection()
+            cursor = conn.cursor()
+            cursor.executemany(
+                "INSERT INTO run_outcomes "
+                "(site, customer_id, system_type, status, duration_ms, error_class) "
+                "VALUES (%s,%s,%s,%s,%s,%s)",
+                rows
+            )
+            conn.commit()
+            cursor.close()
+        except Exception:
+            with self._lock:
+                self._buffer[:0] = rows
+                dropped = len(self._buffer) - MAX_BUFFER
+                if dropped > 0:
+                    del self._buffer[:dropped]
+            logging.exception("Failed to write %d run outcome(s); kept for the next flush", len(rows))
+            if dropped > 0:
+                logging.error("Dropped %d run outcome(s) over the %d-row buffer limit", dropped, MAX_BUFFER)
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _ensure_flusher(self) -> None:
+        # Started lazily and per process: threads don't survive a prefork fork
+        pid = os.getpid()
+        if self._flusher_pid == pid:
+            return
+        self._flusher_pid = pid
+        threading.Thread(target=self._flush_periodically, name="outcome-flusher", daemon=True).start()
+
+    def _flush_periodically(self) -> None:
+        stop = threading.Event()
+        while not stop.wait(FLUSH_INTERVAL):
+            self.flush()
+
+
+recorder = OutcomeRecorder()
+atexit.register(recorder.flush)
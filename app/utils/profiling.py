@@ -0,0 +1,242 @@
+"""
+Profiling Utility Module
+
+Profilers for `main.py --profile {cpu,wall,alloc}` and for a sampled
+fraction of Celery login tasks.
+
+- cpu / wall: a sampling profiler thread walks every dispatcher thread's
+  stack every few milliseconds (sys._current_frames). Samples are weighted
+  by the thread's CPU time (cpu) or by elapsed time (wall) and attributed to
+  the site that thread is running. Output: stacks.collapsed (one
+  "site;frame;...;frame weight_us" line per stack, ready for flamegraph.pl or
+  speedscope) and summary.txt with per-site totals and hottest functions.
+- alloc: tracemalloc snapshots before and after each site; run sites one at
+  a time so the per-site differences are exact. Output: alloc.txt.
+- profile_task(): cProfile around a single task when PROFILE_TASK_RATE
+  selects it, written as a .pstats file to PROFILE_DIR. Only on worker pools
+  that run one task at a time per process (prefork, solo): cProfile sees
+  everything its OS thread runs (on 3.12, the whole interpreter), so under
+  gevent or threads a task's profile would mix in every concurrent login.
+"""
+
+import contextlib
+import cProfile
+import datetime
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Dict, Iterator
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_TASK_RATE = float(os.getenv("PROFILE_TASK_RATE", "0"))
+SAMPLE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+MAX_DEPTH = 64
+# Celery pools that run a single task at a time in each process
+TASK_PROFILING_POOLS = ("prefork", "solo")
+
+_task_profiling = PROFILE_TASK_RATE > 0
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def _thread_cpu_clock(ident: int):
+    try:
+        return time.pthread_getcpuclockid(ident)
+    except (AttributeError, OSError):
+        return None
+
+
+class SamplingProfiler:
+    """Samples the stacks of threads registered with track(), per site."""
+
+    def __init__(self, mode: str = "wall", interval: float = SAMPLE_INTERVAL):
+        self.mode = mode
+        self.interval = interval
+        self._sites: Dict[int, str] = {}
+        self._cpu: Dict[int, tuple] = {}
+        self._stacks: Dict[tuple, float] = defaultdict(float)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    @contextlib.contextmanager
+    def track(self, site: str) -> Iterator[None]:
+        """Attributes samples of the calling thread to `site` while inside."""
+        ident = threading.get_ident()
+        self._sites[ident] = site
+        try:
+            yield
+        finally:
+            self._sites.pop(ident, None)
+            self._cpu.pop(ident, None)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _weight(self, ident: int, now: float, last_wall: float) -> float:
+        if self.mode != "cpu":
+            return now - last_wall
+        clock, previous = self._cpu.get(ident, (None, None))
+        if clock is None:
+            clock = _thread_cpu_clock(ident)
+            if clock is None:
+                return now - last_wall
+        try:
+            cpu = time.clock_gettime(clock)
+        except OSError:
+            return 0.0
+        self._cpu[ident] = (clock, cpu)
+        return 0.0 if previous is None else cpu - previous
+
+    def _run(self) -> None:
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            frames = sys._current_frames()
+            for ident, site in list(self._sites.items()):
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                weight = self._weight(ident, now, last)
+                if weight <= 0:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_DEPTH:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.reverse()
+                self._stacks[(site, *stack)] += weight
+            last = now
+
+    def write(self, out_dir: str) -> None:
+        """Writes stacks.collapsed and summary.txt to out_dir."""
+        os.makedirs(out_dir, exist_ok=True)
+        stacks = dict(self._stacks)
+        with open(os.path.join(out_dir, "stacks.collapsed"), "w", encoding="utf-8") as fh:
+            for stack, seconds in sorted(stacks.items()):
+                fh.write(f"{';'.join(stack)} {int(seconds * 1_000_000)}\n")
+
+        per_site: Dict[str, float] = defaultdict(float)
+        self_time: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        for (site, *frames), seconds in stacks.items():
+            per_site[site] += seconds
+            if frames:
+                self_time[site][frames[-1]] += seconds
+
+        with open(os.path.join(out_dir, "summary.txt"), "w", encoding="utf-8") as fh:
+            fh.write(f"{self.mode} profile — seconds per site (sampled every {self.interval * 1000:.1f} ms)\n\n")
+            for site, seconds in sorted(per_site.items(), key=lambda kv: kv[1], reverse=True):
+                fh.write(f"{site:<30} {seconds:10.3f}\n")
+                hottest = sorted(self_time[site].items(), key=lambda kv: kv[1], reverse=True)[:10]
+                for func, func_seconds in hottest:
+                    fh.write(f"    {func_seconds:10.3f}  {func}\n")
+
+
+class AllocationProfiler:
+    """tracemalloc snapshots per site; sites must run one at a time."""
+
+    _FILTERS = [tracemalloc.Filter(False, tracemalloc.__file__)]
+
+    def __init__(self, frames: int = 25):
+        self.frames = frames
+        self._diffs: Dict[str, list] = {}
+        self._peaks: Dict[str, int] = {}
+
+    def _snapshot(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(self._FILTERS)
+
+    def start(self) -> None:
+        tracemalloc.start(self.frames)
+
+    def stop(self) -> None:
+        self._final = self._snapshot()
+        self._peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    @contextlib.contextmanager
+    def track(self, site: str) -> Iterator[None]:
+        before = self._snapshot()
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        try:
+            yield
+        finally:
+            self._peaks[site] = tracemalloc.get_traced_memory()[1] - baseline
+            self._diffs[site] = self._snapshot().compare_to(before, "lineno")
+
+    def write(self, out_dir: str) -> None:
+        """Writes alloc.txt with the top allocation sites overall and per site."""
+        os.makedirs(out_dir, exist_ok=True)
+        with open(os.path.join(out_dir, "alloc.txt"), "w", encoding="utf-8") as fh:
+            fh.write(f"Peak traced memory: {self._peak / 1024:.1f} KiB\n\nLive at end of run:\n")
+            for stat in self._final.statistics("lineno")[:25]:
+                fh.write(f"  {stat}\n")
+            for site, diff in sorted(self._diffs.items()):
+                grown = sum(d.size_diff for d in diff)
+                fh.write(f"\n{site}: peak {self._peaks[site] / 1024:.1f} KiB, {grown / 1024:+.1f} KiB net\n")
+                for stat in diff[:10]:
+                    fh.write(f"  {stat}\n")
+
+
+def create(mode: str):
+    """Returns a started profiler for --profile <mode>."""
+    profiler = AllocationProfiler() if mode == "alloc" else SamplingProfiler(mode)
+    profiler.start()
+    return profiler
+
+
+def default_out_dir() -> str:
+    return os.path.join(PROFILE_DIR, datetime.datetime.now().strftime("run-%Y%m%d-%H%M%S"))
+
+
+def configure_task_profiling(pool: str) -> None:
+    """
+    Turns profile_task() off unless the worker's pool runs one task per
+    process at a time; called when a worker starts.
+    """
+    global _task_profiling
+    if _task_profiling and pool not in TASK_PROFILING_POOLS:
+        _task_profiling = False
+        logging.warning(
+            "PROFILE_TASK_RATE ignored: the %s pool runs tasks concurrently in one process, so a "
+            "task's profile would include the others (use %s)", pool, " or ".join(TASK_PROFILING_POOLS)
+        )
+
+
+@contextlib.contextmanager
+def profile_task(name: str) -> Iterator[None]:
+    """
+    Profiles the enclosed block with cProfile for a PROFILE_TASK_RATE fraction
+    of calls, writing PROFILE_DIR/<name>-<timestamp>.pstats. Disabled on
+    concurrent worker pools (see configure_task_profiling).
+    """
+    if not _task_profiling or random.random() >= PROFILE_TASK_RATE:
+        yield
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiler is active in this process (Python 3.12+ allows one)
+        logging.warning("Task profile of %s skipped: another profiler is active", name)
+        yield
+        return
+    try:
+        yield
+    finally:
+        profiler.disable()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.pstats")
+        profiler.dump_stats(path)
+        logging.info("Task profile written to %s", path)
@@ -0,0 +1,139 @@
+"""
+Timing Utility Module
+
+Lightweight per-phase timers for site handlers. A run is opened with
+timed_run(); inside it, handlers wrap each step with phase("auth") etc. The
+current run is tracked in a context variable, so handlers need no extra
+arguments and phase() is a cheap no-op when no run is being timed.
+
+Each phase is also a tracing span when the run is part of a sampled trace.
+
+RunReport collects finished runs and writes per-credential phase timings plus
+p50/p95/p99 summaries as JSON (used by `main.py --report json`).
+"""
+
+import contextlib
+import contextvars
+import datetime
+import json
+import math
+import os
+import threading
+import time
+from typing import Dict, Iterator, List
+
+from utils.tracing import span
+
+_current: contextvars.ContextVar["RunTimer | None"] = contextvars.ContextVar("run_timer", default=None)
+
+
+class RunTimer:
+    """Phase timings for one credential's run."""
+
+    def __init__(self, site: str, customer_id: int, system_type: str):
+        self.site = site
+        self.customer_id = customer_id
+        self.system_type = system_type
+        self.status: str | None = None
+        self.phases: Dict[str, float] = {}
+        self.total = 0.0
+
+    def add(self, name: str, seconds: float) -> None:
+        """Adds time to a phase; repeated phases accumulate."""
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def as_dict(self) -> dict:
+        return {
+            "site": self.site,
+            "customer_id": self.customer_id,
+            "system_type": self.system_type,
+            "status": self.status,
+            "total": round(self.total, 4),
+            "phases": {name: round(sec, 4) for name, sec in self.phases.items()},
+        }
+
+
+@contextlib.contextmanager
+def timed_run(site: str, customer_id: int, system_type: str) -> Iterator[RunTimer]:
+    """Times a whole handler run and makes it the target of phase() calls."""
+    timer = RunTimer(site, customer_id, system_type)
+    token = _current.set(timer)
+    started = time.perf_counter()
+    try:
+        yield timer
+    finally:
+        timer.total = time.perf_counter() - started
+        _current.reset(token)
+
+
+@contextlib.contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Records the duration of the enclosed block under `name` for the current run."""
+    timer = _current.get()
+    if timer is None:
+        with span(name):
+            yield
+        return
+    started = time.perf_counter()
+    try:
+        with span(name):
+            yield
+    finally:
+        timer.add(name, time.perf_counter() - started)
+
+
+def percentiles(values: List[float]) -> dict:
+    """Nearest-rank p50/p95/p99 (plus count and max) of a list of seconds."""
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+
+    def rank(p: float) -> float:
+        return round(ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)], 4)
+
+    return {
+        "count": len(ordered),
+        "p50": rank(50),
+        "p95": rank(95),
+        "p99": rank(99),
+        "max": round(ordered[-1], 4),
+    }
+
+
+class RunReport:
+    """Thread-safe collection of finished RunTimers for one main.py run."""
+
+    def __init__(self, meta: dict | None = None):
+        self.meta = meta or {}
+        self.started_at = datetime.datetime.now(datetime.timezone.utc)
+        self._started = time.perf_counter()
+        self._runs: List[RunTimer] = []
+        self._lock = threading.Lock()
+
+    def add(self, timer: RunTimer) -> None:
+        with self._lock:
+            self._runs.append(timer)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            runs = list(self._runs)
+        by_phase: Dict[str, List[float]] = {}
+        for run in runs:
+            for name, sec in run.phases.items():
+                by_phase.setdefault(name, []).append(sec)
+        return {
+            **self.meta,
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "wall_seconds": round(time.perf_counter() - self._started, 3),
+            "credentials": [run.as_dict() for run in runs],
+            "summary": {
+                "total": percentiles([run.total for run in runs]),
+                "phases": {name: percentiles(secs) for name, secs in sorted(by_phase.items())},
+            },
+        }
+
+    def write(self, path: str) -> None:
+        """Writes the report as JSON, creating the parent directory."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump(self.as_dict(), fh, indent=2)
@@ -0,0 +1,212 @@
+"""
+Tracing Utility Module
+
+Minimal distributed tracing for following one credential's refresh from the
+scheduler, through broker wait and login_credential, into DB queries and
+portal HTTP calls.
+
+- start_trace() opens a root span (sampled at TRACE_SAMPLE_RATE) or continues
+  a trace from a W3C-style `traceparent` carried in Celery message headers.
+- span() opens a child of the current span. Outside a sampled trace it
+  returns a shared no-op, so instrumentation on hot paths costs one
+  context-variable lookup.
+- Finished spans are exported in batches from a background thread, as JSON
+  lines to TRACE_FILE or POSTed to TRACE_COLLECTOR_URL
+  (see bench/trace_collector.py for a local stand-in).
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import secrets
+import threading
+import time
+import urllib.request
+from contextvars import ContextVar
+from typing import Dict
+
+SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.01"))
+TRACE_FILE = os.getenv("TRACE_FILE", os.path.join("logs", "traces.jsonl"))
+COLLECTOR_URL = os.getenv("TRACE_COLLECTOR_URL", "")
+EXPORT_BATCH = 500
+EXPORT_INTERVAL = 2.0
+
+TRACEPARENT_HEADER = "traceparent"
+PUBLISHED_AT_HEADER = "qp_published_at"
+
+_current: ContextVar["Span | None"] = ContextVar("trace_span", default=None)
+
+
+class _NoopSpan:
+    """Stand-in returned when the current work is not being traced."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, key: str, value) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    """One timed operation in a trace. Use as a context manager."""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "attrs", "start", "duration", "error", "_token")
+
+    def __init__(self, name: str, trace_id: str, parent_id: str | None, attrs: Dict):
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.attrs = attrs
+        self.start = 0.0
+        self.duration = 0.0
+        self.error: str | None = None
+        self._token = None
+
+    def set(self, key: str, value) -> None:
+        """Attaches an attribute to the span."""
+        self.attrs[key] = value
+
+    def __enter__(self) -> "Span":
+        self.start = time.time()
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.duration = time.time() - self.start
+        if exc_type is not None:
+            self.error = exc_type.__name__
+        _current.reset(self._token)
+        _exporter.submit(self.as_dict())
+        return False
+
+    def as_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": round(self.start, 6),
+            "duration": round(self.duration, 6),
+            "attrs": self.attrs,
+            "error": self.error,
+        }
+
+
+def span(name: str, **attrs):
+    """Returns a child span of the current span, or a no-op if not tracing."""
+    parent = _current.get()
+    if parent is None:
+        return _NOOP
+    return Span(name, parent.trace_id, parent.span_id, attrs)
+
+
+def start_trace(name: str, traceparent: str | None = None, **attrs):
+    """
+    Opens the first span of a unit of work.
+
+    Continues the trace in `traceparent` when given (honouring its sampled
+    flag), otherwise starts a new trace with probability TRACE_SAMPLE_RATE.
+    Inside an already-traced context it simply opens a child span.
+    """
+    if _current.get() is not None:
+        return span(name, **attrs)
+    if traceparent:
+        try:
+            _, trace_id, parent_id, flags = traceparent.split("-")
+        except ValueError:
+            return _NOOP
+        return Span(name, trace_id, parent_id, attrs) if flags == "01" else _NOOP
+    if SAMPLE_RATE <= 0 or random.random() >= SAMPLE_RATE:
+        return _NOOP
+    return Span(name, secrets.token_hex(16), None, attrs)
+
+
+def record_span(name: str, start: float, end: float, **attrs) -> None:
+    """Exports an already-finished interval (e.g. broker wait) as a child span."""
+    parent = _current.get()
+    if parent is None:
+        return
+    finished = Span(name, parent.trace_id, parent.span_id, attrs)
+    finished.start = start
+    finished.duration = max(0.0, end - start)
+    _exporter.submit(finished.as_dict())
+
+
+def inject_headers() -> Dict[str, str]:
+    """Headers that carry the current trace (if any) and publish time to a task."""
+    headers = {PUBLISHED_AT_HEADER: repr(time.time())}
+    current = _current.get()
+    if current is not None:
+        headers[TRACEPARENT_HEADER] = f"00-{current.trace_id}-{current.span_id}-01"
+    return headers
+
+
+class _Exporter:
+    """Batches finished spans and writes them from a background thread."""
+
+    def __init__(self):
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._pid: int | None = None
+        self._lock = threading.Lock()
+        self._export_lock = threading.Lock()
+
+    def submit(self, record: dict) -> None:
+        if self._pid != os.getpid():
+            self._start()
+        self._queue.put(record)
+
+    def _start(self) -> None:
+        # Per process: the thread does not survive a prefork fork
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name="trace-exporter", daemon=True).start()
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(EXPORT_INTERVAL)
+            self.flush()
+
+    def flush(self) -> None:
+        """Exports everything queued so far, in batches of EXPORT_BATCH."""
+        with self._export_lock:
+            while True:
+                batch = []
+                while len(batch) < EXPORT_BATCH:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not batch:
+                    return
+                self._export(batch)
+
+    def _export(self, batch: list) -> None:
+        try:
+            if COLLECTOR_URL:
+                req = urllib.request.Request(
+                    COLLECTOR_URL, data=json.dumps(batch).encode(),
+                    headers={"Content-Type": "application/json"}, method="POST",
+                )
+                urllib.request.urlopen(req, timeout=5).close()
+            else:
+                os.makedirs(os.path.dirname(TRACE_FILE) or ".", exist_ok=True)
+                with open(TRACE_FILE, "a", encoding="utf-8") as fh:
+                    fh.writelines(json.dumps(record) + "\n" for record in batch)
+        except Exception as e:
+            logging.warning("Dropped %d trace span(s): %s", len(batch), e)
+
+
+_exporter = _Exporter()
+atexit.register(_exporter.flush)
@@ -0,0 +1,94 @@
+"""
+Container Watcher Check
+
+Drives web/docker_state.ContainerWatcher with a fake Docker events source
+through a container's lifecycle (start, die, a dropped events stream,
+destroy, re-create) and prints the state /api/status would report after each
+step, how long the change took to show up, and what a status lookup costs.
+With --docker, also times the old per-request docker.from_env() +
+containers.get() against a real daemon.
+
+Usage:
+    python bench/container_watch.py
+    python bench/container_watch.py --docker --container queuepilot
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "web"))
+
+from docker_state import ContainerWatcher, FakeDockerSource  # noqa: E402
+
+STEPS = [
+    ("start", {"status": "running"}, "running"),
+    ("die", {"status": "exited", "finished_at": "2025-03-01T03:12:45.123456789Z"}, "exited"),
+    ("fail", {}, "exited"),  # stream drops; the watcher reconnects and re-inspects
+    ("destroy", {}, "not_found"),
+    ("create", {"status": "created"}, "created"),
+    ("start", {"status": "running"}, "running"),
+]
+
+
+def wait_for(watcher: ContainerWatcher, status: str, target: int = 0, timeout: float = 5.0) -> float:
+    """Seconds until the watcher has made `target` updates and reports `status`."""
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        if watcher.updates >= target and watcher.info()["status"] == status:
+            return time.perf_counter() - started
+        time.sleep(0.001)
+    raise TimeoutError(f"state did not become {status!r}: {watcher.info()}")
+
+
+def time_calls(func, n: int) -> float:
+    started = time.perf_counter()
+    for _ in range(n):
+        func()
+    return (time.perf_counter() - started) / n
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Exercise the container state watcher.")
+    parser.add_argument("--docker", action="store_true", help="Also time per-request Docker API calls")
+    parser.add_argument("--container", default="queuepilot")
+    parser.add_argument("--calls", type=int, default=100_000)
+    args = parser.parse_args()
+
+    fake = FakeDockerSource(status="exited", finished_at="2025-03-01T03:00:00Z")
+    watcher = ContainerWatcher("queuepilot", lambda: fake, reconnect_delay=0.05)
+    wait_for(watcher, "exited")
+    print(f"{'event':<10} {'state':<12} {'finished_at':<32} {'seen after':>10}")
+    for action, state, expected in STEPS:
+        # A dropped stream is two updates: 'error', then the re-inspected state
+        target = watcher.updates + (2 if action == "fail" else 1)
+        if action == "fail":
+            fake.fail()
+        else:
+            fake.emit(action, **state)
+        seconds = wait_for(watcher, expected, target)
+        info = watcher.info()
+        print(f"{action:<10} {info['status']:<12} {str(info['finished_at']):<32} {seconds * 1000:>8.2f}ms")
+
+    per_call = time_calls(watcher.info, args.calls)
+    print(f"\nwatcher.info(): {per_call * 1e6:.2f} µs per status lookup")
+
+    if args.docker:
+        import docker
+
+        def per_request():
+            client = docker.from_env()
+            try:
+                client.containers.get(args.container)
+            except docker.errors.NotFound:
+                pass
+            finally:
+                client.close()
+
+        per_call = time_calls(per_request, 200)
+        print(f"docker.from_env() + containers.get(): {per_call * 1000:.2f} ms per status lookup")
+
+
+if __name__ == "__main__":
+    main()
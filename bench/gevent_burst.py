@@ -0,0 +1,113 @@
+"""
+Gevent Concurrency Check
+
+Runs hundreds of login_credential tasks concurrently in a single process on a
+gevent pool, against the stub Momentum and Vitec Arena (Razor and WebForms)
+portals, to confirm every handler the HTTP worker runs, the DB layer and
+logging are green-thread safe and to measure throughput. Failures are
+counted per portal type.
+
+Usage:
+    python bench/gevent_burst.py --count 300 --concurrency 300 --latency 0.2
+    python bench/gevent_burst.py --mix vitec --count 200
+
+Requires DB_* and ENCRYPTION_KEY env vars pointing at a scratch database.
+"""
+
+from gevent import monkey
+
+monkey.patch_all()
+
+import argparse  # noqa: E402
+import os  # noqa: E402
+import subprocess  # noqa: E402
+import sys  # noqa: E402
+import time  # noqa: E402
+
+import gevent.pool  # noqa: E402
+
+from throughput import parse_mix  # noqa: E402
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# --mix shorthand for both Vitec Arena variants
+PORTALS = {"vitec": "razor=1,webforms=1"}
+
+
+def seed_portals(count: int, mix: dict, stub_url: str) -> dict:
+    """Seeds `count` credentials split by `mix`; returns the credential ids per portal type."""
+    import seed
+
+    ids, seeded = {}, 0
+    names = list(mix)
+    for i, name in enumerate(names):
+        n = count - seeded if i == len(names) - 1 else round(count * mix[name])
+        if name == "momentum":
+            ids[name] = seed.seed_momentum_sites(n)
+        else:
+            ids[name] = seed.seed_vitec_sites(n, stub_url, variant=name)
+        seeded += len(ids[name])
+    return ids
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Concurrent login_credential burst on gevent.")
+    parser.add_argument("--count", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--mix", default="momentum=1,razor=1,webforms=1",
+                        help="Portal weights, e.g. momentum=2,razor=1 ('vitec' = razor and webforms)")
+    args = parser.parse_args()
+    mix = parse_mix(PORTALS.get(args.mix, args.mix))
+
+    os.environ["MOMENTUM_BASE_URL_TEMPLATE"] = f"http://127.0.0.1:{args.port}/{{url_name}}/{{momentum_id}}"
+    os.environ.setdefault("HTTP_POOL_SIZE", str(args.concurrency))
+
+    stub = subprocess.Popen([
+        sys.executable, os.path.join(HERE, "stubs.py"),
+        "--port", str(args.port), "--latency", str(args.latency),
+    ])
+    try:
+        time.sleep(1.0)
+        import seed
+        from tasks import login_credential
+        from utils.db import get_connection
+
+        seed.create_base_tables()
+        seed.clear()
+        ids = seed_portals(args.count, mix, f"http://127.0.0.1:{args.port}")
+        credential_ids = [(name, cid) for name, cids in ids.items() for cid in cids]
+
+        pool = gevent.pool.Pool(args.concurrency)
+        started = time.monotonic()
+        results = [(name, pool.spawn(login_credential.apply, args=(cid,))) for name, cid in credential_ids]
+        pool.join()
+        elapsed = time.monotonic() - started
+
+        failed = {name: 0 for name in ids}
+        for name, g in results:
+            failed[name] += not g.successful() or g.value.failed()
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT COUNT(*) FROM credentials WHERE site LIKE %s AND last_login IS NOT NULL",
+            (seed.PREFIX + "%",),
+        )
+        logged_in = cursor.fetchone()[0]
+        cursor.close()
+        conn.close()
+
+        print(f"tasks:        {len(credential_ids)} ({sum(failed.values())} failed)")
+        for name, cids in ids.items():
+            print(f"  {name + ':':<12}{len(cids)} ({failed[name]} failed)")
+        print(f"logged in:    {logged_in}")
+        print(f"elapsed:      {elapsed:.2f} s")
+        print(f"throughput:   {len(credential_ids) / elapsed * 60:.0f} logins/min")
+        seed.clear()
+    finally:
+        stub.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmark Data Seeding
+
+Creates (and removes) synthetic sites and credentials in a scratch MariaDB so
+the benchmarks have something to log in to. Never point this at production:
+it writes rows under a name prefix and may set the Momentum API key setting
+if it is empty.
+
+Requires DB_HOST, DB_USER, DB_PASS, DB_NAME and ENCRYPTION_KEY.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from utils.crypto import encrypt_password  # noqa: E402
+from utils.db import get_connection, ensure_schema  # noqa: E402
+
+PREFIX = "bench"
+
+
+def create_base_tables() -> None:
+    """Creates the base sites/credentials tables on an empty database."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sites (
+            url_name VARCHAR(100) PRIMARY KEY,
+            fullname VARCHAR(255) NOT NULL,
+            base_url VARCHAR(500) NULL DEFAULT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS credentials (
+            site VARCHAR(100) NOT NULL,
+            customer_id INT NOT NULL,
+            username VARCHAR(255) NOT NULL,
+            password TEXT NOT NULL,
+            active TINYINT(1) NOT NULL DEFAULT 1,
+            last_login DATETIME NULL DEFAULT NULL,
+            PRIMARY KEY (site, customer_id)
+        )
+    """)
+    conn.commit()
+    cursor.close()
+    conn.close()
+    ensure_schema()
+
+
+def _seed(names: list, system_type: str, base_urls: list, customer_id: int, password: str) -> list:
+    """Inserts one site and one active credential per name; returns their credentials.id."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.executemany(
+        "INSERT IGNORE INTO sites (url_name, fullname, system_type, momentum_id, base_url) "
+        "VALUES (%s,%s,%s,%s,%s)",
+        [(n, f"Bench {n}", system_type, "Bench" if system_type == "momentum" else None, url)
+         for n, url in zip(names, base_urls)],
+    )
+    cursor.executemany(
+        "INSERT IGNORE INTO credentials (site, customer_id, username, password, active) VALUES (%s,%s,%s,%s,1)",
+        [(n, customer_id, f"user-{n}", password) for n in names],
+    )
+    if system_type == "momentum":
+        cursor.execute(
+            "UPDATE settings SET `value`='bench-api-key' WHERE `key`='momentum_api_key' AND `value`=''"
+        )
+    conn.commit()
+    ids = []
+    for i in range(0, len(names), 1000):
+        chunk = names[i:i + 1000]
+        cursor.execute(
+            f"SELECT id FROM credentials WHERE customer_id=%s AND site IN ({','.join(['%s'] * len(chunk))}) "
+            "ORDER BY site",
+            (customer_id, *chunk),
+        )
+        ids.extend(row[0] for row in cursor.fetchall())
+    cursor.close()
+    conn.close()
+    return ids
+
+
+def seed_momentum_sites(count: int, customer_id: int = 1, prefix: str = PREFIX,
+                        failing: float = 0.0) -> list:
+    """
+    Inserts `count` Momentum sites with one active credential each.
+
+    The first `failing` fraction get a password the stub portals reject.
+
+    Returns:
+        list: The credentials.id of every seeded credential.
+    """
+    names = [f"{prefix}{i:05d}" for i in range(count)]
+    return _seed_with_failures(names, "momentum", [None] * count, customer_id, failing)
+
+
+def seed_vitec_sites(count: int, stub_url: str, variant: str = "razor", customer_id: int = 1,
+                     prefix: str = PREFIX, failing: float = 0.0) -> list:
+    """
+    Inserts `count` Vitec Arena sites pointing at the stub server, one active
+    credential each.
+
+    Args:
+        count: Number of sites.
+        stub_url: The stub server root, e.g. http://127.0.0.1:8900.
+        variant: 'razor' or 'webforms' (see bench/stubs.py).
+        failing: Fraction of credentials seeded with a rejected password.
+
+    Returns:
+        list: The credentials.id of every seeded credential.
+    """
+    names = [f"{prefix}{variant[0]}{i:05d}" for i in range(count)]
+    base_urls = [f"{stub_url.rstrip('/')}/vitec/{variant}/{n}" for n in names]
+    return _seed_with_failures(names, "vitec", base_urls, customer_id, failing)
+
+
+def _seed_with_failures(names: list, system_type: str, base_urls: list, customer_id: int,
+                        failing: float) -> list:
+    cut = int(len(names) * failing)
+    ids = []
+    if cut:
+        ids += _seed(names[:cut], system_type, base_urls[:cut], customer_id,
+                     encrypt_password("wrong-password"))
+    ids += _seed(names[cut:], system_type, base_urls[cut:], customer_id,
+                 encrypt_password("bench-password"))
+    return ids
+
+
+def clear(prefix: str = PREFIX) -> None:
+    """Deletes every seeded site and credential with the given prefix."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM credentials WHERE site LIKE %s", (prefix + "%",))
+    cursor.execute("DELETE FROM sites WHERE url_name LIKE %s", (prefix + "%",))
+    conn.commit()
+    cursor.close()
+    conn.close()
@@ -0,0 +1,136 @@
+"""
+Startup Import Benchmark
+
+Measures what importing QueuePilot's entry points costs, so `main.py --site
+<one>` and worker boot stay fast as handlers are added. Each target is
+imported in a fresh interpreter (from app/) with `-X importtime`, several
+times. Reports the median total import time, the module count and the slowest
+imports by cumulative time, and which handler modules were loaded.
+
+Targets:
+    cli       main.py's imports (before any site is dispatched)
+    worker    what a Celery worker boots: celery_app, tasks, scheduler
+    registry  handlers (the registry alone)
+    handler:<system_type>  the registry plus one handler, as on first dispatch
+
+Usage:
+    python bench/startup_imports.py
+    python bench/startup_imports.py --target cli --target handler:momentum --top 15
+    python bench/startup_imports.py --json startup.json --budget cli=400 --budget worker=600
+
+With --budget, exits non-zero if a target's median exceeds its budget (ms),
+so it can run in CI. --json writes the results for tracking over time.
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(HERE, "..", "app")
+
+TARGETS = {
+    "cli": "import main",
+    "worker": "import celery_app, tasks, scheduler",
+    "registry": "import handlers",
+}
+DEFAULT_TARGETS = ["registry", "cli", "worker", "handler:momentum", "handler:vitec"]
+# Printed after the import, to see which handler modules a target pulled in
+REPORT_LOADED = "import sys; print(','.join(sorted(m for m in sys.modules if m.startswith('sites.'))))"
+
+_IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def target_code(target: str) -> str:
+    if target.startswith("handler:"):
+        return f"from handlers import HANDLERS; HANDLERS[{target.split(':', 1)[1]!r}]"
+    return TARGETS[target]
+
+
+def _importtime(code: str) -> tuple:
+    """Runs code in a fresh interpreter; returns its (module, cumulative ms, depth) imports and stdout."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=APP_DIR, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import failed:\n{proc.stderr[-2000:]}")
+    modules = []
+    for line in proc.stderr.splitlines():
+        match = _IMPORTTIME.match(line)
+        if match:
+            modules.append((match.group(4), int(match.group(2)) / 1000, len(match.group(3)) // 2))
+    return modules, proc.stdout
+
+
+def interpreter_modules() -> set:
+    """Modules the interpreter imports at startup (site, .pth hooks), left out of every target."""
+    return {name for name, _, _ in _importtime("pass")[0]}
+
+
+def measure(target: str, baseline: set) -> dict:
+    """One import of a target in a fresh interpreter, without the interpreter's own startup."""
+    modules, stdout = _importtime(f"{target_code(target)}; {REPORT_LOADED}")
+    modules = [m for m in modules if m[0] not in baseline]
+    # Top-level entries (depth 0) add up to the whole import
+    total = sum(cumulative for _, cumulative, depth in modules if depth == 0)
+    return {
+        "ms": total,
+        "modules": len(modules),
+        "slowest": sorted(((name, cumulative) for name, cumulative, _ in modules), key=lambda m: -m[1]),
+        "handlers": [m for m in stdout.strip().split(",") if m],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure QueuePilot's startup import time.")
+    parser.add_argument("--target", action="append", help=f"Target to measure (default: {', '.join(DEFAULT_TARGETS)})")
+    parser.add_argument("--runs", type=int, default=5, help="Imports per target; the median is reported")
+    parser.add_argument("--top", type=int, default=8, help="Slowest imports to list per target")
+    parser.add_argument("--json", type=str, help="Also write the results to this file")
+    parser.add_argument("--budget", action="append", default=[], metavar="TARGET=MS",
+                        help="Fail if the target's median import time exceeds MS")
+    args = parser.parse_args()
+
+    targets = args.target or DEFAULT_TARGETS
+    budgets = {t: float(ms) for t, ms in (b.split("=", 1) for b in args.budget)}
+    baseline = interpreter_modules()
+    # The first import also compiles bytecode; keep it out of the numbers
+    for target in targets:
+        measure(target, baseline)
+
+    results, over = {}, []
+    for target in targets:
+        runs = [measure(target, baseline) for _ in range(args.runs)]
+        median = statistics.median(r["ms"] for r in runs)
+        last = runs[-1]
+        results[target] = {
+            "median_ms": round(median, 1),
+            "min_ms": round(min(r["ms"] for r in runs), 1),
+            "modules": last["modules"],
+            "handlers": last["handlers"],
+            "slowest": [{"module": m, "ms": round(ms, 1)} for m, ms in last["slowest"][:args.top]],
+        }
+        budget = budgets.get(target)
+        flag = ""
+        if budget is not None and median > budget:
+            over.append(target)
+            flag = f"  OVER BUDGET ({budget:.0f} ms)"
+        print(f"\n{target}: {median:.1f} ms median (min {results[target]['min_ms']:.1f}), "
+              f"{last['modules']} modules, handlers: {', '.join(last['handlers']) or 'none'}{flag}")
+        for entry in results[target]["slowest"]:
+            print(f"    {entry['ms']:>8.1f} ms  {entry['module']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump({"python": sys.version.split()[0], "runs": args.runs, "targets": results}, fh, indent=2)
+    if over:
+        sys.exit(f"Over budget: {', '.join(over)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+"""
+Stub Portal Servers
+
+Local stand-ins for the housing portals QueuePilot logs in to, so handlers can
+be exercised and load-tested without touching real sites. One server answers
+for every portal type:
+
+  - Momentum PmApi: any path ending in /auth, /auth/logout or
+    /market/applicant/status. Point the handlers at the stub with
+        MOMENTUM_BASE_URL_TEMPLATE=http://127.0.0.1:<port>/{url_name}/{momentum_id}
+  - Vitec Arena, ASP.NET Core Razor Pages: base_url http://127.0.0.1:<port>/vitec/razor/<site>
+  - Vitec Arena, ASP.NET WebForms:         base_url http://127.0.0.1:<port>/vitec/webforms/<site>
+  - JSONP widgets (AB Bostäder, Hemvist): /widgets/?callback=<fn>&widgets[]=...
+
+Passwords starting with "wrong" are rejected, so failed logins can be mixed in.
+Every request first waits --latency (± --jitter) seconds, then may be answered
+with a 500 (--error-rate) or a 429 with Retry-After (--throttle-rate, or once
+more than --rate-limit requests per second arrive).
+
+Usage:
+    python bench/stubs.py --port 8900 --latency 0.2
+    python bench/stubs.py --latency 0.3 --jitter 0.2 --error-rate 0.02 --rate-limit 200
+"""
+
+import argparse
+import json
+import random
+import re
+import secrets
+import threading
+import time
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+_VITEC_RE = re.compile(r"^/vitec/(razor|webforms)/([^/]+)(/.*)$")
+
+ANTIFORGERY_COOKIE = ".AspNetCore.Antiforgery.stub"
+SESSION_COOKIE = ".AspNetCore.Identity.Application"
+
+_LOGIN_PAGE = """<!DOCTYPE html>
+<html><head><title>Logga in</title></head><body>
+<form method="post" action="{action}">
+{fields}
+</form>
+</body></html>
+"""
+
+_RAZOR_FIELDS = """<input name="__RequestVerificationToken" type="hidden" value="{token}" />
+<input id="UserId" name="UserId" type="text" value="" />
+<input id="Password" name="Password" type="password" value="" />
+<button type="submit">Logga in</button>"""
+
+_WEBFORMS_FIELDS = """<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="{token}" />
+<input type="hidden" name="__EVENTVALIDATION" id="__EVENTVALIDATION" value="{token}" />
+<input name="ctl00$MainContent$txtUserID" type="text" id="txtUserID" />
+<input name="ctl00$MainContent$txtPassword" type="password" id="txtPassword" />
+<input type="submit" name="ctl00$MainContent$btnLogin" value="Logga in" />"""
+
+_QUEUE_PAGE = """<!DOCTYPE html>
+<html><head><title>Mina sidor</title></head><body>
+<div class="list-group-object">
+  <p class="user-activity-description-cc">Sök lägenhet</p>
+  <span class="object-description-type">Poäng</span>: <p>1&#xA0;520</p>
+</div>
+<div class="list-group-object">
+  <p class="user-activity-description-cc">Sök studentlägenhet</p>
+  <span class="object-description-type">Ködatum</span>: <p>2021-09-01</p>
+</div>
+</body></html>
+"""
+
+
+class StubConfig:
+    """Behaviour knobs shared by every stub request handler."""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 throttle_rate: float = 0.0, rate_limit: float = 0.0, retry_after: int = 1,
+                 seed: int | None = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._window_count = 0
+
+    def delay(self) -> float:
+        """Seconds to wait before answering one request."""
+        with self._lock:
+            jitter = self._random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0
+        return max(0.0, self.latency + jitter)
+
+    def fault(self) -> int | None:
+        """Returns 429 or 500 if this request should fail, otherwise None."""
+        with self._lock:
+            if self.rate_limit:
+                now = time.monotonic()
+                if now - self._window_start >= 1.0:
+                    self._window_start, self._window_count = now, 0
+                self._window_count += 1
+                if self._window_count > self.rate_limit:
+                    return 429
+            roll = self._random.random()
+        if roll < self.throttle_rate:
+            return 429
+        if roll < self.throttle_rate + self.error_rate:
+            return 500
+        return None
+
+
+class PortalStubHandler(BaseHTTPRequestHandler):
+    """Request handler serving the stubbed portal endpoints."""
+
+    config = StubConfig()
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):  # keep benchmark output clean
+        pass
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _cookies(self) -> dict:
+        jar = SimpleCookie(self.headers.get("Cookie") or "")
+        return {name: morsel.value for name, morsel in jar.items()}
+
+    def _send(self, status: int, body: bytes, content_type: str = "application/json",
+              headers: dict | None = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, data) -> None:
+        self._send(status, json.dumps(data).encode())
+
+    def _send_html(self, status: int, html: str, headers: dict | None = None) -> None:
+        self._send(status, html.encode(), "text/html; charset=utf-8", headers)
+
+    def _redirect(self, location: str, cookie: str | None = None) -> None:
+        headers = {"Location": location}
+        if cookie:
+            headers["Set-Cookie"] = cookie
+        self._send(302, b"", "text/html", headers)
+
+    def _handle(self, method: str) -> None:
+        body = self._read_body()
+        time.sleep(self.config.delay())
+        fault = self.config.fault()
+        if fault == 429:
+            self._send(429, b'{"error": "Too Many Requests"}', headers={
+                "Retry-After": str(self.config.retry_after),
+            })
+            return
+        if fault == 500:
+            self._send_json(500, {"error": "Internal Server Error"})
+            return
+
+        parts = urlsplit(self.path)
+        vitec = _VITEC_RE.match(parts.path)
+        if vitec:
+            variant, site, path = vitec.groups()
+            self._vitec(method, variant, f"/vitec/{variant}/{site}", path, body)
+        elif parts.path.rstrip("/").endswith("/widgets") and method == "GET":
+            self._widgets(parse_qs(parts.query))
+        else:
+            self._momentum(method, parts.path, body)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    # --- Momentum PmApi ---
+
+    def _momentum(self, method: str, path: str, body: bytes) -> None:
+        if method == "GET" and path.endswith("/market/applicant/status"):
+            self._send_json(200, {"queues": [
+                {"displayName": "Bostad", "value": "1520", "valueUnitDisplayName": "dagar"},
+                {"displayName": "Parkering", "joined": "/Date(1577836800000+0100)/"},
+            ]})
+        elif method == "POST" and path.endswith("/auth/logout"):
+            self._send_json(200, {})
+        elif method == "POST" and path.endswith("/auth"):
+            payload = json.loads(body or b"{}")
+            key = payload.get("key") or ""
+            if key and not key.startswith("wrong"):
+                self._send_json(200, {"completed": {"accessToken": "stub-token"}})
+            else:
+                self._send_json(200, {"failed": {"reason": "InvalidCredentials"}})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    # --- Vitec Arena (Razor Pages and WebForms) ---
+
+    def _vitec(self, method: str, variant: str, prefix: str, path: str, body: bytes) -> None:
+        cookies = self._cookies()
+        login_page = f"{prefix}/mina-sidor/logga-in"
+
+        if path == "/mina-sidor/logga-in" and method == "GET":
+            self._vitec_login_page(variant, prefix)
+        elif method == "POST" and (
+            (variant == "razor" and path == "/Account/Login")
+            or (variant == "webforms" and path == "/mina-sidor/logga-in")
+        ):
+            form = {k: v[0] for k, v in parse_qs(body.decode(), keep_blank_values=True).items()}
+            if variant == "razor":
+                if ANTIFORGERY_COOKIE not in cookies:
+                    self._send_html(400, "<h1>Bad Request</h1>")
+                    return
+                username, password = form.get("UserId"), form.get("Password", "")
+            else:
+                if "__VIEWSTATE" not in form:
+                    self._send_html(400, "<h1>Bad Request</h1>")
+                    return
+                username = form.get("ctl00$MainContent$txtUserID")
+                password = form.get("ctl00$MainContent$txtPassword", "")
+            if username and password and not password.startswith("wrong"):
+                self._redirect(
+                    f"{prefix}/mina-sidor/",
+                    f"{SESSION_COOKIE}={secrets.token_hex(16)}; Path=/; HttpOnly",
+                )
+            else:
+                self._redirect(login_page)
+        elif path == "/mina-sidor/" and method == "GET":
+            if SESSION_COOKIE in cookies:
+                self._send_html(200, _QUEUE_PAGE)
+            else:
+                self._redirect(login_page)
+        elif path == "/Account/Logout":
+            self._redirect(login_page, f"{SESSION_COOKIE}=; Path=/; Max-Age=0")
+        else:
+            self._send_html(404, "<h1>Not Found</h1>")
+
+    def _vitec_login_page(self, variant: str, prefix: str) -> None:
+        token = secrets.token_urlsafe(24)
+        if variant == "razor":
+            fields = _RAZOR_FIELDS.format(token=token)
+            html = _LOGIN_PAGE.format(action=f"{prefix}/Account/Login", fields=fields)
+            self._send_html(200, html, {
+                "Set-Cookie": f"{ANTIFORGERY_COOKIE}={token}; Path=/; HttpOnly",
+            })
+        else:
+            fields = _WEBFORMS_FIELDS.format(token=token)
+            self._send_html(200, _LOGIN_PAGE.format(action="./logga-in", fields=fields))
+
+    # --- JSONP widgets ---
+
+    def _widgets(self, query: dict) -> None:
+        callback = (query.get("callback") or ["callback"])[0]
+        data = {"data": {}}
+        for widget in query.get("widgets[]", []):
+            if widget.startswith("koerochprenumerationer"):
+                data["data"][widget] = {"kodagar": 1520}
+            elif widget == "kontaktuppgifter":
+                data["data"][widget] = {"namn": "Bench Användare"}
+            else:
+                data["data"][widget] = {}
+        body = f"{callback}({json.dumps(data, ensure_ascii=False)});"
+        self._send(200, body.encode(), "application/javascript; charset=utf-8")
+
+
+def serve(port: int, config: StubConfig) -> ThreadingHTTPServer:
+    """Creates (but does not start) a stub server bound to 127.0.0.1:<port>."""
+    PortalStubHandler.config = config
+    server = ThreadingHTTPServer(("127.0.0.1", port), PortalStubHandler)
+    server.daemon_threads = True
+    return server
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Adds the stub behaviour options, shared with the benchmark scripts."""
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random ± seconds around --latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--rate-limit", type=float, default=0.0,
+                        help="Answer 429 above this many requests per second (0: unlimited)")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for reproducible fault injection")
+
+
+def stub_args(args: argparse.Namespace) -> list:
+    """Turns parsed stub options back into stubs.py command-line arguments."""
+    argv = [
+        "--latency", str(args.latency), "--jitter", str(args.jitter),
+        "--error-rate", str(args.error_rate), "--throttle-rate", str(args.throttle_rate),
+        "--rate-limit", str(args.rate_limit), "--retry-after", str(args.retry_after),
+    ]
+    if args.seed is not None:
+        argv += ["--seed", str(args.seed)]
+    return argv
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run local stub portal servers.")
+    parser.add_argument("--port", type=int, default=8900)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    config = StubConfig(
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate, rate_limit=args.rate_limit,
+        retry_after=args.retry_after, seed=args.seed,
+    )
+    server = serve(args.port, config)
+    print(f"Stub portals listening on http://127.0.0.1:{args.port}", flush=True)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
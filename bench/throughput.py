@@ -0,0 +1,281 @@
+"""
+End-to-End Throughput Benchmark
+
+Starts the stub portals (bench/stubs.py), seeds N credentials into a scratch
+MariaDB and refreshes all of them, either with `main.py --site all` or with a
+Celery worker fed by scheduler.enqueue_stale_credentials. Reports
+credentials/minute, p50/p95/p99 login latency, outcome counts and the peak
+resident memory of the process tree doing the work.
+
+Usage:
+    python bench/throughput.py --count 500 --target main
+    python bench/throughput.py --count 2000 --target celery --pool gevent --concurrency 200
+    python bench/throughput.py --count 1000 --target both --mix momentum=2,razor=1,webforms=1 \\
+        --latency 0.3 --jitter 0.1 --throttle-rate 0.01 --json results.json
+
+Requires DB_* and ENCRYPTION_KEY env vars (and REDIS_URL for the Celery
+target) pointing at scratch services. Every active credential for customer 1
+in that database is part of the run, so start from an empty one.
+"""
+
+import argparse
+import collections
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(HERE, "..", "app")
+
+import stubs  # noqa: E402
+
+
+def parse_mix(spec: str) -> dict:
+    """Parses 'momentum=2,razor=1' into normalised weights per portal type."""
+    weights = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ("momentum", "razor", "webforms"):
+            raise argparse.ArgumentTypeError(f"unknown portal type '{name}'")
+        weights[name] = float(weight or 1)
+    total = sum(weights.values())
+    return {name: w / total for name, w in weights.items()}
+
+
+def seed_credentials(count: int, mix: dict, stub_url: str, failing: float) -> int:
+    """Replaces any earlier bench data with `count` credentials split by `mix`."""
+    import seed
+
+    seed.clear()
+    seeded = 0
+    names = list(mix)
+    for i, name in enumerate(names):
+        n = count - seeded if i == len(names) - 1 else round(count * mix[name])
+        if name == "momentum":
+            seeded += len(seed.seed_momentum_sites(n, failing=failing))
+        else:
+            seeded += len(seed.seed_vitec_sites(n, stub_url, variant=name, failing=failing))
+    return seeded
+
+
+def _children(pid: int) -> list:
+    children = []
+    try:
+        for tid in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{tid}/children") as fh:
+                children.extend(int(c) for c in fh.read().split())
+    except OSError:
+        pass
+    return children
+
+
+def tree_rss_kib(pid: int) -> int:
+    """Current resident memory of a process and all its descendants (Linux /proc)."""
+    total, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        try:
+            with open(f"/proc/{current}/status") as fh:
+                for line in fh:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+                        break
+        except OSError:
+            continue
+        stack.extend(_children(current))
+    return total
+
+
+def summarize(target: str, elapsed: float, durations: list, statuses: collections.Counter,
+              peak_rss_kib: int) -> dict:
+    from utils.timing import percentiles
+
+    return {
+        "target": target,
+        "credentials": len(durations),
+        "elapsed_seconds": round(elapsed, 2),
+        "credentials_per_minute": round(len(durations) / elapsed * 60, 1) if elapsed else None,
+        "latency": percentiles(durations),
+        "statuses": dict(statuses),
+        "peak_rss_mib": round(peak_rss_kib / 1024, 1),
+    }
+
+
+def run_main(env: dict, workers: int) -> dict:
+    """Runs `main.py --site all --report json` and summarizes its report."""
+    with tempfile.TemporaryDirectory() as tmp:
+        report_path = os.path.join(tmp, "report.json")
+        proc = subprocess.Popen(
+            [sys.executable, "main.py", "--site", "all", "--report", "json", "--report-path", report_path],
+            cwd=APP_DIR, env={**env, "MAX_WORKERS": str(workers)},
+        )
+        started = time.monotonic()
+        peak = 0
+        while True:
+            pid, status, usage = os.wait4(proc.pid, os.WNOHANG)
+            if pid:
+                break
+            peak = max(peak, tree_rss_kib(proc.pid))
+            time.sleep(0.1)
+        elapsed = time.monotonic() - started
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        if proc.returncode != 0:
+            raise RuntimeError(f"main.py exited with {proc.returncode}")
+        with open(report_path, encoding="utf-8") as fh:
+            report = json.load(fh)
+
+    runs = report["credentials"]
+    return summarize(
+        "main", elapsed,
+        [run["total"] for run in runs],
+        collections.Counter(run["status"] for run in runs),
+        max(peak, usage.ru_maxrss),
+    )
+
+
+def _outcomes_since(marker: int) -> list:
+    from utils.db import get_connection
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT site, customer_id, status, duration_ms FROM run_outcomes WHERE id > %s ORDER BY id",
+        (marker,)
+    )
+    rows = cursor.fetchall()
+    cursor.close()
+    conn.close()
+    return rows
+
+
+def run_celery(env: dict, pool: str, concurrency: int, timeout: float) -> dict:
+    """
+    Starts a Celery worker on every login queue, enqueues all stale credentials
+    and waits until each has a first outcome in run_outcomes.
+    """
+    from celery_app import celery, DEFAULT_QUEUE, SYSTEM_TYPE_QUEUES, AFFINITY_QUEUES
+    from scheduler import enqueue_stale_credentials
+    from utils.affinity import shard_queues
+    from utils.db import get_connection
+
+    queues = {DEFAULT_QUEUE, *SYSTEM_TYPE_QUEUES.values()}
+    for base in AFFINITY_QUEUES:
+        queues.update(shard_queues(base))
+
+    worker = subprocess.Popen(
+        [sys.executable, "-m", "celery", "-A", "celery_app", "worker", "--loglevel=WARNING",
+         "-P", pool, "-c", str(concurrency), "-Q", ",".join(sorted(queues)),
+         "-n", f"bench-{os.getpid()}@%h"],
+        cwd=APP_DIR, env={**env, "OUTCOME_FLUSH_SECONDS": "1"},
+    )
+    try:
+        deadline = time.monotonic() + 60
+        while not celery.control.ping(timeout=1.0):
+            if worker.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError("Celery worker did not start")
+
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM run_outcomes")
+        marker = cursor.fetchone()[0]
+        cursor.close()
+        conn.close()
+
+        started = time.monotonic()
+        expected = enqueue_stale_credentials()
+        peak = 0
+        firsts = {}
+        while len(firsts) < expected and time.monotonic() - started < timeout:
+            peak = max(peak, tree_rss_kib(worker.pid))
+            time.sleep(0.5)
+            for site, customer_id, status, duration_ms in _outcomes_since(marker):
+                firsts.setdefault((site, customer_id), (status, duration_ms / 1000))
+        elapsed = time.monotonic() - started
+        if len(firsts) < expected:
+            print(f"timed out: {len(firsts)}/{expected} credentials finished", file=sys.stderr)
+    finally:
+        worker.send_signal(signal.SIGTERM)
+        try:
+            worker.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            worker.kill()
+
+    return summarize(
+        f"celery ({pool} x{concurrency})", elapsed,
+        [duration for _, duration in firsts.values()],
+        collections.Counter(status for status, _ in firsts.values()),
+        peak,
+    )
+
+
+def print_result(result: dict) -> None:
+    latency = result["latency"]
+    print(f"\n== {result['target']} ==")
+    print(f"credentials:  {result['credentials']} in {result['elapsed_seconds']} s")
+    print(f"throughput:   {result['credentials_per_minute']} credentials/min")
+    if latency.get("count"):
+        print(f"latency:      p50 {latency['p50']} s  p95 {latency['p95']} s  "
+              f"p99 {latency['p99']} s  max {latency['max']} s")
+    print(f"outcomes:     {result['statuses']}")
+    print(f"peak RSS:     {result['peak_rss_mib']} MiB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="End-to-end login throughput against stub portals.")
+    parser.add_argument("--count", type=int, default=500, help="Credentials to seed")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("momentum=1,razor=1,webforms=1"),
+                        help="Portal types and weights, e.g. momentum=2,razor=1,webforms=1")
+    parser.add_argument("--failing", type=float, default=0.0, help="Fraction of credentials with a rejected password")
+    parser.add_argument("--target", choices=["main", "celery", "both"], default="main")
+    parser.add_argument("--workers", type=int, default=10, help="main.py MAX_WORKERS")
+    parser.add_argument("--pool", choices=["threads", "gevent", "prefork"], default="threads")
+    parser.add_argument("--concurrency", type=int, default=50, help="Celery worker concurrency")
+    parser.add_argument("--timeout", type=float, default=1800, help="Give up on the Celery run after this many seconds")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--json", type=str, help="Also write the results to this file")
+    parser.add_argument("--keep", action="store_true", help="Keep the seeded rows afterwards")
+    stubs.add_arguments(parser)
+    args = parser.parse_args()
+
+    stub_url = f"http://127.0.0.1:{args.port}"
+    os.environ["MOMENTUM_BASE_URL_TEMPLATE"] = f"{stub_url}/{{url_name}}/{{momentum_id}}"
+    os.environ.setdefault("HTTP_POOL_SIZE", str(max(args.workers, args.concurrency)))
+    sys.path.insert(0, APP_DIR)
+    env = dict(os.environ)
+
+    stub = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, "stubs.py"), "--port", str(args.port), *stubs.stub_args(args)]
+    )
+    results = []
+    try:
+        time.sleep(1.0)
+        import seed
+
+        seed.create_base_tables()
+        targets = ["main", "celery"] if args.target == "both" else [args.target]
+        for target in targets:
+            seeded = seed_credentials(args.count, args.mix, stub_url, args.failing)
+            print(f"Seeded {seeded} credentials ({', '.join(f'{k} {v:.0%}' for k, v in args.mix.items())})")
+            if target == "main":
+                result = run_main(env, args.workers)
+            else:
+                result = run_celery(env, args.pool, args.concurrency, args.timeout)
+            print_result(result)
+            results.append(result)
+        if not args.keep:
+            seed.clear()
+    finally:
+        stub.terminate()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump({"arguments": {k: v for k, v in vars(args).items() if k != "mix"} | {"mix": args.mix},
+                       "results": results}, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
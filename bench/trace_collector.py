@@ -0,0 +1,92 @@
+"""
+Local Trace Collector
+
+Stand-in for a tracing backend. Receives span batches POSTed by
+app/utils/tracing.py (TRACE_COLLECTOR_URL=http://127.0.0.1:4318/v1/spans),
+appends them to a JSON-lines file and can summarise any such file — queue
+wait, per-span-name and per-host latency percentiles, and the slowest
+spans with their trace IDs.
+
+Usage:
+    python bench/trace_collector.py serve --port 4318 --out traces.jsonl
+    python bench/trace_collector.py summary traces.jsonl
+"""
+
+import argparse
+import json
+import math
+import threading
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _pct(values, p):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def summarize(path: str, top: int = 10) -> None:
+    """Prints latency percentiles and outliers for the spans in a file."""
+    spans = []
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            if line.strip():
+                spans.append(json.loads(line))
+
+    groups = defaultdict(list)
+    for s in spans:
+        groups[s["name"]].append(s["duration"])
+        if s["name"] == "http":
+            groups[f"http {s['attrs'].get('host')}"].append(s["duration"])
+
+    print(f"{len(spans)} span(s) in {len({s['trace_id'] for s in spans})} trace(s)\n")
+    print(f"{'span':<50} {'count':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    for name, durations in sorted(groups.items()):
+        print(f"{name:<50} {len(durations):>7} {_pct(durations, 50):>8.3f} {_pct(durations, 95):>8.3f} "
+              f"{_pct(durations, 99):>8.3f} {max(durations):>8.3f}")
+
+    print(f"\nSlowest {top} span(s):")
+    for s in sorted(spans, key=lambda s: s["duration"], reverse=True)[:top]:
+        print(f"  {s['duration']:8.3f}s  {s['name']:<20} trace={s['trace_id']} {json.dumps(s['attrs'])}")
+
+
+def serve(port: int, out: str) -> None:
+    """Accepts span batches on POST /v1/spans and appends them to `out`."""
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            batch = json.loads(self.rfile.read(length) or b"[]")
+            with lock, open(out, "a", encoding="utf-8") as fh:
+                fh.writelines(json.dumps(s) + "\n" for s in batch)
+            self.send_response(204)
+            self.end_headers()
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    print(f"Collecting spans on http://127.0.0.1:{port}/v1/spans → {out}", flush=True)
+    server.serve_forever()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local trace collector and summariser.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_serve = sub.add_parser("serve")
+    p_serve.add_argument("--port", type=int, default=4318)
+    p_serve.add_argument("--out", default="traces.jsonl")
+    p_sum = sub.add_parser("summary")
+    p_sum.add_argument("path")
+    p_sum.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve(args.port, args.out)
+    else:
+        summarize(args.path, args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""
+Web API Load Test
+
+Replays dashboard traffic against a running web API: each virtual user loads
+the dashboard (the first /api/sites page and /api/status together), polls
+/api/status, and now and then reloads, pages on, opens and saves a site, or
+toggles one. Afterwards it
+reports per endpoint: requests, throughput, errors, p50/p95/p99 latency and
+database queries per request (scraped from the API's /metrics).
+
+Usage:
+    python bench/web_seed.py --count 100000
+    python bench/web_load.py --url http://127.0.0.1:5000 --users 20 --duration 60
+    python bench/web_load.py --users 50 --poll-interval 0 --json web-load.json
+
+Only sites seeded by bench/web_seed.py are edited or toggled. DB query counts
+are exact when the API runs as a single process.
+"""
+
+import argparse
+import collections
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from utils.timing import percentiles  # noqa: E402
+
+# Name prefix of the rows bench/web_seed.py creates
+SEED_PREFIX = "load"
+
+_DB_QUERIES_RE = re.compile(
+    r'^queuepilot_web_db_queries_total\{endpoint="([^"]+)",operation="([^"]+)"\} ([0-9.e+]+)$',
+    re.MULTILINE,
+)
+
+
+class Stats:
+    """Thread-safe latencies and status codes per endpoint."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = collections.defaultdict(list)
+        self.statuses = collections.defaultdict(collections.Counter)
+
+    def add(self, endpoint: str, seconds: float, status: int | str) -> None:
+        with self._lock:
+            self.latencies[endpoint].append(seconds)
+            self.statuses[endpoint][status] += 1
+
+
+class VirtualUser:
+    """One dashboard tab: loads, polls, and occasionally edits or toggles."""
+
+    def __init__(self, base_url: str, stats: Stats, args: argparse.Namespace, rng_seed: int):
+        self.base_url = base_url.rstrip("/")
+        self.stats = stats
+        self.args = args
+        self.rnd = random.Random(rng_seed)
+        self.http = requests.Session()
+        self.sites: list = []
+        self.next_cursor: str | None = None
+
+    def _call(self, endpoint: str, method: str, path: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            resp = self.http.request(method, self.base_url + path, timeout=self.args.timeout, **kwargs)
+            status = resp.status_code
+            return resp
+        except requests.RequestException as exc:
+            status = type(exc).__name__
+            return None
+        finally:
+            self.stats.add(endpoint, time.perf_counter() - started, status)
+
+    def find_seeded_sites(self) -> None:
+        resp = self._call("api_list_sites_search", "GET", "/api/sites",
+                          params={"q": SEED_PREFIX, "sort": "url_name", "limit": 500})
+        if resp is not None and resp.ok:
+            self.sites = [s["url_name"] for s in resp.json().get("sites", [])
+                          if s["url_name"].startswith(SEED_PREFIX)]
+
+    def load_dashboard(self) -> None:
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            sites = pool.submit(self._call, "api_list_sites", "GET", "/api/sites",
+                                params={"active": "true", "limit": self.args.page_size})
+            pool.submit(self._call, "api_status", "GET", "/api/status")
+        resp = sites.result()
+        if resp is not None and resp.ok:
+            self.next_cursor = resp.json().get("next_cursor")
+
+    def next_page(self) -> None:
+        resp = self._call("api_list_sites_page", "GET", "/api/sites", params={
+            "active": "true", "limit": self.args.page_size, "cursor": self.next_cursor,
+        })
+        self.next_cursor = resp.json().get("next_cursor") if resp is not None and resp.ok else None
+
+    def edit_site(self) -> None:
+        url_name = self.rnd.choice(self.sites)
+        resp = self._call("api_get_site", "GET", f"/api/sites/{url_name}")
+        if resp is None or not resp.ok:
+            return
+        site = resp.json()
+        site["fullname"] = re.sub(r" \(edited \d+\)$", "", site["fullname"]) + f" (edited {self.rnd.randint(1, 99)})"
+        site["password"] = ""
+        self._call("api_update_site", "PUT", f"/api/sites/{url_name}", json=site)
+
+    def toggle_site(self) -> None:
+        url_name = self.rnd.choice(self.sites)
+        self._call("api_toggle_active", "POST", f"/api/sites/{url_name}/toggle-active")
+
+    def run(self, deadline: float) -> None:
+        self.find_seeded_sites()
+        self.load_dashboard()
+        while time.monotonic() < deadline:
+            roll = self.rnd.random()
+            paged = self.args.reload_rate + self.args.page_rate
+            if roll < self.args.reload_rate:
+                self.load_dashboard()
+            elif roll < paged:
+                if self.next_cursor:
+                    self.next_page()
+                else:
+                    self.load_dashboard()
+            elif self.sites and roll < paged + self.args.edit_rate:
+                self.edit_site()
+            elif self.sites and roll < paged + self.args.edit_rate + self.args.toggle_rate:
+                self.toggle_site()
+            else:
+                self._call("api_status", "GET", "/api/status")
+            if self.args.poll_interval:
+                time.sleep(self.args.poll_interval * self.rnd.uniform(0.8, 1.2))
+
+
+def scrape_db_queries(base_url: str) -> collections.Counter:
+    """Total DB queries per Flask endpoint from the API's /metrics."""
+    counts = collections.Counter()
+    try:
+        text = requests.get(base_url.rstrip("/") + "/metrics", timeout=10).text
+    except requests.RequestException:
+        return counts
+    for endpoint, _operation, value in _DB_QUERIES_RE.findall(text):
+        counts[endpoint] += float(value)
+    return counts
+
+
+def report(stats: Stats, elapsed: float, db_before: collections.Counter,
+           db_after: collections.Counter) -> dict:
+    endpoints = {}
+    for endpoint in sorted(stats.latencies):
+        latencies = stats.latencies[endpoint]
+        statuses = stats.statuses[endpoint]
+        errors = sum(n for status, n in statuses.items() if not (isinstance(status, int) and status < 400))
+        queries = db_after[endpoint] - db_before[endpoint]
+        endpoints[endpoint] = {
+            "requests": len(latencies),
+            "requests_per_second": round(len(latencies) / elapsed, 1),
+            "errors": errors,
+            "statuses": {str(k): v for k, v in statuses.items()},
+            "latency": percentiles(latencies),
+            "db_queries_per_request": round(queries / len(latencies), 2) if db_after else None,
+        }
+    return {"elapsed_seconds": round(elapsed, 2), "endpoints": endpoints}
+
+
+def print_report(result: dict) -> None:
+    print(f"\n{'endpoint':<20} {'reqs':>7} {'req/s':>8} {'errors':>7} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'db/req':>7}")
+    for endpoint, row in result["endpoints"].items():
+        lat = row["latency"]
+        db = row["db_queries_per_request"]
+        print(f"{endpoint:<20} {row['requests']:>7} {row['requests_per_second']:>8} {row['errors']:>7} "
+              f"{lat['p50'] * 1000:>8.1f} {lat['p95'] * 1000:>8.1f} {lat['p99'] * 1000:>8.1f} "
+              f"{db if db is not None else '-':>7}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay dashboard traffic against the web API.")
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--users", type=int, default=20, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds to run")
+    parser.add_argument("--poll-interval", type=float, default=2.0,
+                        help="Seconds between a user's requests, like the dashboard (0: as fast as possible)")
+    parser.add_argument("--reload-rate", type=float, default=0.05, help="Share of steps that reload the dashboard")
+    parser.add_argument("--page-rate", type=float, default=0.05, help="Share of steps that load the next page")
+    parser.add_argument("--page-size", type=int, default=10, help="Sites per /api/sites page, like the dashboard")
+    parser.add_argument("--edit-rate", type=float, default=0.02, help="Share of steps that open and save a site")
+    parser.add_argument("--toggle-rate", type=float, default=0.02, help="Share of steps that toggle a site")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", type=str, help="Also write the results to this file")
+    args = parser.parse_args()
+
+    stats = Stats()
+    db_before = scrape_db_queries(args.url)
+    started = time.monotonic()
+    deadline = started + args.duration
+    users = [VirtualUser(args.url, stats, args, args.seed + i) for i in range(args.users)]
+    with ThreadPoolExecutor(max_workers=args.users) as pool:
+        for future in [pool.submit(user.run, deadline) for user in users]:
+            future.result()
+    elapsed = time.monotonic() - started
+    result = report(stats, elapsed, db_before, scrape_db_queries(args.url))
+
+    print_report(result)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump({"arguments": vars(args), **result}, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Web Dashboard Dataset
+
+Seeds a scratch MariaDB with a large, realistic dashboard dataset for
+bench/web_load.py: N sites with one credential each for the dashboard
+customer, mixed Momentum and Vitec portals, spread-out last_login times and
+queue_points/queue_details shaped like the handlers write them. Rows are
+inserted in batches, so 100k sites take well under a minute.
+
+Usage:
+    python bench/web_seed.py --count 100000
+    python bench/web_seed.py --clear
+
+Requires DB_HOST, DB_USER, DB_PASS, DB_NAME and ENCRYPTION_KEY.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+import seed  # noqa: E402
+from utils import events  # noqa: E402
+from utils.crypto import encrypt_password  # noqa: E402
+from utils.db import get_connection  # noqa: E402
+
+PREFIX = "load"
+BATCH_SIZE = 5000
+
+_TOWNS = [
+    "Stockholm", "Göteborg", "Malmö", "Uppsala", "Västerås", "Örebro", "Linköping",
+    "Helsingborg", "Jönköping", "Norrköping", "Lund", "Umeå", "Gävle", "Borås",
+    "Södertälje", "Eskilstuna", "Halmstad", "Växjö", "Karlstad", "Sundsvall",
+]
+_KINDS = ["Bostäder", "Hem", "Fastigheter", "Bostad", "Hyresbostäder"]
+_QUEUES = [
+    ("Bostad", "dagar"), ("Lägenhet", "poäng"), ("Studentlägenhet", "dagar i kö"),
+    ("Parkering", "dagar"), ("Förråd", "dagar"), ("Seniorboende", "poäng"),
+]
+
+
+def _site_row(i: int, rnd: random.Random) -> tuple:
+    name = f"{PREFIX}{i:06d}"
+    fullname = f"{rnd.choice(_TOWNS)} {rnd.choice(_KINDS)} {i}"
+    if rnd.random() < 0.7:
+        return name, fullname, "momentum", f"Load{i % 500}", None
+    return name, fullname, "vitec", None, f"https://bostad.{name}.example"
+
+
+def _credential_row(site: str, customer_id: int, rnd: random.Random, passwords: list,
+                    now: datetime.datetime) -> tuple:
+    if rnd.random() < 0.05:
+        last_login, points, details = None, None, None
+    else:
+        last_login = now - datetime.timedelta(seconds=rnd.randint(0, 400 * 86400))
+        queues = []
+        for queue_name, unit in rnd.sample(_QUEUES, rnd.choice((1, 1, 2, 2, 3))):
+            queues.append({"name": queue_name, "points": rnd.randint(0, 4000), "unit": unit})
+        points = sum(q["points"] for q in queues) or None
+        details = json.dumps(queues, ensure_ascii=False)
+    return (
+        site, customer_id, f"user-{site}", rnd.choice(passwords),
+        int(rnd.random() < 0.9), last_login, points, details,
+    )
+
+
+def seed_dashboard(count: int, customer_id: int = 1, rng_seed: int = 42) -> None:
+    """Inserts `count` sites with one credential each for `customer_id`."""
+    rnd = random.Random(rng_seed)
+    # Encrypting every row is the slow part; a pool of real ciphertexts is enough
+    passwords = [encrypt_password(f"load-password-{i}") for i in range(100)]
+    now = datetime.datetime.utcnow().replace(microsecond=0)
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    for start in range(0, count, BATCH_SIZE):
+        sites = [_site_row(i, rnd) for i in range(start, min(start + BATCH_SIZE, count))]
+        cursor.executemany(
+            "INSERT IGNORE INTO sites (url_name, fullname, system_type, momentum_id, base_url) "
+            "VALUES (%s,%s,%s,%s,%s)",
+            sites,
+        )
+        cursor.executemany(
+            "INSERT IGNORE INTO credentials "
+            "(site, customer_id, username, password, active, last_login, queue_points, queue_details) "
+            "VALUES (%s,%s,%s,%s,%s,%s,%s,%s)",
+            [_credential_row(s[0], customer_id, rnd, passwords, now) for s in sites],
+        )
+        conn.commit()
+        print(f"  {start + len(sites)}/{count}", end="\r", flush=True)
+    cursor.close()
+    conn.close()
+    events.dashboard_changed(customer_id)
+    print()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Seed a large web dashboard dataset.")
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument("--customer-id", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for a reproducible dataset")
+    parser.add_argument("--clear", action="store_true", help="Only remove previously seeded rows")
+    args = parser.parse_args()
+
+    seed.create_base_tables()
+    seed.clear(PREFIX)
+    if args.clear:
+        return
+    started = time.monotonic()
+    seed_dashboard(args.count, args.customer_id, args.seed)
+    print(f"Seeded {args.count} sites in {time.monotonic() - started:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
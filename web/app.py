@@ -6,19 +6,114 @@ All HTML rendering is handled by React; Flask serves JSON + static assets.
 """
 
 import os
+import io
+import csv
 import json
+import math
+import time
+import base64
+import hashlib
+import collections
 import datetime
-import docker
+import threading
+import uuid
 import mysql.connector
+import mysql.connector.pooling
+import redis
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, List, Tuple
+from urllib.parse import urlencode
 from zoneinfo import ZoneInfo
+from celery import Celery
 from cryptography.fernet import Fernet
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, g, has_request_context, request, jsonify, stream_with_context
+
+import docker_state
+import metrics
+import static_files
 
 _STOCKHOLM = ZoneInfo("Europe/Stockholm")
 CONTAINER_NAME = "queuepilot"
 CUSTOMER_ID = 1
 
+# Producer-only Celery client for sending tasks to the QueuePilot workers.
+# Queue names mirror app/celery_app.py.
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+SYSTEM_TYPE_QUEUES = {"momentum": "momentum", "vitec": "vitec", "kjellberg": "vitec"}
+celery_client = Celery("queuepilot", broker=REDIS_URL)
+celery_client.conf.update(
+    task_serializer="json",
+    broker_transport_options={"priority_steps": list(range(10))},
+)
+
+# Progress events published by main.py and the workers, and the run and
+# dashboard state they keep, live on the same Redis (app/utils/events.py)
+EVENTS_REDIS_URL = os.getenv("EVENTS_REDIS_URL", REDIS_URL)
+EVENTS_CHANNEL = "queuepilot:events"
+EVENTS_KEEPALIVE = 15  # seconds between SSE comments on an idle stream
+# Each open /api/events stream holds one of the worker's WEB_THREADS threads for
+# as long as the dashboard stays open; past this many per worker, new streams
+# get 503 (the dashboard then polls) so API requests keep free threads.
+WEB_THREADS = int(os.getenv("WEB_THREADS", "16"))
+EVENTS_MAX_STREAMS = int(os.getenv("EVENTS_MAX_STREAMS", str(max(1, WEB_THREADS // 2))))
+EVENTS_RETRY_AFTER = 30  # seconds a refused dashboard waits before trying again
+
+# Run Now: progress of the current/last run is kept in Redis by the workers
+# (app/utils/events.py). A run not finished within RUN_TIMEOUT seconds no
+# longer blocks a new one.
+RUN_TIMEOUT = int(os.getenv("RUN_TIMEOUT", "1800"))
+RUN_PRIORITY = 0  # broker priority of logins started from the UI; 0 is the most urgent
+ACTIVE_RUN_KEY = f"queuepilot:customer:{CUSTOMER_ID}:active_run"
+LAST_RUN_KEY = f"queuepilot:customer:{CUSTOMER_ID}:last_run"
+
+# /api/sites and /api/status are served from a per-process cache keyed on this
+# counter, which workers bump after every login (app/utils/events.py) and this
+# API bumps after its own writes. The TTL only bounds missed invalidations.
+DASHBOARD_GENERATION_KEY = f"queuepilot:dashboard:{CUSTOMER_ID}:generation"
+DASHBOARD_CACHE_TTL = int(os.getenv("DASHBOARD_CACHE_TTL", "300"))
+# Per process; /api/sites caches each page/filter combination, oldest evicted first
+DASHBOARD_CACHE_BYTES = int(os.getenv("DASHBOARD_CACHE_MB", "64")) * 1024 * 1024
+
+# /api/sites paging. Sorts are keyset-paginated on (column, s.url_name).
+SITES_DEFAULT_LIMIT = 50
+SITES_MAX_LIMIT = 10_000
+SITE_SORT_COLUMNS = {
+    "fullname": "s.fullname",
+    "system_type": "s.system_type",
+    "last_login": "c.last_login",
+    "queue_points": "c.queue_points",
+    "url_name": "s.url_name",
+}
+NULLABLE_SORT_COLUMNS = {"last_login", "queue_points"}
+
+# Pooled DB connections per process (mysql.connector caps a pool at 32).
+# Defaults to one per server thread (WEB_THREADS, see gunicorn.conf.py), so a
+# busy worker's requests never wait DB_POOL_TIMEOUT for a connection.
+DB_POOL_SIZE = min(int(os.getenv("DB_POOL_SIZE", str(WEB_THREADS))), mysql.connector.pooling.CNX_POOL_MAXSIZE)
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+
+# Dead letters listed or re-driven per request; re-drives are paced at
+# `rate` tasks per second on the workers (scheduler.redrive_dead_letters)
+DEAD_LETTERS_MAX_LIMIT = 5000
+REDRIVE_DEFAULT_RATE = 10.0
+
+# Bulk import: rows per transaction (one multi-row upsert each), encryption
+# threads (each encrypts a whole chunk ahead of the DB writes), and how many
+# row errors the report lists. Export reads the table in keyset batches.
+IMPORT_CHUNK_ROWS = 500
+IMPORT_ENCRYPT_WORKERS = int(os.getenv("IMPORT_ENCRYPT_WORKERS", "4"))
+IMPORT_MAX_ERRORS = 1000
+IMPORT_FORMATS = {"text/csv": "csv", "application/x-ndjson": "ndjson", "application/jsonl": "ndjson"}
+EXPORT_BATCH_ROWS = 1000
+
+# Bulk changes lock and update at most this many sites per request
+BULK_MAX_SITES = SITES_MAX_LIMIT
+BULK_UPDATE_FIELDS = {"fullname", "system_type", "momentum_id", "base_url", "username", "active"}
+EXPORT_FIELDS = ("url_name", "fullname", "system_type", "momentum_id", "base_url",
+                 "username", "active", "last_login", "queue_points")
+
 app = Flask(__name__)
+_container_watcher = docker_state.ContainerWatcher(CONTAINER_NAME, docker_state.source_from_env())
 app.secret_key = os.environ.get("SECRET_KEY", "queuepilot-dev-secret-change-me")
 
 
@@ -39,17 +134,65 @@ def encrypt_password(plaintext: str) -> str:
     return _fernet().encrypt(plaintext.encode()).decode()
 
 
+def _endpoint() -> str:
+    return (request.endpoint or "unknown") if has_request_context() else "startup"
+
+
+def _observe_query(operation: str, seconds: float) -> None:
+    metrics.DB_QUERY_SECONDS.labels(operation).observe(seconds)
+    metrics.DB_QUERIES_TOTAL.labels(_endpoint(), operation).inc()
+
+
+def _db_config() -> dict:
+    return {
+        "host": os.environ["DB_HOST"],
+        "user": os.environ["DB_USER"],
+        "password": os.environ["DB_PASS"],
+        "database": os.environ["DB_NAME"],
+    }
+
+
+_pool: mysql.connector.pooling.MySQLConnectionPool | None = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> mysql.connector.pooling.MySQLConnectionPool:
+    # One pool per process: server workers forked from a preloaded app must
+    # not share the parent's sockets
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = mysql.connector.pooling.MySQLConnectionPool(
+                pool_name=f"queuepilot-web-{os.getpid()}", pool_size=DB_POOL_SIZE, **_db_config()
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
 def get_connection():
-    return mysql.connector.connect(
-        host=os.environ["DB_HOST"],
-        user=os.environ["DB_USER"],
-        password=os.environ["DB_PASS"],
-        database=os.environ["DB_NAME"],
-    )
+    """
+    A pooled connection; close() returns it to the pool. Waits up to
+    DB_POOL_TIMEOUT seconds for one to be free.
+    """
+    pool = _get_pool()
+    deadline = time.monotonic() + DB_POOL_TIMEOUT
+    while True:
+        try:
+            conn = metrics.InstrumentedConnection(pool.get_connection(), _observe_query)
+            break
+        except mysql.connector.errors.PoolError:
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(0.01)
+    if has_request_context():
+        g.setdefault("db_connections", []).append(conn)
+    return conn
 
 
 def ensure_schema():
-    conn = get_connection()
+    # Unpooled: runs once at import, before a preloading server forks
+    conn = metrics.InstrumentedConnection(mysql.connector.connect(**_db_config()), _observe_query)
     cursor = conn.cursor()
     migrations = [
         "ALTER TABLE sites ADD COLUMN IF NOT EXISTS system_type VARCHAR(50) NOT NULL DEFAULT 'momentum'",
@@ -65,6 +208,39 @@ def ensure_schema():
             `value` TEXT NOT NULL
         )""",
         "INSERT IGNORE INTO settings (`key`, `value`) VALUES ('momentum_api_key', '')",
+        """CREATE TABLE IF NOT EXISTS dead_letters (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            site VARCHAR(100) NOT NULL,
+            customer_id INT NOT NULL,
+            system_type VARCHAR(50) NOT NULL,
+            error_class VARCHAR(200) NOT NULL,
+            error_message TEXT,
+            http_status INT DEFAULT NULL,
+            attempts TEXT NOT NULL,
+            created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            redriven_at DATETIME DEFAULT NULL,
+            INDEX idx_dead_letters_pending (redriven_at, site),
+            INDEX idx_dead_letters_error (error_class)
+        )""",
+        """CREATE TABLE IF NOT EXISTS run_outcomes (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            site VARCHAR(100) NOT NULL,
+            customer_id INT NOT NULL,
+            system_type VARCHAR(50) NOT NULL,
+            status VARCHAR(20) NOT NULL,
+            duration_ms INT NOT NULL,
+            error_class VARCHAR(200) DEFAULT NULL,
+            finished_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            INDEX idx_run_outcomes_site (site, finished_at),
+            INDEX idx_run_outcomes_customer (customer_id, finished_at)
+        )""",
+        "ALTER TABLE credentials ADD COLUMN IF NOT EXISTS id INT NOT NULL AUTO_INCREMENT UNIQUE",
+        # /api/sites filters and keyset sorts
+        "CREATE INDEX IF NOT EXISTS idx_sites_system_type ON sites (system_type, url_name)",
+        "CREATE INDEX IF NOT EXISTS idx_sites_fullname ON sites (fullname, url_name)",
+        "CREATE INDEX IF NOT EXISTS idx_credentials_last_login ON credentials (customer_id, last_login, site)",
+        "CREATE INDEX IF NOT EXISTS idx_credentials_points ON credentials (customer_id, queue_points, site)",
+        "CREATE INDEX IF NOT EXISTS idx_credentials_active ON credentials (customer_id, active, site)",
     ]
     for sql in migrations:
         try:
@@ -100,102 +276,414 @@ def set_setting(key: str, value: str) -> None:
 
 
 def get_container_info() -> dict:
+    """The queuepilot container's state, as last seen by the events watcher."""
+    info = _container_watcher.info()
+    finished_at = info.get("finished_at")
+    if finished_at:
+        try:
+            dt = datetime.datetime.fromisoformat(finished_at.replace("Z", "+00:00"))
+            info["finished_at"] = dt.astimezone(_STOCKHOLM).strftime("%Y-%m-%d %H:%M")
+        except ValueError:
+            info["finished_at"] = finished_at[:19].replace("T", " ")
+    return info
+
+
+# ── Dashboard cache ───────────────────────────────────────────────────────────
+
+_redis_client = redis.Redis.from_url(EVENTS_REDIS_URL, socket_timeout=1, socket_connect_timeout=1)
+_dashboard_cache: dict = {}
+_dashboard_cache_lock = threading.Lock()
+
+
+def _dashboard_generation() -> int | None:
+    """The current dashboard generation, or None if Redis is unreachable."""
     try:
-        client = docker.from_env()
-        container = client.containers.get(CONTAINER_NAME)
-        finished_at = container.attrs["State"]["FinishedAt"]
-        if finished_at.startswith("0001"):
-            finished_at = None
-        else:
-            try:
-                dt = datetime.datetime.fromisoformat(finished_at.replace("Z", "+00:00"))
-                finished_at = dt.astimezone(_STOCKHOLM).strftime("%Y-%m-%d %H:%M")
-            except ValueError:
-                finished_at = finished_at[:19].replace("T", " ")
-        return {"status": container.status, "finished_at": finished_at}
-    except docker.errors.NotFound:
-        return {"status": "not_found", "finished_at": None}
-    except Exception as e:
-        return {"status": "error", "finished_at": None, "error": str(e)}
+        return int(_redis_client.get(DASHBOARD_GENERATION_KEY) or 0)
+    except redis.RedisError as e:
+        app.logger.warning("Dashboard cache unavailable: %s", e)
+        return None
+
+
+def invalidate_dashboard() -> None:
+    """Makes every web process rebuild its cached dashboard responses."""
+    with _dashboard_cache_lock:
+        _dashboard_cache.clear()
+    try:
+        _redis_client.incr(DASHBOARD_GENERATION_KEY)
+    except redis.RedisError as e:
+        app.logger.warning("Could not invalidate the dashboard cache: %s", e)
+
+
+def _to_json(data) -> bytes:
+    return app.json.dumps(data, separators=(",", ":")).encode()
+
+
+def _etag(*parts: bytes) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def _cached_json(name: str, build: Callable[[], object], variant: str = "") -> Tuple[bytes, str]:
+    """
+    Returns build() serialised as JSON, with its ETag. The result is reused
+    per (name, variant) until the dashboard generation changes or the TTL
+    runs out; without Redis it is rebuilt on every call.
+    """
+    generation = _dashboard_generation()
+    now = time.monotonic()
+    key = (name, variant)
+    entry = _dashboard_cache.get(key)
+    if generation is not None and entry is not None and entry[0] == generation and entry[1] > now:
+        metrics.CACHE_REQUESTS_TOTAL.labels(name, "hit").inc()
+        return entry[2], entry[3]
+
+    metrics.CACHE_REQUESTS_TOTAL.labels(name, "miss" if generation is not None else "bypass").inc()
+    body = _to_json(build())
+    etag = _etag(body)
+    if generation is not None:
+        with _dashboard_cache_lock:
+            _dashboard_cache.pop(key, None)
+            size = sum(len(e[2]) for e in _dashboard_cache.values()) + len(body)
+            while _dashboard_cache and size > DASHBOARD_CACHE_BYTES:
+                size -= len(_dashboard_cache.pop(next(iter(_dashboard_cache)))[2])
+            _dashboard_cache[key] = (generation, now + DASHBOARD_CACHE_TTL, body, etag)
+    return body, etag
+
+
+def _conditional_json(body: bytes, etag: str) -> Response:
+    """A JSON response with a strong ETag; 304 Not Modified if If-None-Match matches."""
+    response = Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response.make_conditional(request)
+
+
+def get_run_info() -> dict:
+    """The current or last Run Now's progress, as counted by the workers."""
+    try:
+        active = _redis_client.get(ACTIVE_RUN_KEY)
+        run_id = active or _redis_client.get(LAST_RUN_KEY)
+        raw = _redis_client.hgetall(f"queuepilot:run:{run_id.decode()}") if run_id else {}
+    except redis.RedisError as e:
+        app.logger.warning("Run progress unavailable: %s", e)
+        return {"running": False}
+    run = {k.decode(): v.decode() for k, v in raw.items()}
+
+    def when(key: str) -> str | None:
+        value = run.get(key)
+        return _to_stockholm(datetime.datetime.fromisoformat(value)).strftime("%Y-%m-%d %H:%M") if value else None
+
+    return {
+        "running": active is not None,
+        "run_id": run_id.decode() if run_id else None,
+        "total": int(run["total"]) if "total" in run else None,
+        "done": int(run.get("done", 0)),
+        "ok": int(run.get("ok", 0)),
+        "failed": int(run.get("failed", 0)),
+        "error": int(run.get("error", 0)),
+        "started_at": when("started_at"),
+        "finished_at": when("finished_at"),
+    }
+
+
+@app.before_request
+def _start_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def _record_request(response):
+    started = g.get("request_started")
+    if started is not None:
+        endpoint = request.endpoint or "unknown"
+        metrics.HTTP_REQUEST_SECONDS.labels(endpoint).observe(time.perf_counter() - started)
+        metrics.HTTP_REQUESTS_TOTAL.labels(endpoint, request.method, str(response.status_code)).inc()
+    return response
+
+
+@app.teardown_request
+def _release_connections(exc):
+    for conn in g.pop("db_connections", []):
+        try:
+            conn.close()
+        except Exception as e:
+            app.logger.warning("Could not return DB connection to the pool: %s", e)
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    return Response(metrics.REGISTRY.render(), mimetype="text/plain; version=0.0.4")
 
 
 # ── API Routes ────────────────────────────────────────────────────────────────
 
-@app.route("/api/sites", methods=["GET"])
-def api_list_sites():
+def _int_arg(args, name: str) -> int | None:
+    value = args.get(name, "").strip()
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer") from None
+
+
+def _encode_cursor(sort: str, value, url_name: str) -> str:
+    if isinstance(value, datetime.datetime):
+        value = value.isoformat(sep=" ")
+    raw = json.dumps([sort, value, url_name], ensure_ascii=False).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, sort: str) -> tuple:
+    try:
+        cursor_sort, value, url_name = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor") from None
+    if cursor_sort != sort:
+        raise ValueError("Cursor does not match sort")
+    return value, url_name
+
+
+def _after_cursor(column: str, nullable: bool, descending: bool, value, url_name: str) -> Tuple[str, list]:
+    """
+    Keyset condition for the rows after (value, url_name) in
+    ORDER BY column, s.url_name (both ASC or both DESC). NULLs sort first
+    ascending and last descending, as in MariaDB.
+    """
+    op = "<" if descending else ">"
+    if value is None:
+        if descending:
+            return f"({column} IS NULL AND s.url_name < %s)", [url_name]
+        return f"(({column} IS NULL AND s.url_name > %s) OR {column} IS NOT NULL)", [url_name]
+    condition = f"{column} {op} %s OR ({column} = %s AND s.url_name {op} %s)"
+    if nullable and descending:
+        condition += f" OR {column} IS NULL"
+    return f"({condition})", [value, value, url_name]
+
+
+def _site_query(args) -> dict:
+    """
+    Parses /api/sites' filter, sort and paging arguments into SQL fragments.
+    Raises ValueError on an invalid argument.
+    """
+    where, params = [], []
+    if args.get("system_type"):
+        where.append("s.system_type = %s")
+        params.append(args["system_type"])
+
+    active = args.get("active", "")
+    if active == "true":
+        where.append("c.active = 1")
+    elif active == "false":
+        where.append("(c.active = 0 OR c.active IS NULL)")
+    elif active:
+        raise ValueError("active must be true or false")
+
+    if args.get("stale_since"):
+        try:
+            since = datetime.datetime.fromisoformat(args["stale_since"])
+        except ValueError:
+            raise ValueError("stale_since must be an ISO date") from None
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=_STOCKHOLM)
+        since = since.astimezone(ZoneInfo("UTC")).replace(tzinfo=None)
+        where.append("(c.last_login IS NULL OR c.last_login < %s)")
+        params.append(since)
+
+    min_points, max_points = _int_arg(args, "min_points"), _int_arg(args, "max_points")
+    if min_points is not None:
+        where.append("c.queue_points >= %s")
+        params.append(min_points)
+    if max_points is not None:
+        where.append("c.queue_points <= %s")
+        params.append(max_points)
+
+    search = args.get("q", "").strip()
+    if search:
+        like = "%" + search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        where.append("(s.fullname LIKE %s OR s.url_name LIKE %s OR c.username LIKE %s)")
+        params.extend([like] * 3)
+
+    sort = args.get("sort") or "system_type"
+    if sort not in SITE_SORT_COLUMNS:
+        raise ValueError(f"sort must be one of {', '.join(SITE_SORT_COLUMNS)}")
+    order = args.get("order") or "asc"
+    if order not in ("asc", "desc"):
+        raise ValueError("order must be asc or desc")
+    limit = _int_arg(args, "limit") or SITES_DEFAULT_LIMIT
+    if not 0 < limit <= SITES_MAX_LIMIT:
+        raise ValueError(f"limit must be between 1 and {SITES_MAX_LIMIT}")
+
+    return {
+        "where": where,
+        "params": params,
+        "sort": sort,
+        "descending": order == "desc",
+        "cursor": _decode_cursor(args["cursor"], sort) if args.get("cursor") else None,
+        "limit": limit,
+    }
+
+
+SITE_COLUMNS = (
+    "s.url_name, s.fullname, s.system_type, s.momentum_id, s.base_url, "
+    "c.username, c.active, c.last_login, c.queue_points, c.queue_details"
+)
+FROM_SITES = "FROM sites s LEFT JOIN credentials c ON c.site = s.url_name AND c.customer_id = %s"
+
+
+def _site_row(s: dict) -> dict:
+    """A sites/credentials row as the dashboard lists it."""
+    raw = s.get("queue_details")
+    ll = _to_stockholm(s.get("last_login"))
+    return {
+        "url_name": s["url_name"],
+        "fullname": s.get("fullname") or s["url_name"],
+        "system_type": s.get("system_type", "momentum"),
+        "momentum_id": s.get("momentum_id"),
+        "base_url": s.get("base_url"),
+        "username": s.get("username"),
+        "active": bool(s.get("active")),
+        "last_login": ll.strftime("%Y-%m-%d %H:%M") if ll else None,
+        "queue_points": s.get("queue_points"),
+        "queue_details": json.loads(raw) if raw else [],
+    }
+
+
+def _build_sites(query: dict) -> dict:
+    """One page of the customer's sites, the filtered count and per-system totals."""
+    sort, descending = query["sort"], query["descending"]
+    column = SITE_SORT_COLUMNS[sort]
+    where, params = list(query["where"]), list(query["params"])
+    filters = f"WHERE {' AND '.join(where)}" if where else ""
+    if query["cursor"] is not None:
+        condition, cursor_params = _after_cursor(column, sort in NULLABLE_SORT_COLUMNS, descending, *query["cursor"])
+        where.append(condition)
+        params.extend(cursor_params)
+    direction = "DESC" if descending else "ASC"
+
     conn = get_connection()
     cursor = conn.cursor(dictionary=True)
-    cursor.execute("""
-        SELECT s.url_name, s.fullname, s.system_type, s.momentum_id, s.base_url,
-               c.username, c.active, c.last_login, c.queue_points, c.queue_details
-        FROM sites s
-        LEFT JOIN credentials c ON c.site = s.url_name AND c.customer_id = %s
-        ORDER BY s.system_type, s.url_name
-    """, (CUSTOMER_ID,))
+    cursor.execute(
+        f"SELECT {SITE_COLUMNS} "
+        f"{FROM_SITES} {'WHERE ' + ' AND '.join(where) if where else ''} "
+        f"ORDER BY {column} {direction}, s.url_name {direction} LIMIT %s",
+        (CUSTOMER_ID, *params, query["limit"] + 1),
+    )
     rows = cursor.fetchall()
+    cursor.execute(f"SELECT COUNT(*) AS n {FROM_SITES} {filters}", (CUSTOMER_ID, *query["params"]))
+    count = cursor.fetchone()["n"]
+    cursor.execute(
+        f"SELECT s.system_type, SUM(c.queue_points) AS points {FROM_SITES} GROUP BY s.system_type",
+        (CUSTOMER_ID,),
+    )
+    type_points = cursor.fetchall()
     cursor.close()
     conn.close()
 
-    sites = []
+    next_cursor = None
+    if len(rows) > query["limit"]:
+        rows = rows[:query["limit"]]
+        last = rows[-1]
+        next_cursor = _encode_cursor(sort, last[sort], last["url_name"])
+
     totals: dict = {"all": 0}
-    for s in rows:
-        raw = s.get("queue_details")
-        details = json.loads(raw) if raw else []
-        ll = _to_stockholm(s.get("last_login"))
-        pts = s.get("queue_points")
-        st = s.get("system_type", "momentum")
-        if pts is not None:
-            totals[st] = totals.get(st, 0) + pts
-            totals["all"] += pts
-        sites.append({
-            "url_name": s["url_name"],
-            "fullname": s.get("fullname") or s["url_name"],
-            "system_type": st,
-            "momentum_id": s.get("momentum_id"),
-            "base_url": s.get("base_url"),
-            "username": s.get("username"),
-            "active": bool(s.get("active")),
-            "last_login": ll.strftime("%Y-%m-%d %H:%M") if ll else None,
-            "queue_points": pts,
-            "queue_details": details,
-        })
-
-    has_momentum = any(s["system_type"] == "momentum" for s in sites)
-    return jsonify({
-        "sites": sites,
+    for r in type_points:
+        if r["points"] is not None:
+            totals[r["system_type"]] = int(r["points"])
+            totals["all"] += int(r["points"])
+    system_types = sorted(r["system_type"] for r in type_points)
+
+    return {
+        "sites": [_site_row(s) for s in rows],
+        "count": count,
+        "next_cursor": next_cursor,
         "totals": totals,
-        "api_key_missing": has_momentum and not get_setting("momentum_api_key"),
-    })
+        "system_types": system_types,
+        "api_key_missing": "momentum" in system_types and not get_setting("momentum_api_key"),
+    }
 
 
-@app.route("/api/sites", methods=["POST"])
-def api_create_site():
-    data = request.get_json() or {}
-    url_name = (data.get("url_name") or "").strip().lower()
-    fullname = (data.get("fullname") or "").strip()
-    system_type = (data.get("system_type") or "momentum").strip()
-    username = (data.get("username") or "").strip()
-    password = data.get("password") or ""
-    active = int(bool(data.get("active", True)))
+@app.route("/api/sites", methods=["GET"])
+def api_list_sites():
+    """
+    One page of sites. Filters: system_type, active (true/false), stale_since
+    (ISO date; last login before it or never), min_points, max_points, q
+    (name/username search). Sort: sort (fullname, system_type, last_login,
+    queue_points, url_name) and order (asc/desc). Paging: limit and the
+    previous page's next_cursor. totals cover all of the customer's sites.
+    """
+    try:
+        query = _site_query(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    variant = urlencode(sorted(request.args.items(multi=True)))
+    return _conditional_json(*_cached_json("sites", lambda: _build_sites(query), variant))
 
-    if not url_name or not fullname or not username or not password:
-        return jsonify({"error": "Missing required fields"}), 400
 
-    momentum_id = (data.get("momentum_id") or "").strip() or None if system_type == "momentum" else None
-    base_url = ((data.get("base_url") or "").strip().rstrip("/") or None) if system_type == "vitec" else None
+def _bool_field(value, default: bool = True) -> bool:
+    if value is None or value == "":
+        return default
+    if isinstance(value, str):
+        value = value.strip().lower()
+        if value in ("1", "true", "yes", "y"):
+            return True
+        if value in ("0", "false", "no", "n"):
+            return False
+        raise ValueError("active must be true or false")
+    return bool(value)
+
+
+def _site_fields(data: dict, require_password: bool = True) -> dict:
+    """
+    Validated site and credential fields from a create request or an import
+    row. Raises ValueError naming what is wrong.
+    """
+    def text(name: str) -> str:
+        value = data.get(name)
+        return "" if value is None else str(value).strip()
+
+    fields = {
+        "url_name": text("url_name").lower(),
+        "fullname": text("fullname"),
+        "system_type": text("system_type") or "momentum",
+        "username": text("username"),
+        "password": "" if data.get("password") is None else str(data["password"]),
+        "active": int(_bool_field(data.get("active"))),
+    }
+    required = ["url_name", "fullname", "username"] + (["password"] if require_password else [])
+    missing = [name for name in required if not fields[name]]
+    if missing:
+        raise ValueError(f"Missing required fields: {', '.join(missing)}")
+    if fields["system_type"] not in SYSTEM_TYPE_QUEUES:
+        raise ValueError(f"system_type must be one of {', '.join(SYSTEM_TYPE_QUEUES)}")
+    fields["momentum_id"] = (text("momentum_id") or None) if fields["system_type"] == "momentum" else None
+    fields["base_url"] = (text("base_url").rstrip("/") or None) if fields["system_type"] == "vitec" else None
+    return fields
+
+
+@app.route("/api/sites", methods=["POST"])
+def api_create_site():
+    try:
+        site = _site_fields(request.get_json() or {})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    url_name = site["url_name"]
 
     conn = get_connection()
     cursor = conn.cursor()
     try:
         cursor.execute(
             "INSERT INTO sites (url_name, fullname, base_url, system_type, momentum_id) VALUES (%s,%s,%s,%s,%s)",
-            (url_name, fullname, base_url, system_type, momentum_id),
+            (url_name, site["fullname"], site["base_url"], site["system_type"], site["momentum_id"]),
         )
         cursor.execute(
             "INSERT INTO credentials (site, customer_id, username, password, active) VALUES (%s,%s,%s,%s,%s)",
-            (url_name, CUSTOMER_ID, username, encrypt_password(password), active),
+            (url_name, CUSTOMER_ID, site["username"], encrypt_password(site["password"]), site["active"]),
         )
         conn.commit()
+        invalidate_dashboard()
         return jsonify({"ok": True, "url_name": url_name})
     except mysql.connector.IntegrityError as e:
         conn.rollback()
@@ -265,6 +753,7 @@ def api_update_site(url_name):
                 (username, active, url_name, CUSTOMER_ID),
             )
         conn.commit()
+        invalidate_dashboard()
         return jsonify({"ok": True})
     except Exception as e:
         conn.rollback()
@@ -282,6 +771,7 @@ def api_delete_site(url_name):
         cursor.execute("DELETE FROM credentials WHERE site=%s", (url_name,))
         cursor.execute("DELETE FROM sites WHERE url_name=%s", (url_name,))
         conn.commit()
+        invalidate_dashboard()
         return jsonify({"ok": True})
     except Exception as e:
         conn.rollback()
@@ -301,6 +791,7 @@ def api_toggle_active(url_name):
             (url_name, CUSTOMER_ID),
         )
         conn.commit()
+        invalidate_dashboard()
         cursor.execute("SELECT active FROM credentials WHERE site=%s AND customer_id=%s", (url_name, CUSTOMER_ID))
         row = cursor.fetchone()
         return jsonify({"active": bool(row[0]) if row else False})
@@ -312,9 +803,7 @@ def api_toggle_active(url_name):
         conn.close()
 
 
-@app.route("/api/status", methods=["GET"])
-def api_status():
-    info = get_container_info()
+def _build_last_logins() -> dict:
     conn = get_connection()
     cursor = conn.cursor(dictionary=True)
     cursor.execute("SELECT site, last_login FROM credentials WHERE customer_id=%s", (CUSTOMER_ID,))
@@ -324,26 +813,238 @@ def api_status():
         logins[row["site"]] = ll.strftime("%Y-%m-%d %H:%M") if ll else None
     cursor.close()
     conn.close()
-    return jsonify({
-        "container_status": info["status"],
-        "finished_at": info.get("finished_at"),
-        "last_logins": logins,
+    return logins
+
+
+@app.route("/api/status", methods=["GET"])
+def api_status():
+    logins, logins_etag = _cached_json("last_logins", _build_last_logins)
+    # Runs normally go through the Celery workers; main.py in the container still counts
+    info = get_container_info()
+    run = get_run_info()
+    running = run["running"] or info["status"] == "running"
+    finished_at = max(filter(None, (run.get("finished_at"), info.get("finished_at"))), default=None)
+    head = _to_json({"container_status": "running" if running else "exited", "finished_at": finished_at, "run": run})
+    # Splice the cached last_logins into the live runner state
+    body = head[:-1] + b',"last_logins":' + logins + b"}"
+    return _conditional_json(body, _etag(head, logins_etag.encode()))
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _dashboard_event(event: dict) -> dict:
+    """Adds the fields the dashboard shows, in its format, to a worker event."""
+    at = _to_stockholm(datetime.datetime.fromisoformat(event["at"]))
+    if event.get("type") == "login" and event.get("state") == "finished" and event.get("status") == "ok":
+        event["last_login"] = at.strftime("%Y-%m-%d %H:%M")
+    if event.get("type") == "run" and event.get("state") == "finished":
+        event["finished_at"] = at.strftime("%Y-%m-%d %H:%M")
+    return event
+
+
+_event_streams = threading.BoundedSemaphore(EVENTS_MAX_STREAMS)
+
+
+@app.route("/api/events", methods=["GET"])
+def api_events():
+    """
+    Server-Sent Events stream of run and login progress for this customer,
+    relayed from Redis pub/sub as workers publish them. 503 once this worker
+    already serves EVENTS_MAX_STREAMS streams.
+    """
+    if not _event_streams.acquire(blocking=False):
+        response = jsonify({"error": "Too many open event streams"})
+        response.status_code = 503
+        response.headers["Retry-After"] = str(EVENTS_RETRY_AFTER)
+        return response
+
+    def stream():
+        client = redis.Redis.from_url(EVENTS_REDIS_URL)
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(EVENTS_CHANNEL, f"{EVENTS_CHANNEL}:{CUSTOMER_ID}")
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                message = pubsub.get_message(timeout=EVENTS_KEEPALIVE)
+                if message is None:
+                    yield ": keepalive\n\n"
+                    continue
+                try:
+                    event = _dashboard_event(json.loads(message["data"]))
+                except (ValueError, KeyError):
+                    continue
+                yield _sse(event.get("type", "message"), event)
+        finally:
+            pubsub.close()
+            client.close()
+
+    response = Response(stream(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
     })
+    # On close rather than in stream(): a generator never started never runs its finally
+    response.call_on_close(_event_streams.release)
+    return response
 
 
 @app.route("/api/run", methods=["POST"])
 def api_run():
+    """Refreshes every active credential on the Celery workers, as one tracked run."""
+    run_id = uuid.uuid4().hex
     try:
-        client = docker.from_env()
-        container = client.containers.get(CONTAINER_NAME)
-        if container.status == "running":
+        if not _redis_client.set(ACTIVE_RUN_KEY, run_id, nx=True, ex=RUN_TIMEOUT):
             return jsonify({"ok": False, "message": "Already running"})
-        container.start()
-        return jsonify({"ok": True, "message": "Queue update started"})
-    except docker.errors.NotFound:
-        return jsonify({"error": f"Container '{CONTAINER_NAME}' not found — run docker compose up first"}), 404
+    except redis.RedisError as e:
+        return jsonify({"error": str(e)}), 500
+    try:
+        celery_client.send_task(
+            "scheduler.enqueue_run",
+            args=(CUSTOMER_ID, run_id),
+            queue="celery",
+            priority=RUN_PRIORITY,
+        )
+    except Exception as e:
+        try:
+            _redis_client.delete(ACTIVE_RUN_KEY)
+        except redis.RedisError:
+            pass
+        return jsonify({"error": str(e)}), 500
+    return jsonify({"ok": True, "message": "Queue update started", "run_id": run_id})
+
+
+@app.route("/api/sites/<url_name>/run", methods=["POST"])
+def api_run_site(url_name):
+    """
+    Refreshes one site now. The workers send its login to the front of its
+    portal's host-shard queue (scheduler.enqueue_credential).
+    """
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute(
+        "SELECT id, active FROM credentials WHERE site = %s AND customer_id = %s",
+        (url_name, CUSTOMER_ID),
+    )
+    row = cursor.fetchone()
+    cursor.close()
+    conn.close()
+    if not row:
+        return jsonify({"error": "Not found"}), 404
+    if not row["active"]:
+        return jsonify({"error": f"'{url_name}' is inactive"}), 409
+    try:
+        celery_client.send_task(
+            "scheduler.enqueue_credential",
+            args=(row["id"],),
+            queue="celery",
+            priority=RUN_PRIORITY,
+        )
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    return jsonify({"ok": True, "message": f"Refresh of '{url_name}' queued"})
+
+
+def _pending_dead_letters(site: str | None, error_class: str | None, limit: int) -> list:
+    where = ["d.redriven_at IS NULL", "d.customer_id = %s"]
+    params: list = [CUSTOMER_ID]
+    if site:
+        where.append("d.site = %s")
+        params.append(site)
+    if error_class:
+        where.append("d.error_class = %s")
+        params.append(error_class)
+    params.append(limit)
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute(
+        f"SELECT d.id, d.site, d.customer_id, d.system_type, d.error_class, d.error_message, "
+        f"d.http_status, d.attempts, d.created_at, c.id AS credential_id "
+        f"FROM dead_letters d "
+        f"JOIN credentials c ON c.site = d.site AND c.customer_id = d.customer_id "
+        f"WHERE {' AND '.join(where)} ORDER BY d.id LIMIT %s",
+        tuple(params),
+    )
+    rows = cursor.fetchall()
+    cursor.close()
+    conn.close()
+    return rows
+
+
+def _positive_arg(value, name: str, cast, default):
+    """
+    Parses a positive number from a query string or JSON value, or returns
+    default if it is missing. Raises ValueError.
+    """
+    if value is None or value == "":
+        return default
+    try:
+        if isinstance(value, bool):
+            raise ValueError
+        number = cast(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a positive number") from None
+    if not math.isfinite(number) or number <= 0:
+        raise ValueError(f"{name} must be a positive number")
+    return number
+
+
+@app.route("/api/dead-letters", methods=["GET"])
+def api_dead_letters():
+    try:
+        limit = min(_positive_arg(request.args.get("limit"), "limit", int, 500), DEAD_LETTERS_MAX_LIMIT)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    rows = _pending_dead_letters(request.args.get("site"), request.args.get("error_class"), limit)
+    summary: dict = {}
+    for r in rows:
+        key = f"{r['site']}:{r['error_class']}"
+        summary[key] = summary.get(key, 0) + 1
+    return jsonify({
+        "dead_letters": [{
+            "id": r["id"],
+            "site": r["site"],
+            "system_type": r["system_type"],
+            "error_class": r["error_class"],
+            "error_message": r["error_message"],
+            "http_status": r["http_status"],
+            "attempts": json.loads(r["attempts"]),
+            "created_at": _to_stockholm(r["created_at"]).strftime("%Y-%m-%d %H:%M"),
+        } for r in rows],
+        "summary": summary,
+    })
+
+
+@app.route("/api/dead-letters/redrive", methods=["POST"])
+def api_redrive_dead_letters():
+    """
+    Starts a re-drive of the matching pending dead letters on the workers,
+    which send them to their host-shard queues in paced batches.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        rate = _positive_arg(data.get("rate"), "rate", float, REDRIVE_DEFAULT_RATE)
+        limit = min(_positive_arg(data.get("limit"), "limit", int, 1000), DEAD_LETTERS_MAX_LIMIT)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    pending = len(_pending_dead_letters(data.get("site"), data.get("error_class"), limit))
+    if not pending:
+        return jsonify({"ok": True, "pending": 0, "message": "No pending dead letters"})
+    try:
+        celery_client.send_task(
+            "scheduler.redrive_dead_letters",
+            kwargs={"customer_id": CUSTOMER_ID, "site": data.get("site"),
+                    "error_class": data.get("error_class"), "rate": rate, "limit": limit},
+            queue="celery",
+        )
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+    return jsonify({
+        "ok": True,
+        "pending": pending,
+        "message": f"Re-driving {pending} dead letter(s) at {rate:g}/s",
+    })
 
 
 @app.route("/api/settings", methods=["GET"])
@@ -356,21 +1057,495 @@ def api_get_settings():
 def api_update_settings():
     data = request.get_json() or {}
     set_setting("momentum_api_key", (data.get("momentum_api_key") or "").strip())
+    invalidate_dashboard()
     return jsonify({"ok": True})
 
 
+# ── Bulk import / export ──────────────────────────────────────────────────────
+
+def _import_records(fmt: str, stream) -> Iterator[Tuple[int, dict | None, str | None]]:
+    """
+    Yields (row number, record, error) for each row of a CSV (with a header
+    line) or NDJSON body, read as it arrives. Rows are numbered from 1,
+    not counting the CSV header. Raises ValueError if the CSV header lacks
+    url_name.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="" if fmt == "csv" else None)
+    row = 0
+    try:
+        if fmt == "csv":
+            reader = csv.DictReader(text)
+            if "url_name" not in (reader.fieldnames or []):
+                raise ValueError("CSV header must include url_name")
+            for row, record in enumerate(reader, 1):
+                record.pop(None, None)  # cells beyond the header
+                yield row, record, None
+            return
+        for line in text:
+            if not line.strip():
+                continue
+            row += 1
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield row, None, f"Invalid JSON: {e}"
+                continue
+            if not isinstance(record, dict):
+                yield row, None, "Each line must be a JSON object"
+                continue
+            yield row, record, None
+    except (UnicodeDecodeError, csv.Error) as e:
+        yield row + 1, None, f"Unreadable input, import stopped: {e}"
+
+
+def _encrypt_passwords(fernet: Fernet, rows: List[Tuple[int, dict]]) -> List[str | None]:
+    return [fernet.encrypt(site["password"].encode()).decode() if site["password"] else None for _, site in rows]
+
+
+def _site_key(site: dict) -> tuple:
+    # Export writes an empty fullname as the url_name, so compare it that way
+    return (site["fullname"] or site["url_name"], site["system_type"],
+            site["momentum_id"] or None, site["base_url"] or None)
+
+
+def _upsert_sites(cursor, rows: List[Tuple[int, dict]], passwords: List[str | None]) -> Tuple[int, int, list]:
+    """
+    Inserts new sites and inserts or updates the customer's credentials for
+    one chunk, with one multi-row statement per table. Sites are shared
+    between customers, so an existing one is never changed: a row whose
+    site fields differ from it is reported as a conflict, as POST /api/sites
+    refuses it. A row without a password keeps the stored one, so it must
+    be for an existing credential. Returns (created, updated, row errors);
+    the caller commits.
+    """
+    placeholders = ",".join(["%s"] * len(rows))
+    names = tuple(site["url_name"] for _, site in rows)
+    cursor.execute(
+        f"SELECT url_name, fullname, system_type, momentum_id, base_url FROM sites WHERE url_name IN ({placeholders})",
+        names,
+    )
+    known = {r[0]: _site_key(dict(zip(("url_name", "fullname", "system_type", "momentum_id", "base_url"), r)))
+             for r in cursor.fetchall()}
+    cursor.execute(
+        f"SELECT site FROM credentials WHERE customer_id = %s AND site IN ({placeholders})",
+        (CUSTOMER_ID, *names),
+    )
+    existing = {r[0] for r in cursor.fetchall()}
+
+    sites, credentials, errors = [], [], []
+    updated = 0
+    for (row, site), password in zip(rows, passwords):
+        url_name = site["url_name"]
+        if url_name in known and known[url_name] != _site_key(site):
+            errors.append({"row": row, "url_name": url_name,
+                           "error": f"'{url_name}' already exists with different site fields"})
+            continue
+        if password is None and url_name not in existing:
+            errors.append({"row": row, "url_name": url_name, "error": "password is required for a new site"})
+            continue
+        if url_name not in known:
+            sites.extend((url_name, site["fullname"], site["base_url"], site["system_type"], site["momentum_id"]))
+        credentials.extend((url_name, CUSTOMER_ID, site["username"], password, site["active"]))
+        updated += url_name in existing
+    if sites:
+        # A site created since the SELECT is left as it is
+        cursor.execute(
+            "INSERT INTO sites (url_name, fullname, base_url, system_type, momentum_id) VALUES "
+            + ",".join(["(%s,%s,%s,%s,%s)"] * (len(sites) // 5))
+            + " ON DUPLICATE KEY UPDATE url_name = url_name",
+            tuple(sites),
+        )
+    count = len(credentials) // 5
+    if count:
+        cursor.execute(
+            "INSERT INTO credentials (site, customer_id, username, password, active) VALUES "
+            + ",".join(["(%s,%s,%s,%s,%s)"] * count)
+            + " ON DUPLICATE KEY UPDATE username = VALUES(username), "
+              "password = COALESCE(VALUES(password), password), active = VALUES(active)",
+            tuple(credentials),
+        )
+    return count - updated, updated, errors
+
+
+@app.route("/api/bulk/import", methods=["POST"])
+def api_bulk_import():
+    """
+    Creates or updates sites from a CSV (header line required) or NDJSON body,
+    with the same fields as POST /api/sites. An existing site only gets the
+    customer's credential; rows that would change its shared fields are
+    listed as conflicts. The password may be left out for an existing
+    credential to keep it. Rows are committed IMPORT_CHUNK_ROWS at
+    a time; invalid rows are skipped and listed in the report.
+    """
+    fmt = request.args.get("format") or IMPORT_FORMATS.get(request.mimetype)
+    if fmt not in ("csv", "ndjson"):
+        return jsonify({"error": "Send text/csv or application/x-ndjson (or ?format=csv|ndjson)"}), 415
+
+    fernet = _fernet()
+    report = {"rows": 0, "created": 0, "updated": 0, "failed": 0}
+    errors: list = []
+    seen: dict = {}
+
+    def fail(row: int, url_name: str | None, error: str) -> None:
+        report["failed"] += 1
+        if len(errors) < IMPORT_MAX_ERRORS:
+            errors.append({"row": row, "url_name": url_name, "error": error})
+
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    def write(rows: List[Tuple[int, dict]], passwords) -> None:
+        try:
+            created, updated, row_errors = _upsert_sites(cursor, rows, passwords.result())
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            for row, site in rows:
+                fail(row, site["url_name"], str(e))
+            return
+        report["created"] += created
+        report["updated"] += updated
+        for e in row_errors:
+            fail(e["row"], e["url_name"], e["error"])
+
+    # Chunks are encrypted on the pool while earlier chunks are being written
+    pending: collections.deque = collections.deque()
+    chunk: List[Tuple[int, dict]] = []
+    try:
+        with ThreadPoolExecutor(max_workers=max(IMPORT_ENCRYPT_WORKERS, 1)) as pool:
+            for row, record, error in _import_records(fmt, request.stream):
+                report["rows"] += 1
+                if error:
+                    fail(row, None, error)
+                    continue
+                try:
+                    site = _site_fields(record, require_password=False)
+                except ValueError as e:
+                    fail(row, str(record.get("url_name") or "") or None, str(e))
+                    continue
+                if site["url_name"] in seen:
+                    fail(row, site["url_name"], f"Duplicate of row {seen[site['url_name']]}")
+                    continue
+                seen[site["url_name"]] = row
+                chunk.append((row, site))
+                if len(chunk) >= IMPORT_CHUNK_ROWS:
+                    pending.append((chunk, pool.submit(_encrypt_passwords, fernet, chunk)))
+                    chunk = []
+                    if len(pending) > IMPORT_ENCRYPT_WORKERS:
+                        write(*pending.popleft())
+            if chunk:
+                pending.append((chunk, pool.submit(_encrypt_passwords, fernet, chunk)))
+            while pending:
+                write(*pending.popleft())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    finally:
+        cursor.close()
+        conn.close()
+        if report["created"] or report["updated"]:
+            invalidate_dashboard()
+
+    return jsonify({
+        "ok": report["failed"] == 0,
+        **report,
+        "errors": sorted(errors, key=lambda e: e["row"]),
+        "errors_truncated": report["failed"] > len(errors),
+    })
+
+
+def _export_row(s: dict) -> dict:
+    ll = _to_stockholm(s.get("last_login"))
+    return {
+        "url_name": s["url_name"],
+        "fullname": s.get("fullname") or s["url_name"],
+        "system_type": s.get("system_type", "momentum"),
+        "momentum_id": s.get("momentum_id"),
+        "base_url": s.get("base_url"),
+        "username": s.get("username"),
+        "active": bool(s.get("active")),
+        "last_login": ll.isoformat(timespec="seconds") if ll else None,
+        "queue_points": s.get("queue_points"),
+    }
+
+
+@app.route("/api/export", methods=["GET"])
+def api_export():
+    """
+    Streams the customer's sites (without passwords) as NDJSON (default) or
+    CSV (?format=csv), ordered by url_name, with the same filters as
+    /api/sites. Rows are read EXPORT_BATCH_ROWS at a time, so memory use does
+    not grow with the number of sites. The output can be imported again.
+    """
+    fmt = request.args.get("format") or "ndjson"
+    if fmt not in ("csv", "ndjson"):
+        return jsonify({"error": "format must be csv or ndjson"}), 400
+    try:
+        query = _site_query(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    def batches() -> Iterator[List[dict]]:
+        after = None
+        while True:
+            where, params = list(query["where"]), list(query["params"])
+            if after is not None:
+                where.append("s.url_name > %s")
+                params.append(after)
+            conn = get_connection()
+            cursor = conn.cursor(dictionary=True)
+            try:
+                cursor.execute(
+                    "SELECT s.url_name, s.fullname, s.system_type, s.momentum_id, s.base_url, "
+                    "c.username, c.active, c.last_login, c.queue_points "
+                    "FROM sites s LEFT JOIN credentials c ON c.site = s.url_name AND c.customer_id = %s "
+                    f"{'WHERE ' + ' AND '.join(where) if where else ''} "
+                    "ORDER BY s.url_name LIMIT %s",
+                    (CUSTOMER_ID, *params, EXPORT_BATCH_ROWS),
+                )
+                rows = cursor.fetchall()
+            finally:
+                cursor.close()
+                conn.close()
+            if rows:
+                yield [_export_row(r) for r in rows]
+            if len(rows) < EXPORT_BATCH_ROWS:
+                return
+            after = rows[-1]["url_name"]
+
+    def stream():
+        if fmt == "ndjson":
+            for rows in batches():
+                yield "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in rows)
+            return
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS, lineterminator="\n")
+        writer.writeheader()
+        for rows in batches():
+            writer.writerows({**r, "active": str(r["active"]).lower()} for r in rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+
+    filename = f"queuepilot-sites-{datetime.date.today():%Y%m%d}.{fmt}"
+    mimetype = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    return Response(stream_with_context(stream()), mimetype=mimetype, headers={
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "Cache-Control": "no-store",
+        "X-Accel-Buffering": "no",
+    })
+
+
+# ── Bulk changes ──────────────────────────────────────────────────────────────
+
+def _in_list(names: List[str]) -> str:
+    return ",".join(["%s"] * len(names))
+
+
+def _bulk_selection(data: dict) -> Tuple[str, list]:
+    """
+    The WHERE condition (over FROM_SITES) and params selecting a bulk
+    request's sites: either "url_names" (a list) or "filter" (the /api/sites
+    filters; {} selects every site). Raises ValueError.
+    """
+    if ("url_names" in data) == ("filter" in data):
+        raise ValueError("Send either url_names or filter")
+    if "url_names" in data:
+        names = data["url_names"]
+        if not isinstance(names, list) or not names or not all(isinstance(n, str) for n in names):
+            raise ValueError("url_names must be a non-empty list of strings")
+        if len(names) > BULK_MAX_SITES:
+            raise ValueError(f"At most {BULK_MAX_SITES} url_names per request")
+        return f"s.url_name IN ({_in_list(names)})", list(names)
+    if not isinstance(data["filter"], dict):
+        raise ValueError("filter must be an object")
+    args = {k: str(v).lower() if isinstance(v, bool) else str(v) for k, v in data["filter"].items()}
+    query = _site_query(args)
+    return " AND ".join(query["where"]) or "TRUE", query["params"]
+
+
+def _bulk_set(values) -> Tuple[List[str], list, List[str], list]:
+    """
+    SET assignments and params for the sites and credentials tables from a
+    bulk update's "set". Switching system_type clears the ID field the new
+    type does not use, as a single-site update does. Raises ValueError.
+    """
+    if not isinstance(values, dict) or not values:
+        raise ValueError("set must be an object with at least one field")
+    unknown = set(values) - BULK_UPDATE_FIELDS
+    if unknown:
+        raise ValueError(f"Cannot set {', '.join(sorted(unknown))} in bulk")
+
+    def text(name: str) -> str:
+        return "" if values[name] is None else str(values[name]).strip()
+
+    sites, site_params, credentials, credential_params = [], [], [], []
+    for name in ("fullname", "username"):
+        if name in values and not text(name):
+            raise ValueError(f"{name} cannot be empty")
+    if "fullname" in values:
+        sites.append("fullname = %s")
+        site_params.append(text("fullname"))
+
+    # The (new or current) system type decides which ID field is kept
+    system_type = text("system_type") if "system_type" in values else None
+    if system_type is not None and system_type not in SYSTEM_TYPE_QUEUES:
+        raise ValueError(f"system_type must be one of {', '.join(SYSTEM_TYPE_QUEUES)}")
+    type_expr, type_params = ("%s", [system_type]) if system_type else ("system_type", [])
+    for column, uses in (("momentum_id", "momentum"), ("base_url", "vitec")):
+        if column in values:
+            value = text(column).rstrip("/") if column == "base_url" else text(column)
+            sites.append(f"{column} = IF({type_expr} = '{uses}', %s, NULL)")
+            site_params.extend([*type_params, value or None])
+        elif system_type:
+            sites.append(f"{column} = IF(%s = '{uses}', {column}, NULL)")
+            site_params.append(system_type)
+    if system_type:
+        sites.append("system_type = %s")
+        site_params.append(system_type)
+
+    if "username" in values:
+        credentials.append("username = %s")
+        credential_params.append(text("username"))
+    if "active" in values:
+        credentials.append("active = %s")
+        credential_params.append(int(_bool_field(values["active"])))
+    return sites, site_params, credentials, credential_params
+
+
+def _bulk_change(data: dict, apply: Callable[[object, List[str]], None], returning: bool = True):
+    """
+    Runs a bulk change in one transaction: locks the selected sites, calls
+    apply(cursor, url_names) to change them with set-based statements, and
+    answers with the changed rows (or, if not returning, just their names)
+    plus any requested url_names that do not exist.
+    """
+    try:
+        where, params = _bulk_selection(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(
+            f"SELECT s.url_name {FROM_SITES} WHERE {where} ORDER BY s.url_name LIMIT %s FOR UPDATE",
+            (CUSTOMER_ID, *params, BULK_MAX_SITES + 1),
+        )
+        names = [r["url_name"] for r in cursor.fetchall()]
+        if len(names) > BULK_MAX_SITES:
+            conn.rollback()
+            return jsonify({"error": f"The filter matches more than {BULK_MAX_SITES} sites"}), 400
+        changed: list = names
+        if names:
+            apply(cursor, names)
+            if returning:
+                cursor.execute(
+                    f"SELECT {SITE_COLUMNS} {FROM_SITES} "
+                    f"WHERE s.url_name IN ({_in_list(names)}) ORDER BY s.url_name",
+                    (CUSTOMER_ID, *names),
+                )
+                changed = [_site_row(r) for r in cursor.fetchall()]
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        return jsonify({"error": str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+    if names:
+        invalidate_dashboard()
+    found = set(names)
+    return jsonify({
+        "ok": True,
+        "count": len(names),
+        "sites" if returning else "deleted": changed,
+        "not_found": [n for n in data.get("url_names", []) if n not in found],
+    })
+
+
+@app.route("/api/bulk/toggle-active", methods=["POST"])
+def api_bulk_toggle_active():
+    """
+    Flips active for the selected sites' credentials, or sets it to "active"
+    if given. Returns the changed rows.
+    """
+    data = request.get_json() or {}
+    try:
+        active = int(_bool_field(data["active"])) if "active" in data else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    def apply(cursor, names):
+        cursor.execute(
+            f"UPDATE credentials SET active = {'%s' if active is not None else '1 - active'} "
+            f"WHERE customer_id = %s AND site IN ({_in_list(names)})",
+            (*([active] if active is not None else []), CUSTOMER_ID, *names),
+        )
+
+    return _bulk_change(data, apply)
+
+
+@app.route("/api/bulk/update", methods=["POST"])
+def api_bulk_update():
+    """
+    Sets the fields in "set" (fullname, system_type, momentum_id, base_url,
+    username, active) on every selected site. Returns the changed rows.
+    """
+    data = request.get_json() or {}
+    try:
+        sites, site_params, credentials, credential_params = _bulk_set(data.get("set"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    def apply(cursor, names):
+        if sites:
+            cursor.execute(
+                f"UPDATE sites SET {', '.join(sites)} WHERE url_name IN ({_in_list(names)})",
+                (*site_params, *names),
+            )
+        if credentials:
+            cursor.execute(
+                f"UPDATE credentials SET {', '.join(credentials)} "
+                f"WHERE customer_id = %s AND site IN ({_in_list(names)})",
+                (*credential_params, CUSTOMER_ID, *names),
+            )
+
+    return _bulk_change(data, apply)
+
+
+@app.route("/api/bulk/delete", methods=["POST"])
+def api_bulk_delete():
+    """Deletes the selected sites and their credentials. Returns the deleted url_names."""
+    data = request.get_json() or {}
+
+    def apply(cursor, names):
+        cursor.execute(f"DELETE FROM credentials WHERE site IN ({_in_list(names)})", tuple(names))
+        cursor.execute(f"DELETE FROM sites WHERE url_name IN ({_in_list(names)})", tuple(names))
+
+    return _bulk_change(data, apply, returning=False)
+
+
 # ── SPA catch-all ─────────────────────────────────────────────────────────────
 
 _STATIC_DIR = os.path.join(os.path.dirname(__file__), "static")
+_static_index = static_files.StaticIndex(_STATIC_DIR)
 
 
 @app.route("/", defaults={"path": ""})
 @app.route("/<path:path>")
 def serve_spa(path: str):
-    candidate = os.path.join(_STATIC_DIR, path) if path else None
-    if candidate and os.path.isfile(candidate):
-        return send_from_directory(_STATIC_DIR, path)
-    return send_from_directory(_STATIC_DIR, "index.html")
+    entry = _static_index.get(path)
+    if entry is None:
+        # A hashed asset that is gone (an old build's) must not get index.html
+        if path.startswith(static_files.IMMUTABLE_PREFIX):
+            return jsonify({"error": "Not found"}), 404
+        entry = _static_index.get("index.html")
+        if entry is None:
+            return jsonify({"error": "Dashboard not built"}), 404
+    return _static_index.send(entry)
 
 
 ensure_schema()
@@ -0,0 +1,183 @@
+"""
+QueuePilot Container State
+
+Keeps the queuepilot container's state in memory for /api/status. A
+background thread subscribes to Docker events for the container once and
+re-inspects it only when a lifecycle event (start, die, destroy, ...) arrives,
+so a status request never talks to the Docker daemon itself. The stream is
+re-opened, with backoff, if the daemon goes away.
+
+CONTAINER_EVENTS_SOURCE selects where events come from:
+  - docker (default): the Docker daemon, via the mounted socket
+  - fake:<path>: a JSON Lines file, tailed; each line is an event such as
+    {"Action": "die", "Status": "exited", "FinishedAt": "2025-01-01T03:00:00Z"}
+    which lets the watcher (and the dashboard) be exercised without Docker.
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterator
+
+import docker
+
+# Container events after which its state is inspected again
+STATE_ACTIONS = {"create", "start", "restart", "die", "stop", "kill", "oom", "pause", "unpause", "destroy"}
+RECONNECT_DELAY = 2.0
+MAX_RECONNECT_DELAY = 60.0
+
+
+class DockerSource:
+    """Container inspection and events from the Docker daemon."""
+
+    def __init__(self):
+        self._client = docker.from_env()
+
+    def inspect(self, name: str) -> Dict | None:
+        """The container's State, or None if it does not exist."""
+        try:
+            return self._client.api.inspect_container(name)["State"]
+        except docker.errors.NotFound:
+            return None
+
+    def events(self, name: str) -> Iterator[Dict]:
+        return self._client.events(decode=True, filters={"type": "container", "container": name})
+
+    def close(self) -> None:
+        self._client.close()
+
+
+class FakeDockerSource:
+    """
+    In-memory stand-in for DockerSource. emit() changes the container's state
+    and delivers the matching event; fail() breaks the current event stream.
+    """
+
+    def __init__(self, status: str | None = None, finished_at: str | None = None):
+        self._lock = threading.Lock()
+        self._state = {"Status": status, "FinishedAt": finished_at} if status else None
+        self._events: queue.Queue = queue.Queue()
+
+    def emit(self, action: str, status: str | None = None, finished_at: str | None = None) -> None:
+        with self._lock:
+            if action == "destroy":
+                self._state = None
+            elif status:
+                self._state = {"Status": status, "FinishedAt": finished_at or (self._state or {}).get("FinishedAt")}
+        self._events.put({"Type": "container", "Action": action})
+
+    def fail(self) -> None:
+        self._events.put(ConnectionError("fake events stream closed"))
+
+    def inspect(self, name: str) -> Dict | None:
+        with self._lock:
+            return dict(self._state) if self._state else None
+
+    def events(self, name: str) -> Iterator[Dict]:
+        while True:
+            event = self._events.get()
+            if isinstance(event, Exception):
+                raise event
+            yield event
+
+    def tail(self, path: str) -> None:
+        """Emits every JSON line appended to `path` (in a daemon thread)."""
+        def follow():
+            while not os.path.exists(path):
+                time.sleep(0.5)
+            with open(path, encoding="utf-8") as fh:
+                while True:
+                    line = fh.readline()
+                    if not line:
+                        time.sleep(0.2)
+                        continue
+                    if line.strip():
+                        event = json.loads(line)
+                        self.emit(event["Action"], event.get("Status"), event.get("FinishedAt"))
+
+        threading.Thread(target=follow, name="fake-docker-events", daemon=True).start()
+
+
+def source_from_env() -> Callable[[], object]:
+    """Returns a factory for the events source named by CONTAINER_EVENTS_SOURCE."""
+    spec = os.getenv("CONTAINER_EVENTS_SOURCE", "docker")
+    if spec.startswith("fake:"):
+        fake = FakeDockerSource()
+        fake.tail(spec[len("fake:"):])
+        return lambda: fake
+    return DockerSource
+
+
+class ContainerWatcher:
+    """Follows one container's state from an events source."""
+
+    def __init__(self, name: str, source_factory: Callable[[], object],
+                 reconnect_delay: float = RECONNECT_DELAY):
+        self.name = name
+        self._source_factory = source_factory
+        self._reconnect_delay = reconnect_delay
+        self._lock = threading.Lock()
+        self._state: Dict = {"status": "unknown", "finished_at": None}
+        self._thread: threading.Thread | None = None
+        self._pid = None
+        self.updates = 0
+
+    def ensure_started(self) -> None:
+        # Started lazily per process, so forked server workers run their own
+        with self._lock:
+            if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name=f"watch-{self.name}", daemon=True)
+            self._thread.start()
+
+    def info(self) -> Dict:
+        """The last known state: status, raw FinishedAt and, on failure, error."""
+        self.ensure_started()
+        with self._lock:
+            return dict(self._state)
+
+    def _set(self, state: Dict) -> None:
+        with self._lock:
+            self._state = state
+            self.updates += 1
+
+    def _update(self, state: Dict | None) -> None:
+        if state is None:
+            self._set({"status": "not_found", "finished_at": None})
+            return
+        finished_at = state.get("FinishedAt")
+        if not finished_at or finished_at.startswith("0001"):
+            finished_at = None
+        self._set({"status": state.get("Status", "unknown"), "finished_at": finished_at})
+
+    def _run(self) -> None:
+        delay = self._reconnect_delay
+        while True:
+            source = None
+            try:
+                source = self._source_factory()
+                # Subscribe before inspecting, so a change in between is not missed
+                stream = source.events(self.name)
+                self._update(source.inspect(self.name))
+                delay = self._reconnect_delay
+                for event in stream:
+                    if event.get("Action", event.get("status")) in STATE_ACTIONS:
+                        self._update(source.inspect(self.name))
+            except Exception as e:
+                logging.warning("Container watcher for %s: %s (retrying in %.0fs)", self.name, e, delay)
+                with self._lock:
+                    finished_at = self._state.get("finished_at")
+                self._set({"status": "error", "finished_at": finished_at, "error": str(e)})
+            finally:
+                close = getattr(source, "close", None)
+                if close:
+                    try:
+                        close()
+                    except Exception:
+                        pass
+            time.sleep(delay)
+            delay = min(delay * 2, MAX_RECONNECT_DELAY)
@@ -1,11 +1,13 @@
-import { createContext, useContext, useState, useCallback } from 'react'
+import { createContext, lazy, Suspense, useContext, useState, useCallback, useMemo } from 'react'
 import { BrowserRouter, Routes, Route } from 'react-router-dom'
-import { CheckCircle, XCircle, AlertTriangle, Info, X } from 'lucide-react'
+import { CheckCircle, XCircle, AlertTriangle, Info, X, Loader2 } from 'lucide-react'
 import type { Toast } from './types'
 import Navbar from './components/Navbar'
 import Dashboard from './pages/Dashboard'
-import SiteForm from './pages/SiteForm'
-import Settings from './pages/Settings'
+
+// Only the dashboard is in the main bundle; the other pages load on first visit
+const SiteForm = lazy(() => import('./pages/SiteForm'))
+const Settings = lazy(() => import('./pages/Settings'))
 
 // ── Toast context ──────────────────────────────────────────────────────────────
 
@@ -50,6 +52,14 @@ function ToastList({ toasts, onDismiss }: { toasts: Toast[]; onDismiss: (id: str
   )
 }
 
+function PageFallback() {
+  return (
+    <div className="flex justify-center py-24" aria-label="Loading">
+      <Loader2 size={22} className="animate-spin text-slate-500" />
+    </div>
+  )
+}
+
 export default function App() {
   const [toasts, setToasts] = useState<Toast[]>([])
 
@@ -60,19 +70,22 @@ export default function App() {
   }, [])
 
   const dismiss = useCallback((id: string) => setToasts((p) => p.filter((t) => t.id !== id)), [])
+  const toastCtx = useMemo(() => ({ addToast }), [addToast])
 
   return (
-    <ToastContext.Provider value={{ addToast }}>
+    <ToastContext.Provider value={toastCtx}>
       <BrowserRouter>
         <div className="min-h-screen bg-bg-base">
           <Navbar />
           <main className="max-w-6xl mx-auto px-4 sm:px-6 py-8">
-            <Routes>
-              <Route path="/"                     element={<Dashboard />} />
-              <Route path="/sites/add"            element={<SiteForm />} />
-              <Route path="/sites/:urlName/edit"  element={<SiteForm />} />
-              <Route path="/settings"             element={<Settings />} />
-            </Routes>
+            <Suspense fallback={<PageFallback />}>
+              <Routes>
+                <Route path="/"                     element={<Dashboard />} />
+                <Route path="/sites/add"            element={<SiteForm />} />
+                <Route path="/sites/:urlName/edit"  element={<SiteForm />} />
+                <Route path="/settings"             element={<Settings />} />
+              </Routes>
+            </Suspense>
           </main>
         </div>
         <ToastList toasts={toasts} onDismiss={dismiss} />
@@ -1,4 +1,7 @@
-import type { SiteFormData, SitesResponse, ContainerStatus } from './types'
+import type {
+  SiteFormData, SiteQuery, SitesResponse, ContainerStatus, DeadLettersResponse,
+  BulkSelection, BulkResult, BulkDeleteResult,
+} from './types'
 
 async function req<T>(url: string, opts?: RequestInit): Promise<T> {
   const res = await fetch(url, {
@@ -10,9 +13,16 @@ async function req<T>(url: string, opts?: RequestInit): Promise<T> {
   return data as T
 }
 
+// Query string without unset parameters
+function qs(q: object): string {
+  const p = new URLSearchParams()
+  for (const [k, v] of Object.entries(q)) if (v !== undefined && v !== '') p.set(k, String(v))
+  return p.toString()
+}
+
 export const api = {
   sites: {
-    list: () => req<SitesResponse>('/api/sites'),
+    list: (q: SiteQuery = {}) => req<SitesResponse>(`/api/sites?${qs(q)}`),
     get:  (id: string) => req<SiteFormData & { queue_details?: unknown[] }>(`/api/sites/${id}`),
     create: (data: SiteFormData) =>
       req<{ ok: boolean }>('/api/sites', { method: 'POST', body: JSON.stringify(data) }),
@@ -22,9 +32,28 @@ export const api = {
       req<{ ok: boolean }>(`/api/sites/${id}`, { method: 'DELETE' }),
     toggleActive: (id: string) =>
       req<{ active: boolean }>(`/api/sites/${id}/toggle-active`, { method: 'POST' }),
+    run: (id: string) =>
+      req<{ ok: boolean; message: string }>(`/api/sites/${id}/run`, { method: 'POST' }),
+  },
+  // One request and one transaction for many sites; results patch the rows in place
+  bulk: {
+    toggleActive: (sel: BulkSelection, active?: boolean) =>
+      req<BulkResult>('/api/bulk/toggle-active', { method: 'POST', body: JSON.stringify({ ...sel, active }) }),
+    update: (sel: BulkSelection, set: Partial<Omit<SiteFormData, 'url_name' | 'password'>>) =>
+      req<BulkResult>('/api/bulk/update', { method: 'POST', body: JSON.stringify({ ...sel, set }) }),
+    delete: (sel: BulkSelection) =>
+      req<BulkDeleteResult>('/api/bulk/delete', { method: 'POST', body: JSON.stringify(sel) }),
   },
   status: () => req<ContainerStatus>('/api/status'),
-  run:    () => req<{ ok: boolean; message: string }>('/api/run', { method: 'POST' }),
+  // Run and login progress pushed by the workers (Server-Sent Events)
+  events: () => new EventSource('/api/events'),
+  run:    () => req<{ ok: boolean; message: string; run_id?: string }>('/api/run', { method: 'POST' }),
+  deadLetters: {
+    list: (q: { site?: string; error_class?: string } = {}) =>
+      req<DeadLettersResponse>(`/api/dead-letters?${new URLSearchParams(q)}`),
+    redrive: (d: { site?: string; error_class?: string; rate?: number; limit?: number }) =>
+      req<{ ok: boolean; pending: number; message: string }>('/api/dead-letters/redrive', { method: 'POST', body: JSON.stringify(d) }),
+  },
   settings: {
     get:    () => req<{ momentum_api_key: string; api_key_missing: boolean }>('/api/settings'),
     update: (d: { momentum_api_key: string }) =>
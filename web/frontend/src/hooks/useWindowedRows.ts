@@ -0,0 +1,59 @@
+import { useCallback, useEffect, useRef, useState } from 'react'
+
+/**
+ * Windowed rendering for a long list inside a scroll container.
+ *
+ * Returns the slice of rows to render plus the spacer heights above and
+ * below it. Rows report their height through `measure` once rendered
+ * (expanded rows are taller); rows not rendered yet count as `estimate`.
+ */
+export function useWindowedRows(keys: string[], estimate: number, overscan = 600) {
+  const [container, setContainer] = useState<HTMLDivElement | null>(null)
+  const [viewport, setViewport]   = useState({ top: 0, height: 800 })
+  const [, setMeasured]           = useState(0)
+  const heights                   = useRef(new Map<string, number>())
+
+  useEffect(() => {
+    if (!container) return
+    let frame = 0
+    const update = () => {
+      cancelAnimationFrame(frame)
+      frame = requestAnimationFrame(() =>
+        setViewport({ top: container.scrollTop, height: container.clientHeight }))
+    }
+    update()
+    container.addEventListener('scroll', update, { passive: true })
+    const observer = new ResizeObserver(update)
+    observer.observe(container)
+    return () => {
+      cancelAnimationFrame(frame)
+      container.removeEventListener('scroll', update)
+      observer.disconnect()
+    }
+  }, [container])
+
+  const measure = useCallback((key: string, height: number) => {
+    const known = heights.current.get(key)
+    if (height > 0 && (known === undefined || Math.abs(known - height) > 0.5)) {
+      heights.current.set(key, height)
+      setMeasured((n) => n + 1)
+    }
+  }, [])
+
+  const scrollToTop = useCallback(() => { if (container) container.scrollTop = 0 }, [container])
+
+  const heightOf = (key: string) => heights.current.get(key) ?? estimate
+  const from = viewport.top - overscan
+  const to   = viewport.top + viewport.height + overscan
+
+  let start = 0
+  let offset = 0
+  while (start < keys.length && offset + heightOf(keys[start]) <= from) offset += heightOf(keys[start++])
+  const padTop = offset
+  let end = start
+  while (end < keys.length && offset < to) offset += heightOf(keys[end++])
+  let padBottom = 0
+  for (let i = end; i < keys.length; i++) padBottom += heightOf(keys[i])
+
+  return { containerRef: setContainer, start, end, padTop, padBottom, measure, scrollToTop }
+}
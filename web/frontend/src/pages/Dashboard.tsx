@@ -1,4 +1,4 @@
-import { useState, useEffect, useCallback, useMemo } from 'react'
+import { memo, useState, useEffect, useLayoutEffect, useCallback, useMemo, useRef } from 'react'
 import { Link } from 'react-router-dom'
 import {
   Plus, Play, ChevronDown, Pencil, Trash2, Loader2,
@@ -7,7 +7,10 @@ import {
 } from 'lucide-react'
 import { api } from '../api'
 import { useToast } from '../App'
-import type { Site, SitesResponse, ContainerStatus } from '../types'
+import { useWindowedRows } from '../hooks/useWindowedRows'
+import type {
+  Site, SiteQuery, SiteFilter, SitesResponse, ContainerStatus, LoginEvent, RunEvent, BulkSelection,
+} from '../types'
 
 // ── Sub-components ─────────────────────────────────────────────────────────
 
@@ -56,8 +59,8 @@ function SortBtn({ col, current, asc }: { col: SortCol; current: SortCol; asc: b
 
 // ── Delete confirmation modal ──────────────────────────────────────────────
 
-function DeleteModal({ urlName, onConfirm, onCancel }: {
-  urlName: string; onConfirm: () => void; onCancel: () => void
+function DeleteModal({ urlName, count, onConfirm, onCancel }: {
+  urlName?: string; count?: number; onConfirm: () => void; onCancel: () => void
 }) {
   return (
     <div
@@ -71,12 +74,17 @@ function DeleteModal({ urlName, onConfirm, onCancel }: {
             <Trash2 size={17} className="text-red-400" />
           </div>
           <div>
-            <h2 id="del-title" className="text-sm font-semibold text-slate-100">Delete site</h2>
+            <h2 id="del-title" className="text-sm font-semibold text-slate-100">
+              {count != null ? 'Delete sites' : 'Delete site'}
+            </h2>
             <p className="text-xs text-slate-500 mt-0.5">This action cannot be undone</p>
           </div>
         </div>
         <p className="text-sm text-slate-300 mb-6">
-          Delete <code>{urlName}</code> and all its credentials?
+          {count != null
+            ? <>Delete {count.toLocaleString()} site{count === 1 ? '' : 's'} and all their credentials?</>
+            : <>Delete <code>{urlName}</code> and all its credentials?</>
+          }
         </p>
         <div className="flex gap-3 justify-end">
           <button onClick={onCancel} className="btn-secondary">Cancel</button>
@@ -94,26 +102,53 @@ function DeleteModal({ urlName, onConfirm, onCancel }: {
 
 // ── Site row ──────────────────────────────────────────────────────────────
 
-function SiteRow({
-  site, expanded, onToggleExpand, onToggleActive, onDeleteRequest, isDeleting,
+// Memoized: callbacks take the url_name, so they stay stable across renders
+// and only rows whose site or flags changed re-render.
+const SiteRow = memo(function SiteRow({
+  site, expanded, selected, inFlight, onToggleExpand, onSelect, onToggleActive, onRun, onDeleteRequest, onMeasure,
+  isDeleting,
 }: {
   site: Site
   expanded: boolean
-  onToggleExpand: () => void
-  onToggleActive: () => void
-  onDeleteRequest: () => void
+  selected: boolean
+  inFlight: boolean
+  onToggleExpand: (urlName: string) => void
+  onSelect: (urlName: string) => void
+  onToggleActive: (urlName: string, current: boolean) => void
+  onRun: (urlName: string) => void
+  onDeleteRequest: (urlName: string) => void
+  onMeasure: (urlName: string, height: number) => void
   isDeleting: boolean
 }) {
   const hasDetails = site.queue_details.length > 0
+  const rowRef     = useRef<HTMLTableRowElement>(null)
+  const detailRef  = useRef<HTMLTableRowElement>(null)
+
+  useLayoutEffect(() => {
+    const height = (rowRef.current?.offsetHeight ?? 0) + (detailRef.current?.offsetHeight ?? 0)
+    onMeasure(site.url_name, height)
+  })
 
   return (
     <>
       <tr
+        ref={rowRef}
         className={`group transition-colors duration-100
           ${hasDetails ? 'cursor-pointer hover:bg-bg-elevated' : 'hover:bg-bg-surface/60'}
           ${!site.active ? 'opacity-40' : ''}`}
-        onClick={hasDetails ? onToggleExpand : undefined}
+        onClick={hasDetails ? () => onToggleExpand(site.url_name) : undefined}
       >
+        {/* bulk selection */}
+        <td className="pl-4 py-3.5 w-6" onClick={(e) => e.stopPropagation()}>
+          <input
+            type="checkbox"
+            checked={selected}
+            onChange={() => onSelect(site.url_name)}
+            aria-label={`Select ${site.fullname}`}
+            className="h-3.5 w-3.5 accent-primary cursor-pointer"
+          />
+        </td>
+
         {/* expand indicator */}
         <td className="px-4 py-3.5 w-8">
           {hasDetails
@@ -150,7 +185,9 @@ function SiteRow({
 
         {/* last login */}
         <td className="px-3 py-3.5">
-          {site.last_login
+          {inFlight
+            ? <Loader2 size={12} className="animate-spin text-primary" aria-label="Logging in" />
+            : site.last_login
             ? <span className="text-xs font-mono text-slate-400 whitespace-nowrap">{site.last_login}</span>
             : <span className="text-slate-600 text-sm">Never</span>
           }
@@ -170,7 +207,7 @@ function SiteRow({
             role="switch"
             aria-checked={site.active}
             aria-label={`${site.active ? 'Deactivate' : 'Activate'} ${site.fullname}`}
-            onClick={onToggleActive}
+            onClick={() => onToggleActive(site.url_name, site.active)}
             className={`relative inline-flex h-5 w-9 items-center rounded-full transition-colors duration-200
               focus:outline-none focus:ring-2 focus:ring-primary focus:ring-offset-2 focus:ring-offset-bg-surface
               cursor-pointer ${site.active ? 'bg-primary' : 'bg-slate-700'}`}
@@ -183,6 +220,15 @@ function SiteRow({
         {/* actions */}
         <td className="px-4 py-3.5 text-right" onClick={(e) => e.stopPropagation()}>
           <div className="flex items-center justify-end gap-1">
+            <button
+              onClick={() => onRun(site.url_name)}
+              disabled={inFlight}
+              className="btn-ghost py-1 px-2"
+              aria-label={`Refresh ${site.fullname} now`}
+              title="Refresh now"
+            >
+              <RefreshCw size={12} aria-hidden />
+            </button>
             <Link
               to={`/sites/${site.url_name}/edit`}
               className="btn-ghost py-1 px-2"
@@ -192,7 +238,7 @@ function SiteRow({
               <span className="hidden sm:inline text-xs">Edit</span>
             </Link>
             <button
-              onClick={onDeleteRequest}
+              onClick={() => onDeleteRequest(site.url_name)}
               disabled={isDeleting}
               className="btn-danger py-1 px-2"
               aria-label={`Delete ${site.fullname}`}
@@ -209,8 +255,8 @@ function SiteRow({
 
       {/* expanded details */}
       {hasDetails && expanded && (
-        <tr className="bg-bg-elevated/40">
-          <td colSpan={8} className="px-10 py-4">
+        <tr ref={detailRef} className="bg-bg-elevated/40">
+          <td colSpan={9} className="px-10 py-4">
             <p className="text-xs font-semibold text-slate-500 uppercase tracking-wider mb-3">
               Queue Breakdown
             </p>
@@ -239,7 +285,7 @@ function SiteRow({
       )}
     </>
   )
-}
+})
 
 // ── Skeleton ──────────────────────────────────────────────────────────────
 
@@ -270,7 +316,15 @@ function Skeleton() {
 
 const SYSTEM_LABEL: Record<string, string> = { momentum: 'Momentum', vitec: 'Vitec Arena' }
 const VALID_SORT_COLS: SortCol[] = ['fullname', 'system_type', 'last_login', 'queue_points']
-const PAGE_SIZE = 10
+const PAGE_SIZES = [25, 100, 1000, 10000]
+const ROW_HEIGHT = 57 // px, collapsed row; rows are measured once rendered
+const STREAM_RETRY_MS = 30_000 // reopen a refused event stream after (server Retry-After)
+const STALE_OPTIONS = [
+  { days: '',   label: 'Any last login' },
+  { days: '7',  label: 'No login in 7 days' },
+  { days: '30', label: 'No login in 30 days' },
+  { days: '90', label: 'No login in 90 days' },
+]
 
 export default function Dashboard() {
   const { addToast } = useToast()
@@ -281,6 +335,12 @@ export default function Dashboard() {
   const [loadErr, setLoadErr]               = useState<string | null>(null)
   const [filter, setFilter]                 = useState('all')
   const [search, setSearch]                 = useState('') // intentionally not persisted — stale searches are confusing
+  const [debouncedSearch, setDebouncedSearch] = useState('')
+  const [staleDays, setStaleDays]           = useState('')
+  const [pageSize, setPageSize]             = useState(() => {
+    const v = Number(localStorage.getItem('qp_pageSize'))
+    return PAGE_SIZES.includes(v) ? v : 100
+  })
   const [showInactive, setShowInactive]     = useState(() => localStorage.getItem('qp_showInactive') === 'true')
   const [expanded, setExpanded]             = useState<Set<string>>(new Set())
   const [sortCol, setSortCol]               = useState<SortCol>(() => {
@@ -288,28 +348,143 @@ export default function Dashboard() {
     return VALID_SORT_COLS.includes(v as SortCol) ? (v as SortCol) : null
   })
   const [sortAsc, setSortAsc]               = useState(() => localStorage.getItem('qp_sortAsc') !== 'false')
-  const [page, setPage]                     = useState(0)
+  // Cursor of each page visited so far, for the query they were fetched with
+  const [paging, setPaging]                 = useState<{ key: string; cursors: (string | undefined)[]; page: number }>(
+    { key: '', cursors: [undefined], page: 0 })
   const [deletingId, setDeletingId]         = useState<string | null>(null)
   const [confirmDel, setConfirmDel]         = useState<string | null>(null)
+  // Bulk selection: picked rows, or every site matching the current filters
+  const [selected, setSelected]             = useState<Set<string>>(new Set())
+  const [allMatching, setAllMatching]       = useState(false)
+  const [bulkBusy, setBulkBusy]             = useState(false)
+  const [confirmBulkDel, setConfirmBulkDel] = useState(false)
+  const [live, setLive]                     = useState(false)
+  const [streamAttempt, setStreamAttempt]   = useState(0)
+  const [inFlight, setInFlight]             = useState<Set<string>>(new Set())
+  const [progress, setProgress]             = useState<{ done: number; total: number } | null>(null)
+  const activeRuns                          = useRef(0)
+  const streamDropped                       = useRef(false)
+
+  useEffect(() => {
+    const t = setTimeout(() => setDebouncedSearch(search.trim()), 300)
+    return () => clearTimeout(t)
+  }, [search])
+
+  // Filtering, sorting and paging happen server-side
+  const query = useMemo<SiteQuery>(() => ({
+    system_type: filter !== 'all' ? filter : undefined,
+    active: showInactive ? undefined : 'true',
+    stale_since: staleDays
+      ? new Date(Date.now() - Number(staleDays) * 86_400_000).toISOString().slice(0, 10)
+      : undefined,
+    q: debouncedSearch || undefined,
+    sort: sortCol ?? undefined,
+    order: sortCol && !sortAsc ? 'desc' : undefined,
+    limit: pageSize,
+  }), [filter, showInactive, staleDays, debouncedSearch, sortCol, sortAsc, pageSize])
+
+  // Bulk changes by filter use the list's filters, without its sort and paging
+  const siteFilter = useMemo<SiteFilter>(() => {
+    const { system_type, active, stale_since, q } = query
+    return { system_type, active, stale_since, q }
+  }, [query])
+
+  // A changed query starts again from its first page
+  const queryKey = JSON.stringify(query)
+  const page     = paging.key === queryKey ? paging.page : 0
+  const cursor   = paging.key === queryKey ? paging.cursors[paging.page] : undefined
 
   const loadAll = useCallback(async () => {
     try {
-      const [sites, st] = await Promise.all([api.sites.list(), api.status()])
+      const [sites, st] = await Promise.all([api.sites.list({ ...query, cursor }), api.status()])
       setData(sites)
       setStatus(st)
+      // Pick up a run that was already going when the page loaded
+      if (st.run?.running && st.run.total) setProgress((p) => p ?? { done: st.run?.done ?? 0, total: st.run?.total ?? 0 })
       setLoadErr(null)
     } catch (e) {
       setLoadErr(e instanceof Error ? e.message : 'Failed to load')
     } finally {
       setLoading(false)
     }
-  }, [])
+  }, [query, cursor])
 
   useEffect(() => { loadAll() }, [loadAll])
+  const loadAllRef = useRef(loadAll)
+  loadAllRef.current = loadAll
+
+  // Apply a login's result to its row and the totals, without reloading the list
+  const applyLogin = useCallback((ev: LoginEvent) => {
+    setInFlight((p) => {
+      const n = new Set(p)
+      if (ev.state === 'started') n.add(ev.site); else n.delete(ev.site)
+      return n
+    })
+    if (ev.state !== 'finished') return
+    setProgress((p) => p ? { ...p, done: p.done + 1 } : p)
+    if (ev.status !== 'ok') return
+    setData((p) => {
+      if (!p) return p
+      const totals = { ...p.totals }
+      const sites = p.sites.map((s) => {
+        if (s.url_name !== ev.site) return s
+        const next = { ...s, last_login: ev.last_login ?? s.last_login }
+        if (ev.queue_points != null || ev.queue_details?.length) {
+          const delta = (ev.queue_points ?? 0) - (s.queue_points ?? 0)
+          totals[s.system_type] = (totals[s.system_type] ?? 0) + delta
+          totals.all = (totals.all ?? 0) + delta
+          next.queue_points = ev.queue_points ?? null
+          next.queue_details = ev.queue_details ?? []
+        }
+        return next
+      })
+      return { ...p, sites, totals }
+    })
+  }, [])
+
+  const applyRun = useCallback((ev: RunEvent) => {
+    if (ev.state === 'started') {
+      activeRuns.current += 1
+      setProgress((p) => ({ done: p?.done ?? 0, total: (p?.total ?? 0) + (ev.total ?? 0) }))
+      setStatus((s) => s ? { ...s, container_status: 'running' } : s)
+    } else {
+      activeRuns.current = Math.max(0, activeRuns.current - 1)
+      if (activeRuns.current > 0) return
+      setProgress(null)
+      setInFlight(new Set())
+      setStatus((s) => s ? { ...s, container_status: 'exited', finished_at: ev.finished_at ?? s.finished_at } : s)
+    }
+  }, [])
+
+  // Live progress stream; after a dropped connection, reload to catch up on missed events.
+  // A refused stream (503 when the server is at its stream limit) is not retried by the
+  // browser, so open a new one later and poll meanwhile.
+  useEffect(() => {
+    const es = api.events()
+    let retry: ReturnType<typeof setTimeout> | undefined
+    es.onopen = () => {
+      setLive(true)
+      if (streamDropped.current) loadAllRef.current()
+      streamDropped.current = false
+    }
+    es.onerror = () => {
+      setLive(false)
+      streamDropped.current = true
+      if (es.readyState === EventSource.CLOSED && !retry) {
+        retry = setTimeout(() => setStreamAttempt((n) => n + 1), STREAM_RETRY_MS)
+      }
+    }
+    es.addEventListener('login', (e) => applyLogin(JSON.parse((e as MessageEvent).data)))
+    es.addEventListener('run', (e) => applyRun(JSON.parse((e as MessageEvent).data)))
+    return () => {
+      clearTimeout(retry)
+      es.close()
+    }
+  }, [applyLogin, applyRun, streamAttempt])
 
-  // Poll while running
+  // Fall back to polling while running if the event stream is unavailable
   useEffect(() => {
-    if (status?.container_status !== 'running') return
+    if (live || status?.container_status !== 'running') return
     const t = setInterval(async () => {
       try {
         const s = await api.status()
@@ -318,7 +493,7 @@ export default function Dashboard() {
       } catch { /* ignore */ }
     }, 2000)
     return () => clearInterval(t)
-  }, [status?.container_status, loadAll])
+  }, [live, status?.container_status, loadAll])
 
   const handleRun = async () => {
     setRunBusy(true)
@@ -333,7 +508,7 @@ export default function Dashboard() {
     }
   }
 
-  const handleToggle = async (urlName: string, current: boolean) => {
+  const handleToggle = useCallback(async (urlName: string, current: boolean) => {
     setData((p) => p ? { ...p, sites: p.sites.map((s) => s.url_name === urlName ? { ...s, active: !current } : s) } : p)
     try {
       await api.sites.toggleActive(urlName)
@@ -341,14 +516,14 @@ export default function Dashboard() {
       setData((p) => p ? { ...p, sites: p.sites.map((s) => s.url_name === urlName ? { ...s, active: current } : s) } : p)
       addToast('error', 'Failed to update status')
     }
-  }
+  }, [addToast])
 
   const handleDelete = async (urlName: string) => {
     setDeletingId(urlName)
     setConfirmDel(null)
     try {
       await api.sites.delete(urlName)
-      setData((p) => p ? { ...p, sites: p.sites.filter((s) => s.url_name !== urlName) } : p)
+      setData((p) => p ? { ...p, sites: p.sites.filter((s) => s.url_name !== urlName), count: p.count - 1 } : p)
       addToast('success', `Site '${urlName}' deleted`)
     } catch (e) {
       addToast('error', e instanceof Error ? e.message : 'Failed to delete')
@@ -357,8 +532,68 @@ export default function Dashboard() {
     }
   }
 
-  const toggleExpand = (id: string) =>
-    setExpanded((p) => { const n = new Set(p); n.has(id) ? n.delete(id) : n.add(id); return n })
+  const toggleSelect = useCallback((urlName: string) => {
+    setAllMatching(false)
+    setSelected((p) => { const n = new Set(p); n.has(urlName) ? n.delete(urlName) : n.add(urlName); return n })
+  }, [])
+
+  const clearSelection = () => { setSelected(new Set()); setAllMatching(false) }
+
+  // A different filter makes a filter-wide selection mean other sites
+  useEffect(() => { setAllMatching(false) }, [queryKey])
+
+  const bulkSelection = (): BulkSelection =>
+    allMatching ? { filter: siteFilter } : { url_names: [...selected] }
+
+  // Replace the changed rows in place instead of reloading the page
+  const patchSites = (changed: Site[]) => {
+    const byName = new Map(changed.map((s) => [s.url_name, s]))
+    setData((p) => p ? { ...p, sites: p.sites.map((s) => byName.get(s.url_name) ?? s) } : p)
+  }
+
+  const handleBulkActive = async (active: boolean) => {
+    setBulkBusy(true)
+    try {
+      const res = await api.bulk.toggleActive(bulkSelection(), active)
+      patchSites(res.sites)
+      clearSelection()
+      addToast('success', `${res.count.toLocaleString()} site${res.count === 1 ? '' : 's'} ${active ? 'activated' : 'deactivated'}`)
+    } catch (e) {
+      addToast('error', e instanceof Error ? e.message : 'Failed to update sites')
+    } finally {
+      setBulkBusy(false)
+    }
+  }
+
+  const handleBulkDelete = async () => {
+    setConfirmBulkDel(false)
+    setBulkBusy(true)
+    try {
+      const res = await api.bulk.delete(bulkSelection())
+      const deleted = new Set(res.deleted)
+      setData((p) => p ? {
+        ...p, sites: p.sites.filter((s) => !deleted.has(s.url_name)), count: p.count - res.count,
+      } : p)
+      clearSelection()
+      addToast('success', `${res.count.toLocaleString()} site${res.count === 1 ? '' : 's'} deleted`)
+    } catch (e) {
+      addToast('error', e instanceof Error ? e.message : 'Failed to delete sites')
+    } finally {
+      setBulkBusy(false)
+    }
+  }
+
+  const handleRunSite = useCallback(async (urlName: string) => {
+    try {
+      const res = await api.sites.run(urlName)
+      addToast('info', res.message)
+    } catch (e) {
+      addToast('error', e instanceof Error ? e.message : 'Failed to start refresh')
+    }
+  }, [addToast])
+
+  const toggleExpand = useCallback((id: string) =>
+    setExpanded((p) => { const n = new Set(p); n.has(id) ? n.delete(id) : n.add(id); return n }), [])
 
   const handleSort = (col: SortCol) => {
     let newCol: SortCol
@@ -372,54 +607,38 @@ export default function Dashboard() {
     }
     setSortCol(newCol)
     setSortAsc(newAsc)
-    setPage(0)
     localStorage.setItem('qp_sortCol', newCol ?? '')
     localStorage.setItem('qp_sortAsc', String(newAsc))
   }
 
-  const allTypes = useMemo(() =>
-    [...new Set((data?.sites ?? []).map((s) => s.system_type))].sort(), [data])
-
-  const filtered = useMemo(() => {
-    let sites = data?.sites ?? []
-    if (filter !== 'all') sites = sites.filter((s) => s.system_type === filter)
-    if (!showInactive) sites = sites.filter((s) => s.active)
-    if (search.trim()) {
-      const q = search.trim().toLowerCase()
-      const SYSTEM_MAP: Record<string, string> = { momentum: 'momentum', vitec: 'vitec arena' }
-      sites = sites.filter((s) => [
-        s.fullname, s.url_name, s.username,
-        SYSTEM_MAP[s.system_type] ?? s.system_type,
-        s.last_login, s.queue_points?.toString(),
-        ...s.queue_details.map((d) => `${d.name} ${d.points} ${d.unit}`),
-      ].some((v) => v?.toLowerCase().includes(q)))
-    }
-    if (sortCol) {
-      sites = [...sites].sort((a, b) => {
-        const av = sortCol === 'queue_points' ? (a.queue_points ?? -1)
-          : sortCol === 'last_login' ? (a.last_login ?? '')
-          : sortCol === 'system_type' ? a.system_type
-          : a.fullname.toLowerCase()
-        const bv = sortCol === 'queue_points' ? (b.queue_points ?? -1)
-          : sortCol === 'last_login' ? (b.last_login ?? '')
-          : sortCol === 'system_type' ? b.system_type
-          : b.fullname.toLowerCase()
-        if (av < bv) return sortAsc ? -1 : 1
-        if (av > bv) return sortAsc ? 1 : -1
-        return 0
-      })
-    }
-    return sites
-  }, [data, filter, showInactive, search, sortCol, sortAsc])
-
-  // Reset to page 0 when filter, search, or show-inactive changes
-  useEffect(() => { setPage(0) }, [filter, showInactive, search])
+  const allTypes  = data?.system_types ?? []
+  const sites     = useMemo(() => data?.sites ?? [], [data])
+  const siteKeys  = useMemo(() => sites.map((s) => s.url_name), [sites])
+  const count     = data?.count ?? 0
+  const totalPages = Math.max(1, Math.ceil(count / pageSize))
+  const pageStart = page * pageSize + 1
+  const pageEnd   = page * pageSize + sites.length
+  const pageSelected  = sites.length > 0 && sites.every((s) => selected.has(s.url_name))
+  const selectedCount = allMatching ? count : selected.size
+
+  const togglePageSelection = () => {
+    setAllMatching(false)
+    setSelected(pageSelected || allMatching ? new Set() : new Set(siteKeys))
+  }
 
-  const totalPages  = Math.max(1, Math.ceil(filtered.length / PAGE_SIZE))
-  const safePage    = Math.min(page, totalPages - 1)
-  const pageSlice   = filtered.slice(safePage * PAGE_SIZE, (safePage + 1) * PAGE_SIZE)
-  const pageStart   = safePage * PAGE_SIZE + 1
-  const pageEnd     = Math.min((safePage + 1) * PAGE_SIZE, filtered.length)
+  // Only the rows in (or near) the table's viewport are rendered
+  const rows = useWindowedRows(siteKeys, ROW_HEIGHT)
+  const { scrollToTop } = rows
+  useEffect(() => { scrollToTop() }, [queryKey, page, scrollToTop])
+
+  const goToPage = (next: number) => {
+    const cursors = paging.key === queryKey ? paging.cursors : [undefined]
+    if (next > page && data?.next_cursor) {
+      setPaging({ key: queryKey, cursors: [...cursors.slice(0, page + 1), data.next_cursor], page: next })
+    } else if (next < page) {
+      setPaging({ key: queryKey, cursors, page: next })
+    }
+  }
 
   if (loading) return <Skeleton />
 
@@ -467,6 +686,11 @@ export default function Dashboard() {
                  : status?.container_status === 'running' ? 'Running'
                  : (status?.container_status ?? 'Unknown')}
               </span>
+              {isRunning && progress && progress.total > 0 && (
+                <span className="text-xs font-mono text-slate-500">
+                  {progress.done.toLocaleString()} / {progress.total.toLocaleString()}
+                </span>
+              )}
             </div>
           </div>
           {status?.finished_at && (
@@ -495,10 +719,10 @@ export default function Dashboard() {
         <div className="flex items-center gap-3 flex-wrap">
           <h1 className="text-base font-semibold text-slate-100">
             Sites
-            <span className="ml-2 text-sm font-normal text-slate-500">({filtered.length})</span>
-            {filtered.length > PAGE_SIZE && (
+            <span className="ml-2 text-sm font-normal text-slate-500">({count.toLocaleString()})</span>
+            {count > pageSize && (
               <span className="ml-1 text-xs font-normal text-slate-600">
-                · page {safePage + 1}/{totalPages}
+                · page {page + 1}/{totalPages}
               </span>
             )}
           </h1>
@@ -549,6 +773,24 @@ export default function Dashboard() {
             )}
           </div>
 
+          <select
+            value={staleDays}
+            onChange={(e) => setStaleDays(e.target.value)}
+            aria-label="Filter by last login"
+            className="form-input py-1.5 w-auto"
+          >
+            {STALE_OPTIONS.map((o) => <option key={o.days} value={o.days}>{o.label}</option>)}
+          </select>
+
+          <select
+            value={pageSize}
+            onChange={(e) => { localStorage.setItem('qp_pageSize', e.target.value); setPageSize(Number(e.target.value)) }}
+            aria-label="Sites per page"
+            className="form-input py-1.5 w-auto"
+          >
+            {PAGE_SIZES.map((n) => <option key={n} value={n}>{n.toLocaleString()} per page</option>)}
+          </select>
+
           <button onClick={() => setShowInactive((v) => { localStorage.setItem('qp_showInactive', String(!v)); return !v })} className="btn-ghost">
             {showInactive ? 'Hide Inactive' : 'Show Inactive'}
           </button>
@@ -558,12 +800,55 @@ export default function Dashboard() {
         </div>
       </div>
 
+      {/* Bulk actions */}
+      {selectedCount > 0 && (
+        <div className="card px-4 py-2.5 flex flex-wrap items-center gap-3">
+          <span className="text-sm text-slate-300">
+            {selectedCount.toLocaleString()} selected
+          </span>
+          {pageSelected && !allMatching && count > sites.length && (
+            <button onClick={() => setAllMatching(true)} className="text-xs text-primary hover:text-primary-light underline cursor-pointer">
+              Select all {count.toLocaleString()} matching sites
+            </button>
+          )}
+          <div className="ml-auto flex items-center gap-2">
+            {bulkBusy && <Loader2 size={13} className="animate-spin text-primary" aria-label="Working" />}
+            <button onClick={() => handleBulkActive(true)} disabled={bulkBusy} className="btn-secondary px-3 py-1.5 text-xs">
+              Activate
+            </button>
+            <button onClick={() => handleBulkActive(false)} disabled={bulkBusy} className="btn-secondary px-3 py-1.5 text-xs">
+              Deactivate
+            </button>
+            <button onClick={() => setConfirmBulkDel(true)} disabled={bulkBusy} className="btn-danger px-3 py-1.5 text-xs">
+              <Trash2 size={12} aria-hidden /> Delete
+            </button>
+            <button onClick={clearSelection} disabled={bulkBusy} className="btn-ghost px-2 py-1.5 text-xs" aria-label="Clear selection">
+              <X size={13} aria-hidden />
+            </button>
+          </div>
+        </div>
+      )}
+
       {/* Table */}
       <div className="card overflow-hidden">
-        <div className="overflow-x-auto" style={{ WebkitOverflowScrolling: 'touch' }}>
+        <div
+          ref={rows.containerRef}
+          className="overflow-auto max-h-[calc(100vh-14rem)]"
+          style={{ WebkitOverflowScrolling: 'touch' }}
+        >
           <table className="w-full" style={{ minWidth: '660px' }}>
-            <thead>
+            <thead className="sticky top-0 z-10">
               <tr className="border-b border-border bg-bg-elevated">
+                <th className="w-6 pl-4 py-3">
+                  <input
+                    type="checkbox"
+                    checked={allMatching || pageSelected}
+                    onChange={togglePageSelection}
+                    disabled={sites.length === 0}
+                    aria-label="Select all sites on this page"
+                    className="h-3.5 w-3.5 accent-primary cursor-pointer align-middle"
+                  />
+                </th>
                 <th className="w-8 px-4 py-3" />
                 {([
                   { label: 'Site',       col: 'fullname'     as SortCol, cls: 'text-left' },
@@ -588,9 +873,9 @@ export default function Dashboard() {
               </tr>
             </thead>
             <tbody className="divide-y divide-border/60">
-              {filtered.length === 0 ? (
+              {sites.length === 0 ? (
                 <tr>
-                  <td colSpan={8} className="px-5 py-16 text-center">
+                  <td colSpan={9} className="px-5 py-16 text-center">
                     <Inbox size={34} className="text-slate-700 mx-auto mb-3" aria-hidden />
                     {search.trim() ? (
                       <>
@@ -615,39 +900,50 @@ export default function Dashboard() {
                     )}
                   </td>
                 </tr>
-              ) : pageSlice.map((site) => (
-                <SiteRow
-                  key={site.url_name}
-                  site={site}
-                  expanded={expanded.has(site.url_name)}
-                  onToggleExpand={() => toggleExpand(site.url_name)}
-                  onToggleActive={() => handleToggle(site.url_name, site.active)}
-                  onDeleteRequest={() => setConfirmDel(site.url_name)}
-                  isDeleting={deletingId === site.url_name}
-                />
-              ))}
+              ) : (
+                <>
+                  {rows.padTop > 0 && <tr aria-hidden style={{ height: rows.padTop }} />}
+                  {sites.slice(rows.start, rows.end).map((site) => (
+                    <SiteRow
+                      key={site.url_name}
+                      site={site}
+                      expanded={expanded.has(site.url_name)}
+                      selected={allMatching || selected.has(site.url_name)}
+                      inFlight={inFlight.has(site.url_name)}
+                      onToggleExpand={toggleExpand}
+                      onSelect={toggleSelect}
+                      onToggleActive={handleToggle}
+                      onRun={handleRunSite}
+                      onDeleteRequest={setConfirmDel}
+                      onMeasure={rows.measure}
+                      isDeleting={deletingId === site.url_name}
+                    />
+                  ))}
+                  {rows.padBottom > 0 && <tr aria-hidden style={{ height: rows.padBottom }} />}
+                </>
+              )}
             </tbody>
           </table>
         </div>
       </div>
 
       {/* Pagination */}
-      {filtered.length > PAGE_SIZE && (
+      {count > pageSize && (
         <div className="flex items-center justify-between px-1">
           <span className="text-xs text-slate-500">
-            {pageStart}–{pageEnd} of {filtered.length}
+            {pageStart.toLocaleString()}–{pageEnd.toLocaleString()} of {count.toLocaleString()}
           </span>
           <div className="flex items-center gap-2">
             <button
-              onClick={() => setPage((p) => Math.max(0, p - 1))}
-              disabled={safePage === 0}
+              onClick={() => goToPage(page - 1)}
+              disabled={page === 0}
               className="btn-secondary px-3 py-1.5 text-xs disabled:opacity-30"
             >
               Previous
             </button>
             <button
-              onClick={() => setPage((p) => Math.min(totalPages - 1, p + 1))}
-              disabled={safePage >= totalPages - 1}
+              onClick={() => goToPage(page + 1)}
+              disabled={!data?.next_cursor}
               className="btn-secondary px-3 py-1.5 text-xs disabled:opacity-30"
             >
               Next
@@ -663,6 +959,14 @@ export default function Dashboard() {
           onCancel={() => setConfirmDel(null)}
         />
       )}
+
+      {confirmBulkDel && (
+        <DeleteModal
+          count={selectedCount}
+          onConfirm={handleBulkDelete}
+          onCancel={() => setConfirmBulkDel(false)}
+        />
+      )}
     </div>
   )
 }
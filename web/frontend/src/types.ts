@@ -30,16 +30,106 @@ export interface SiteFormData {
 
 export interface SitesResponse {
   sites: Site[]
+  count: number
+  next_cursor: string | null
   totals: Record<string, number>
+  system_types: string[]
   api_key_missing: boolean
 }
 
+export interface SiteQuery {
+  system_type?: string
+  active?: 'true' | 'false'
+  stale_since?: string
+  min_points?: number
+  max_points?: number
+  q?: string
+  sort?: 'fullname' | 'system_type' | 'last_login' | 'queue_points' | 'url_name'
+  order?: 'asc' | 'desc'
+  limit?: number
+  cursor?: string
+}
+
+// The /api/sites filters, without sorting and paging
+export type SiteFilter = Omit<SiteQuery, 'sort' | 'order' | 'limit' | 'cursor'>
+
+// The sites a bulk change applies to
+export type BulkSelection = { url_names: string[] } | { filter: SiteFilter }
+
+export interface BulkResult {
+  ok: boolean
+  count: number
+  sites: Site[]
+  not_found: string[]
+}
+
+export interface BulkDeleteResult {
+  ok: boolean
+  count: number
+  deleted: string[]
+  not_found: string[]
+}
+
+export interface RunProgress {
+  running: boolean
+  run_id?: string | null
+  total?: number | null
+  done?: number
+  ok?: number
+  failed?: number
+  error?: number
+  started_at?: string | null
+  finished_at?: string | null
+}
+
 export interface ContainerStatus {
   container_status: string
   finished_at?: string | null
+  run?: RunProgress
   last_logins: Record<string, string | null>
 }
 
+export interface LoginEvent {
+  type: 'login'
+  state: 'started' | 'finished'
+  site: string
+  customer_id: number
+  system_type: string
+  at: string
+  status?: 'ok' | 'failed' | 'error' | null
+  duration?: number
+  queue_points?: number | null
+  queue_details?: QueueDetail[] | null
+  last_login?: string
+}
+
+export interface RunEvent {
+  type: 'run'
+  state: 'started' | 'finished'
+  at: string
+  total?: number
+  finished_at?: string
+  ok?: number
+  failed?: number
+  error?: number
+}
+
+export interface DeadLetter {
+  id: number
+  site: string
+  system_type: string
+  error_class: string
+  error_message?: string | null
+  http_status?: number | null
+  attempts: { started_at: string; duration: number; error: string }[]
+  created_at: string
+}
+
+export interface DeadLettersResponse {
+  dead_letters: DeadLetter[]
+  summary: Record<string, number>
+}
+
 export interface Toast {
   id: string
   type: 'success' | 'error' | 'warning' | 'info'
@@ -3,6 +3,14 @@ import react from '@vitejs/plugin-react'
 
 export default defineConfig({
   plugins: [react()],
+  build: {
+    rollupOptions: {
+      output: {
+        // Libraries change less often than app code; keep them cacheable on their own
+        manualChunks: { vendor: ['react', 'react-dom', 'react-router-dom'] },
+      },
+    },
+  },
   server: {
     proxy: {
       '/api': {
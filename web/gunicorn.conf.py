@@ -0,0 +1,45 @@
+"""
+Gunicorn settings for the QueuePilot web API (the image's default command).
+
+Threaded workers, since /api/events holds a thread per open dashboard for as
+long as it stays open (at most EVENTS_MAX_STREAMS per worker, default half of
+WEB_THREADS). The app is loaded once before forking (schema migrations run
+once); each worker then opens its own DB pool, Redis connections and
+container watcher. DB_POOL_SIZE defaults to WEB_THREADS.
+
+Each worker keeps its own metrics registry. With METRICS_MULTIPROC_DIR set
+(the image sets it), the workers and this master write snapshots there and
+/metrics reports the sum, whichever worker answers the scrape.
+"""
+
+import multiprocessing
+import os
+
+bind = os.getenv("WEB_BIND", "0.0.0.0:5000")
+workers = int(os.getenv("WEB_WORKERS", str(min(multiprocessing.cpu_count(), 4))))
+worker_class = "gthread"
+threads = int(os.getenv("WEB_THREADS", "16"))
+preload_app = True
+# Idle keep-alive connections; SSE streams are kept open by their own keepalives
+keepalive = 5
+timeout = 60
+graceful_timeout = 20
+accesslog = "-" if os.getenv("WEB_ACCESS_LOG", "").lower() in ("1", "true", "yes") else None
+
+
+def on_starting(server):
+    # After the preloaded app's import: the master's own values (schema
+    # migrations) are reported once, from its snapshot
+    import metrics
+    metrics.clear_snapshots()
+    metrics.write_snapshot()
+
+
+def post_fork(server, worker):
+    import metrics
+    metrics.start_snapshots()
+
+
+def worker_exit(server, worker):
+    import metrics
+    metrics.write_snapshot()
@@ -0,0 +1,36 @@
+"""
+QueuePilot Web Metrics
+
+The web API's metrics, rendered in the Prometheus text format at /metrics.
+The registry and DB proxies are app/utils/metrics_core.py, which the web
+image copies in at build time; from a checkout it is imported from app/utils.
+Under Gunicorn, METRICS_MULTIPROC_DIR makes /metrics add up every worker
+(hooks in gunicorn.conf.py).
+"""
+
+import os
+import sys
+
+try:
+    from metrics_core import (  # noqa: F401
+        REGISTRY, InstrumentedConnection, clear_snapshots, counter, histogram, start_snapshots, write_snapshot,
+    )
+except ImportError:
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app", "utils"))
+    from metrics_core import (  # noqa: F401
+        REGISTRY, InstrumentedConnection, clear_snapshots, counter, histogram, start_snapshots, write_snapshot,
+    )
+
+# ── Web API metrics ───────────────────────────────────────────────────────────
+
+HTTP_REQUESTS_TOTAL = counter(
+    "queuepilot_web_requests_total", "API requests", ("endpoint", "method", "status"))
+HTTP_REQUEST_SECONDS = histogram(
+    "queuepilot_web_request_seconds", "API request duration", ("endpoint",))
+DB_QUERIES_TOTAL = counter(
+    "queuepilot_web_db_queries_total", "Database queries per endpoint", ("endpoint", "operation"))
+DB_QUERY_SECONDS = histogram(
+    "queuepilot_web_db_query_seconds", "Database query duration", ("operation",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0))
+CACHE_REQUESTS_TOTAL = counter(
+    "queuepilot_web_cache_requests_total", "Cached response lookups", ("cache", "result"))
@@ -0,0 +1,116 @@
+"""
+QueuePilot Static Files
+
+Serves the built dashboard (web/static) from an in-memory index built once at
+startup, so a request for an asset is a dict lookup rather than a filesystem
+check. Vite's content-hashed files under assets/ are sent as immutable for a
+year; everything else (index.html, favicon, ...) must be revalidated, so a
+deploy is picked up on the next load.
+
+Gzip and Brotli variants are built at image build time:
+
+    python static_files.py static
+
+and sent instead of the original when the client accepts them.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import sys
+from typing import Dict
+
+from flask import Response, request, send_file
+
+# Content-hashed by Vite, so safe to cache forever
+IMMUTABLE_PREFIX = "assets/"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Encodings in order of preference, with the suffix of their precompressed file
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+# Smaller files are not worth a variant; a variant must save at least 10%
+MIN_COMPRESS_SIZE = 1024
+MIN_SAVING = 0.9
+
+
+class StaticFile:
+    __slots__ = ("path", "mimetype", "etag", "cache_control", "variants")
+
+    def __init__(self, path: str, rel: str):
+        self.path = path
+        self.mimetype = mimetypes.guess_type(rel)[0] or "application/octet-stream"
+        stat = os.stat(path)
+        self.etag = hashlib.blake2b(f"{rel}:{stat.st_size}:{stat.st_mtime_ns}".encode(), digest_size=12).hexdigest()
+        self.cache_control = IMMUTABLE_CACHE_CONTROL if rel.startswith(IMMUTABLE_PREFIX) else REVALIDATE_CACHE_CONTROL
+        self.variants = {
+            encoding: path + suffix for encoding, suffix in ENCODINGS if os.path.isfile(path + suffix)
+        }
+
+
+class StaticIndex:
+    """The files under a directory, keyed by their URL path."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.files: Dict[str, StaticFile] = {}
+        suffixes = tuple(suffix for _, suffix in ENCODINGS)
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                if filename.endswith(suffixes):
+                    continue
+                path = os.path.join(dirpath, filename)
+                rel = os.path.relpath(path, root).replace(os.sep, "/")
+                self.files[rel] = StaticFile(path, rel)
+
+    def get(self, rel: str) -> StaticFile | None:
+        return self.files.get(rel)
+
+    def send(self, entry: StaticFile) -> Response:
+        """Sends a file, precompressed if the client accepts it, honouring If-None-Match."""
+        encoding = next((e for e, _ in ENCODINGS if e in entry.variants and request.accept_encodings[e]), None)
+        path = entry.variants[encoding] if encoding else entry.path
+        response = send_file(path, mimetype=entry.mimetype, etag=f"{entry.etag}-{encoding}" if encoding else entry.etag,
+                             conditional=True, max_age=None)
+        if encoding and response.status_code != 304:
+            response.headers["Content-Encoding"] = encoding
+        if entry.variants:
+            response.vary.add("Accept-Encoding")
+        response.headers["Cache-Control"] = entry.cache_control
+        return response
+
+
+def precompress(root: str) -> None:
+    """Writes .gz and .br variants next to each compressible file under root."""
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+        print("brotli not installed; writing gzip variants only", file=sys.stderr)
+
+    saved = 0
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            mimetype = mimetypes.guess_type(filename)[0] or ""
+            if filename.endswith((".gz", ".br")) or not mimetype.startswith(COMPRESSIBLE_TYPES):
+                continue
+            with open(path, "rb") as fh:
+                data = fh.read()
+            if len(data) < MIN_COMPRESS_SIZE:
+                continue
+            variants = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+            if brotli:
+                variants[".br"] = brotli.compress(data, quality=11)
+            for suffix, compressed in variants.items():
+                if len(compressed) <= len(data) * MIN_SAVING:
+                    with open(path + suffix, "wb") as fh:
+                        fh.write(compressed)
+                    saved += len(data) - len(compressed)
+    print(f"Precompressed {root}: {saved / 1024:.0f} KiB saved across variants")
+
+
+if __name__ == "__main__":
+    precompress(sys.argv[1] if len(sys.argv) > 1 else "static")